@@ -2,6 +2,12 @@
 Multicriterio IPEPD - FES Aragón
 Aplicación Flask para ranking multicriterio (categorías e ítems) por instrumento.
 Adaptado al patrón de tu app funcional (logging + mysql.connector pooling).
+
+Arranque barato (create_app): importar este módulo no abre conexiones a
+MySQL ni carga numpy; el pool (db.py) se crea en la primera consulta y los
+módulos de analítica (services/acuerdo, pares, plackett_luce, prioridades)
+se importan dentro de sus endpoints. Presupuesto medido con
+python -m bench.importtime.
 """
 
 import os
@@ -9,21 +15,25 @@ import logging
 from logging.handlers import TimedRotatingFileHandler
 from contextlib import contextmanager
 
-from flask import Flask, request, redirect, url_for, session
-from flask_cors import CORS
 from dotenv import load_dotenv
-import mysql.connector
-from mysql.connector import pooling, Error as MySQLError
 
-# Blueprints (tu estructura modular)
-from routes.auth import bp as auth_bp
-from routes.eval import bp as eval_bp
-from routes.api import bp as api_bp
-from routes.admin import bp as admin_bp
+# Antes de los imports propios: varios módulos leen su configuración
+# (os.getenv) al importarse.
+load_dotenv()
+
+from flask import Flask, request, redirect, url_for, session
+
+import db
+from db import release_connection
+from services import log_async
+
+logger = logging.getLogger(__name__)
 
 
 # -----------------------------------------------------------------------------
-# Logging (idéntico enfoque al de tu otra app)
+# Logging (idéntico enfoque al de tu otra app, pero asíncrono)
+# Los handlers de archivo/consola corren en un hilo escritor detrás de una
+# cola acotada (services/log_async.py): los requests nunca esperan disco.
 # -----------------------------------------------------------------------------
 def configure_logging():
     level_name = (os.getenv("LOG_LEVEL") or "INFO").upper()
@@ -36,15 +46,18 @@ def configure_logging():
 
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
-    fmt = logging.Formatter(
-        "%(asctime)s %(levelname)s pid=%(process)d %(name)s: %(message)s"
-    )
+    if (os.getenv("LOG_FORMAT") or "text").strip().lower() == "json":
+        fmt = log_async.JsonFormatter()
+    else:
+        fmt = logging.Formatter(
+            "%(asctime)s %(levelname)s pid=%(process)d %(name)s: %(message)s"
+        )
 
     root = logging.getLogger()
     root.setLevel(level)
 
-    has_file_handler = any(isinstance(h, TimedRotatingFileHandler) for h in root.handlers)
-    if not has_file_handler:
+    has_queue_handler = any(isinstance(h, log_async.BoundedQueueHandler) for h in root.handlers)
+    if not has_queue_handler:
         file_handler = TimedRotatingFileHandler(
             log_file,
             when="midnight",
@@ -53,144 +66,30 @@ def configure_logging():
         )
         file_handler.setLevel(level)
         file_handler.setFormatter(fmt)
-        root.addHandler(file_handler)
 
-    has_stream_handler = any(isinstance(h, logging.StreamHandler) for h in root.handlers)
-    if not has_stream_handler:
         stream_handler = logging.StreamHandler()
         stream_handler.setLevel(level)
         stream_handler.setFormatter(fmt)
-        root.addHandler(stream_handler)
-
-    logging.getLogger("werkzeug").setLevel(level)
-
-
-# -----------------------------------------------------------------------------
-# Cargar env + logging
-# -----------------------------------------------------------------------------
-load_dotenv()
-configure_logging()
-logger = logging.getLogger(__name__)
-
-
-# -----------------------------------------------------------------------------
-# Flask app
-# -----------------------------------------------------------------------------
-app = Flask(__name__)
-
-# Soportar tanto SECRET_KEY como FLASK_SECRET_KEY (igual que tu otra app)
-app.secret_key = os.getenv("SECRET_KEY") or os.getenv("FLASK_SECRET_KEY", "dev-secret-key-change-in-production")
-
-# CORS (si lo necesitas; en general solo para /api)
-cors_origins = os.getenv("CORS_ORIGINS", "*")
-CORS(app, resources={r"/api/*": {"origins": cors_origins}})
-
-
-@app.get("/")
-def index():
-    """Entrada por defecto: redirige a login o panel correspondiente."""
-    if session.get("usuario_id"):
-        if session.get("is_admin"):
-            return redirect(url_for("admin.panel"))
-        return redirect(url_for("eval.dashboard"))
-    return redirect(url_for("auth.login"))
 
+        log_async.install(
+            root,
+            [file_handler, stream_handler],
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        )
 
-@app.before_request
-def log_request_summary():
-    """Log de monitoreo: solo rutas relevantes."""
-    try:
-        path = request.path or ""
-        if path.startswith("/api/") or path.startswith("/admin"):
-            ip = request.headers.get("X-Forwarded-For", request.remote_addr)
-            logger.info("HTTP %s %s ip=%s", request.method, path, ip)
-    except Exception:
-        pass
+    logging.getLogger("werkzeug").setLevel(level)
 
 
 # -----------------------------------------------------------------------------
-# DB Config + Pool (mysql.connector)
+# Helpers DB sobre el pool único de db.py
+# (para que routes/* puedan hacer: current_app.db_cursor(), db_transaction())
+# Usan una conexión propia del pool, independiente de la del request.
 # -----------------------------------------------------------------------------
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST", "127.0.0.1"),
-    "port": int(os.getenv("DB_PORT", 3306)),
-    "user": os.getenv("DB_USER", "root"),
-    "password": os.getenv("DB_PASSWORD", ""),
-    "database": os.getenv("DB_NAME", "multicriterio_IPEPD"),
-    "charset": "utf8mb4",
-    "collation": "utf8mb4_unicode_ci",
-    "autocommit": True,
-}
-
-connection_pool = None
-
-
-def init_connection_pool():
-    """Inicializa el pool una vez por proceso."""
-    global connection_pool
-    if connection_pool is not None:
-        return connection_pool
-
-    try:
-        pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
-        connection_pool = pooling.MySQLConnectionPool(
-            pool_name=os.getenv("DB_POOL_NAME", "multicriterio_pool"),
-            pool_size=pool_size,
-            pool_reset_session=True,
-            **DB_CONFIG,
-        )
-        logger.info(
-            "Pool MySQL listo (pool_size=%s host=%s port=%s db=%s user=%s)",
-            pool_size,
-            DB_CONFIG.get("host"),
-            DB_CONFIG.get("port"),
-            DB_CONFIG.get("database"),
-            DB_CONFIG.get("user"),
-        )
-        return connection_pool
-    except MySQLError:
-        logger.exception(
-            "Error al crear pool MySQL (host=%s port=%s db=%s user=%s)",
-            DB_CONFIG.get("host"),
-            DB_CONFIG.get("port"),
-            DB_CONFIG.get("database"),
-            DB_CONFIG.get("user"),
-        )
-        connection_pool = None
-        return None
-
-
-# Intento inicial
-init_connection_pool()
-
-
-def db_conn():
-    pool = init_connection_pool()
-    if not pool:
-        raise Exception("Pool de conexiones no disponible")
-    return pool.get_connection()
-
-
 @contextmanager
 def db_cursor(dictionary=False):
-    """Cursor protegido: cierra cursor y regresa conexión al pool."""
-    conn = None
-    cursor = None
-    try:
-        conn = db_conn()
-        cursor = conn.cursor(dictionary=dictionary)
-        yield conn, cursor
-    finally:
-        if cursor is not None:
-            try:
-                cursor.close()
-            except Exception:
-                logger.exception("Error al cerrar cursor")
-        if conn is not None:
-            try:
-                conn.close()
-            except Exception:
-                logger.exception("Error al cerrar conexión")
+    """Cursor protegido: confirma al salir, cierra cursor y regresa conexión al pool."""
+    with db_transaction(dictionary=dictionary) as pair:
+        yield pair
 
 
 @contextmanager
@@ -199,7 +98,7 @@ def db_transaction(dictionary=False):
     conn = None
     cursor = None
     try:
-        conn = db_conn()
+        conn = db.nueva_conexion()
         cursor = conn.cursor(dictionary=dictionary)
         yield conn, cursor
         conn.commit()
@@ -224,35 +123,96 @@ def db_transaction(dictionary=False):
 
 
 # -----------------------------------------------------------------------------
-# Exponer helpers DB al resto del proyecto
-# (para que routes/* puedan hacer: from app import db_cursor, db_transaction)
-# -----------------------------------------------------------------------------
-app.db_cursor = db_cursor
-app.db_transaction = db_transaction
-
-
-# -----------------------------------------------------------------------------
-# Blueprints
-# -----------------------------------------------------------------------------
-app.register_blueprint(auth_bp)            # /login, /logout, etc.
-app.register_blueprint(eval_bp)            # /dashboard, /evaluar/...
-app.register_blueprint(api_bp, url_prefix="/api")  # /api/*
-app.register_blueprint(admin_bp)           # /admin
-
-
-# -----------------------------------------------------------------------------
-# Healthcheck
-# -----------------------------------------------------------------------------
-@app.get("/health")
-def health():
-    return {"ok": True, "db": DB_CONFIG.get("database")}
+# App factory
+# -----------------------------------------------------------------------------
+def create_app() -> Flask:
+    configure_logging()
+
+    app = Flask(__name__)
+
+    # Soportar tanto SECRET_KEY como FLASK_SECRET_KEY (igual que tu otra app)
+    app.secret_key = os.getenv("SECRET_KEY") or os.getenv("FLASK_SECRET_KEY", "dev-secret-key-change-in-production")
+
+    # CORS (si lo necesitas; en general solo para /api). CORS_ORIGINS="" lo desactiva.
+    cors_origins = os.getenv("CORS_ORIGINS", "*")
+    if cors_origins:
+        from flask_cors import CORS
+        CORS(app, resources={r"/api/*": {"origins": cors_origins}})
+
+    # Assets con hash (static/dist/manifest.json, python -m tools.build_assets)
+    from services import assets
+    assets.init_app(app)
+
+    app.db_cursor = db_cursor
+    app.db_transaction = db_transaction
+
+    # Blueprints (tu estructura modular)
+    from routes.auth import bp as auth_bp
+    from routes.eval import bp as eval_bp
+    from routes.api import bp as api_bp
+    from routes.admin import bp as admin_bp
+
+    app.register_blueprint(auth_bp)            # /login, /logout, etc.
+    app.register_blueprint(eval_bp)            # /dashboard, /evaluar/...
+    app.register_blueprint(api_bp, url_prefix="/api")  # /api/*
+    app.register_blueprint(admin_bp)           # /admin
+
+    # Control de admisión (503/429 con Retry-After en picos de guardado)
+    from services import admision
+    admision.init_app(app)
+
+    @app.get("/")
+    def index():
+        """Entrada por defecto: redirige a login o panel correspondiente."""
+        if session.get("usuario_id"):
+            if session.get("is_admin"):
+                return redirect(url_for("admin.panel"))
+            return redirect(url_for("eval.dashboard"))
+        return redirect(url_for("auth.login"))
+
+    @app.before_request
+    def log_request_summary():
+        """Log de monitoreo: solo rutas relevantes."""
+        try:
+            path = request.path or ""
+            if path.startswith("/api/") or path.startswith("/admin"):
+                ip = request.headers.get("X-Forwarded-For", request.remote_addr)
+                logger.info("HTTP %s %s ip=%s", request.method, path, ip)
+        except Exception:
+            pass
+
+    @app.teardown_appcontext
+    def release_db_connection(exc):
+        """Regresa al pool la conexión del request (db.py)."""
+        release_connection()
+
+    # -------------------------------------------------------------------------
+    # Healthcheck
+    # -------------------------------------------------------------------------
+    @app.get("/health")
+    def health():
+        from services import admision, cache_resultados, diario, eventos, idempotencia
+        return {
+            "ok": True,
+            "db": db.DB_CONFIG.get("database"),
+            "logging": log_async.stats(),
+            "cache_resultados": cache_resultados.cache.stats(),
+            "admision": admision.stats(),
+            "db_tx": db.tx_stats(),
+            "idempotencia": idempotencia.stats(),
+            "diario": diario.stats(),
+            "sse": eventos.stats(),
+        }
+
+    return app
 
 
 # -----------------------------------------------------------------------------
 # Entry point (Opción 2: python app.py)
+# Producción: wsgi.py / gunicorn.conf.py llaman create_app().
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
-    app.run(
+    create_app().run(
         host=os.getenv("FLASK_HOST", "127.0.0.1"),
         port=int(os.getenv("FLASK_PORT", "5000")),
         debug=os.getenv("FLASK_DEBUG", "1") == "1",
@@ -0,0 +1,298 @@
+# bench/common.py
+# ------------------------------------------------------------
+# Utilidades compartidas por las herramientas de benchmark:
+# - conexión directa a MySQL/MariaDB (mismas variables DB_* que db.py)
+# - carga de sql/schema.sql y sql/1x_seed_*.sql en una BD de pruebas
+# - roles/usuarios sintéticos
+# - recálculo de tablas derivadas (acumuladores, paquetes de ítems) tras
+#   cargas masivas
+# - catálogo por instrumento y generación de rankings válidos
+#
+# Convención de rankings (igual que la app): valores 1..n únicos por
+# grupo; grupo 0 = ítems principales, grupo >0 = parent_item_id.
+# ------------------------------------------------------------
+
+import glob
+import hashlib
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+import mysql.connector
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQL_DIR = os.path.join(BASE_DIR, "sql")
+
+# Nombre fijo de la BD en los scripts de sql/ (se reescribe al sembrar)
+SQL_DB_NAME = "multicriterio_IPEPD"
+
+BENCH_PASSWORD = "bench"
+BENCH_USER_PREFIX = "bench_"
+BENCH_ADMIN_USER = "bench_admin"
+
+# (nombre, peso) de roles evaluadores sintéticos
+BENCH_ROLES = [("BENCH_ALUMNO", 1), ("BENCH_DOCENTE", 2), ("BENCH_COORDINACION", 3)]
+
+load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+
+def sha256_hex(password: str) -> str:
+    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+def connect(database: Optional[str] = None, **overrides):
+    """Conexión directa (sin pool) para herramientas de línea de comandos."""
+    cfg = {
+        "host": os.getenv("DB_HOST", "127.0.0.1"),
+        "port": int(os.getenv("DB_PORT", "3306")),
+        "user": os.getenv("DB_USER", "root"),
+        "password": os.getenv("DB_PASSWORD", ""),
+        "charset": "utf8mb4",
+        "collation": "utf8mb4_unicode_ci",
+        "autocommit": False,
+    }
+    if database:
+        cfg["database"] = database
+    cfg.update(overrides)
+    return mysql.connector.connect(**cfg)
+
+
+# -----------------------------
+# Carga de scripts SQL
+# -----------------------------
+def split_sql(text: str) -> List[str]:
+    """
+    Separa un script en sentencias por ';' respetando comillas y
+    comentarios '--'. Suficiente para los scripts de sql/.
+    """
+    statements = []
+    buf = []
+    quote = None
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if quote:
+            buf.append(ch)
+            if ch == "\\" and i + 1 < n:
+                buf.append(text[i + 1])
+                i += 2
+                continue
+            if ch == quote:
+                if i + 1 < n and text[i + 1] == quote:
+                    buf.append(text[i + 1])
+                    i += 2
+                    continue
+                quote = None
+            i += 1
+            continue
+
+        if ch == "-" and text.startswith("--", i):
+            nl = text.find("\n", i)
+            i = n if nl < 0 else nl + 1
+            buf.append("\n")
+            continue
+        if ch in ("'", '"', "`"):
+            quote = ch
+        if ch == ";":
+            stmt = "".join(buf).strip()
+            if stmt:
+                statements.append(stmt)
+            buf = []
+        else:
+            buf.append(ch)
+        i += 1
+
+    stmt = "".join(buf).strip()
+    if stmt:
+        statements.append(stmt)
+    return statements
+
+
+def run_sql_file(conn, path: str, database: str):
+    """Ejecuta un script de sql/ apuntándolo a `database`."""
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read().replace(SQL_DB_NAME, database)
+    cur = conn.cursor()
+    try:
+        for stmt in split_sql(text):
+            cur.execute(stmt)
+            if cur.with_rows:
+                cur.fetchall()
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def seed_paths() -> List[str]:
+    return sorted(glob.glob(os.path.join(SQL_DIR, "1[0-9]_seed_*.sql")))
+
+
+def setup_database(database: str, drop: bool = False):
+    """Crea esquema + catálogos de los instrumentos en `database`."""
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        if drop:
+            cur.execute(f"DROP DATABASE IF EXISTS `{database}`")
+        cur.close()
+        run_sql_file(conn, os.path.join(SQL_DIR, "schema.sql"), database)
+        for path in seed_paths():
+            run_sql_file(conn, path, database)
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# Roles y usuarios sintéticos
+# -----------------------------
+def ensure_roles(conn, admin_role_name: str = "ADMIN") -> Dict[str, int]:
+    """Crea (si faltan) ADMIN y los roles BENCH_*; regresa nombre -> rol_id."""
+    cur = conn.cursor()
+    try:
+        for nombre, peso in [(admin_role_name, 0)] + BENCH_ROLES:
+            cur.execute(
+                "INSERT INTO rol (nombre, peso, is_active) VALUES (%s,%s,1) "
+                "ON DUPLICATE KEY UPDATE is_active=1",
+                (nombre, peso)
+            )
+        conn.commit()
+        cur.execute("SELECT rol_id, nombre FROM rol")
+        return {nombre: int(rol_id) for rol_id, nombre in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def ensure_users(conn, count: int, roles: Dict[str, int], admin_role_name: str = "ADMIN") -> List[str]:
+    """
+    Crea bench_00001..bench_N (rol asignado en ciclo) y bench_admin.
+    Todos con password BENCH_PASSWORD. Regresa los nombres de evaluadores.
+    """
+    pwd = sha256_hex(BENCH_PASSWORD)
+    role_ids = [roles[nombre] for nombre, _peso in BENCH_ROLES]
+    names = [f"{BENCH_USER_PREFIX}{i:05d}" for i in range(1, count + 1)]
+    rows = [
+        (name, pwd, "Bench", f"Evaluador {i}", "Sintético", "N/A", role_ids[i % len(role_ids)])
+        for i, name in enumerate(names, start=1)
+    ]
+    rows.append((BENCH_ADMIN_USER, pwd, "Bench", "Admin", "Sintético", "N/A", roles[admin_role_name]))
+
+    cur = conn.cursor()
+    try:
+        for start in range(0, len(rows), 1000):
+            cur.executemany(
+                "INSERT INTO usuario (nombre_usuario, password_sha256, nombre, apellido_paterno, "
+                "apellido_materno, grado, rol_id, is_active) VALUES (%s,%s,%s,%s,%s,%s,%s,1) "
+                "ON DUPLICATE KEY UPDATE password_sha256=VALUES(password_sha256), is_active=1",
+                rows[start:start + 1000]
+            )
+        conn.commit()
+    finally:
+        cur.close()
+    return names
+
+
+def reset_evaluations(conn, user_prefix: str = BENCH_USER_PREFIX):
+    """Borra las evaluaciones de usuarios sintéticos (CASCADE a rankings)."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "DELETE e FROM evaluacion e JOIN usuario u ON u.usuario_id = e.usuario_id "
+            "WHERE u.nombre_usuario LIKE %s",
+            (user_prefix + "%",)
+        )
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def rebuild_derived(database: str, instrumento_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Recalcula los acumuladores agregado_* (y agregado_version) de
+    `database` tras cargar o borrar evaluaciones por fuera de la app
+    (bench.dataset, reset_evaluations). Equivale a
+    python -m services.agregados reconciliar --reparar; con
+    ITEM_STORAGE=dual además rellena evaluacion_item_packed
+    (python -m tools.empaquetar_items).
+    """
+    import db
+    from services import agregados, codec_ranking
+
+    db.DB_CONFIG["database"] = database
+    db.reset_pool()
+    try:
+        if instrumento_ids is None:
+            instrumento_ids = [
+                int(r["instrumento_id"])
+                for r in db.query_all("SELECT instrumento_id FROM instrumento ORDER BY instrumento_id")
+            ]
+        res = [agregados.reconciliar(iid, reparar=True) for iid in instrumento_ids]
+        if codec_ranking.dual():
+            from tools import empaquetar_items
+            for r in res:
+                r["empaquetados"], r["incompletas"] = empaquetar_items.empaquetar(r["instrumento_id"], 500)
+        return res
+    finally:
+        db.release_connection()
+
+
+# -----------------------------
+# Catálogo y rankings
+# -----------------------------
+def load_catalog(conn) -> Dict[int, Dict[str, Any]]:
+    """
+    instrumento_id -> {
+        "nombre", "categorias": [code...] (por orden),
+        "items": {code: {rank_group: [item_id...] (por orden)}}
+    }
+    """
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute("SELECT instrumento_id, nombre FROM instrumento WHERE is_active=1 ORDER BY instrumento_id")
+        catalog = {
+            int(r["instrumento_id"]): {"nombre": r["nombre"], "categorias": [], "items": {}}
+            for r in cur.fetchall()
+        }
+        cur.execute(
+            "SELECT instrumento_id, categoria_code FROM categoria WHERE is_active=1 "
+            "ORDER BY instrumento_id, orden"
+        )
+        for r in cur.fetchall():
+            ins = catalog.get(int(r["instrumento_id"]))
+            if ins is not None:
+                ins["categorias"].append(r["categoria_code"])
+                ins["items"][r["categoria_code"]] = {}
+        cur.execute(
+            "SELECT instrumento_id, categoria_code, item_id, parent_item_id FROM item "
+            "WHERE is_active=1 ORDER BY instrumento_id, categoria_code, orden"
+        )
+        for r in cur.fetchall():
+            ins = catalog.get(int(r["instrumento_id"]))
+            if ins is None or r["categoria_code"] not in ins["items"]:
+                continue
+            group = int(r["parent_item_id"]) if r["parent_item_id"] else 0
+            ins["items"][r["categoria_code"]].setdefault(group, []).append(int(r["item_id"]))
+        return catalog
+    finally:
+        cur.close()
+
+
+def random_ranks(n: int, rng: random.Random) -> List[int]:
+    """Permutación aleatoria de 1..n."""
+    vals = list(range(1, n + 1))
+    rng.shuffle(vals)
+    return vals
+
+
+def categorias_payload(codes: List[str], rng: random.Random) -> Dict[str, Any]:
+    ranks = random_ranks(len(codes), rng)
+    return {"ranks": [{"categoria_code": c, "rank_value": v} for c, v in zip(codes, ranks)]}
+
+
+def items_payload(groups: Dict[int, List[int]], rng: random.Random) -> Dict[str, Any]:
+    out = []
+    for group, item_ids in groups.items():
+        for item_id, v in zip(item_ids, random_ranks(len(item_ids), rng)):
+            out.append({"item_id": item_id, "rank_value": v, "rank_group": group})
+    return {"ranks": out}
@@ -0,0 +1,350 @@
+# bench/dataset.py
+# ------------------------------------------------------------
+# Generador de datasets sintéticos de gran escala:
+#   usuario, evaluacion, evaluacion_categoria, evaluacion_item
+#
+# - Las evaluaciones se crean en la campaña activa de cada instrumento
+#   (se crea una si no hay, como services.campanas.activa).
+# - Respeta uk_eval_unica (un usuario evalúa cada instrumento a lo más
+#   una vez por campaña), los UNIQUE de rank (permutación 1..n por grupo)
+#   y la estructura rank_group (0 = principales, >0 = parent_item_id).
+# - Correlación configurable entre evaluadores (modelo de puntaje latente):
+#     puntaje = consenso_cluster + noise * N(0, 1)
+#   con --clusters consensos distintos (separados por --cluster-spread)
+#   y una fracción --identity-frac de evaluadores "perezosos" que dejan
+#   el orden oficial (orden del catálogo).
+# - Convención de la app: rank_value mayor = más importante
+#   (admin_results ordena por rank_ponderado DESC).
+# - Salida:
+#     --out DIR   archivos TSV + load.sql (LOAD DATA LOCAL INFILE)
+#     --direct    INSERT multi-fila directo a la BD (lotes de --batch filas)
+# - Las filas se cargan por fuera de la app: los acumuladores agregado_*
+#   (y con ITEM_STORAGE=dual, evaluacion_item_packed) no se enteran. Con --direct se recalculan al final; con --out hay que
+#   correr --finalize después de load.sql (si no, /agregados, /pares, el
+#   SSE y reconciliar ven acumuladores vacíos).
+#
+# Ejemplo (100k evaluaciones sobre 3 instrumentos):
+#   python -m bench.dataset --database multicriterio_bench \
+#       --users 40000 --evaluations 100000 --out /tmp/ipepd_data
+#   mysql --local-infile=1 multicriterio_bench < /tmp/ipepd_data/load.sql
+#   python -m bench.dataset --database multicriterio_bench --finalize
+# ------------------------------------------------------------
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from bench import common
+
+GEN_USER_PREFIX = "gen_"
+
+
+def _ranks_from_scores(scores: np.ndarray) -> np.ndarray:
+    """Puntajes (E x k) -> ranks 1..k por fila (mayor puntaje = rank k)."""
+    return np.argsort(np.argsort(scores, axis=1, kind="stable"), axis=1) + 1
+
+
+class RankModel:
+    """Genera matrices de ranks correlacionadas para un grupo de tamaño k."""
+
+    def __init__(self, rng: np.random.Generator, clusters: int, noise: float,
+                 cluster_spread: float, identity_frac: float):
+        self.rng = rng
+        self.clusters = max(1, clusters)
+        self.noise = noise
+        self.cluster_spread = cluster_spread
+        self.identity_frac = identity_frac
+        self._centers = {}
+
+    def ranks(self, key, k: int, cluster_of: np.ndarray, lazy: np.ndarray) -> np.ndarray:
+        """Ranks (E x k) del grupo `key`; el consenso por grupo es estable entre lotes."""
+        e = cluster_of.shape[0]
+        centers = self._centers.get(key)
+        if centers is None:
+            # Consenso global aleatorio (en escala de posiciones) y uno por cluster
+            base = self.rng.permutation(k).astype(np.float64)
+            centers = base + self.cluster_spread * k * self.rng.standard_normal((self.clusters, k))
+            self._centers[key] = centers
+        scores = centers[cluster_of] + self.noise * k * self.rng.standard_normal((e, k))
+        out = _ranks_from_scores(scores)
+        if lazy.any():
+            # Orden oficial: el primer ítem del catálogo recibe 1, el segundo 2...
+            out[lazy] = np.arange(1, k + 1)
+        return out
+
+
+def _tsv(rows) -> str:
+    return "".join("\t".join(map(str, r)) + "\n" for r in rows)
+
+
+class Writer:
+    """Destino de filas: archivos TSV (+ load.sql) o INSERT multi-fila directo."""
+
+    COLUMNS = {
+        "usuario": ("usuario_id", "nombre_usuario", "password_sha256", "nombre", "apellido_paterno",
+                    "apellido_materno", "grado", "rol_id", "is_active"),
+        "evaluacion": ("evaluacion_id", "instrumento_id", "campana_id", "usuario_id", "rol_id_snapshot",
+                       "rol_peso_snapshot", "status", "created_at", "submitted_at"),
+        "evaluacion_categoria": ("evaluacion_id", "instrumento_id", "categoria_code", "rank_value"),
+        "evaluacion_item": ("evaluacion_id", "item_id", "categoria_code", "rank_group", "rank_value"),
+    }
+
+    def __init__(self, out_dir: str = "", conn=None, batch: int = 5000):
+        self.out_dir = out_dir
+        self.conn = conn
+        self.batch = batch
+        self.counts = {t: 0 for t in self.COLUMNS}
+        self._files = {}
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+            for table in self.COLUMNS:
+                self._files[table] = open(os.path.join(out_dir, f"{table}.tsv"), "w", encoding="utf-8")
+        if conn is not None:
+            cur = conn.cursor()
+            cur.execute("SET SESSION FOREIGN_KEY_CHECKS=0")
+            cur.execute("SET SESSION UNIQUE_CHECKS=0")
+            cur.close()
+
+    def write(self, table: str, rows):
+        if not rows:
+            return
+        self.counts[table] += len(rows)
+        if self.out_dir:
+            self._files[table].write(_tsv(rows))
+        if self.conn is not None:
+            cols = ", ".join(self.COLUMNS[table])
+            cur = self.conn.cursor()
+            try:
+                for start in range(0, len(rows), self.batch):
+                    chunk = rows[start:start + self.batch]
+                    values = ",".join(
+                        "(" + ",".join(_sql_literal(v) for v in r) + ")" for r in chunk
+                    )
+                    cur.execute(f"INSERT INTO {table} ({cols}) VALUES {values}")
+                self.conn.commit()
+            finally:
+                cur.close()
+
+    def close(self):
+        for fh in self._files.values():
+            fh.close()
+        if self.out_dir:
+            self._write_load_script()
+        if self.conn is not None:
+            cur = self.conn.cursor()
+            cur.execute("SET SESSION FOREIGN_KEY_CHECKS=1")
+            cur.execute("SET SESSION UNIQUE_CHECKS=1")
+            cur.close()
+
+    def _write_load_script(self):
+        lines = ["SET FOREIGN_KEY_CHECKS=0;", "SET UNIQUE_CHECKS=0;"]
+        for table, cols in self.COLUMNS.items():
+            path = os.path.abspath(os.path.join(self.out_dir, f"{table}.tsv")).replace("\\", "/")
+            lines.append(
+                f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table} "
+                f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+                f"({', '.join(cols)});"
+            )
+        lines += ["SET UNIQUE_CHECKS=1;", "SET FOREIGN_KEY_CHECKS=1;", ""]
+        with open(os.path.join(self.out_dir, "load.sql"), "w", encoding="utf-8") as fh:
+            fh.write("\n".join(lines))
+
+
+def _sql_literal(v) -> str:
+    if v is None or v == "\\N":
+        return "NULL"
+    if isinstance(v, (int, np.integer)):
+        return str(int(v))
+    return "'" + str(v).replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def _next_id(conn, table: str, col: str) -> int:
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT COALESCE(MAX({col}), 0) + 1 FROM {table}")
+        return int(cur.fetchone()[0])
+    finally:
+        cur.close()
+
+
+def _campana_activa(conn, instrumento_id: int) -> int:
+    """campana_id activa del instrumento (la crea si no hay ninguna)."""
+    sql = "SELECT campana_id FROM campana WHERE instrumento_id=%s AND status='activa'"
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, (instrumento_id,))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute(
+                "INSERT IGNORE INTO campana (instrumento_id, nombre) VALUES (%s,%s)",
+                (instrumento_id, os.getenv("CAMPANA_INICIAL", "Inicial"))
+            )
+            conn.commit()
+            cur.execute(sql, (instrumento_id,))
+            row = cur.fetchone()
+        return int(row[0])
+    finally:
+        cur.close()
+
+
+def generate(conn, writer: Writer, users: int, evaluations: int, instrumentos, seed: int,
+             clusters: int, noise: float, cluster_spread: float, identity_frac: float,
+             submitted_frac: float, chunk: int = 20000):
+    rng = np.random.default_rng(seed)
+    model = RankModel(rng, clusters, noise, cluster_spread, identity_frac)
+
+    admin_role = os.getenv("ADMIN_ROLE_NAME", "ADMIN")
+    roles = common.ensure_roles(conn, admin_role)
+    catalog = common.load_catalog(conn)
+    instrumentos = [i for i in (instrumentos or sorted(catalog)) if i in catalog]
+    if not instrumentos:
+        raise SystemExit("No hay instrumentos en el catálogo (¿faltan los seeds?)")
+
+    per_instr = -(-evaluations // len(instrumentos))
+    if users < per_instr:
+        raise SystemExit(
+            f"Se requieren al menos {per_instr} usuarios para {evaluations} evaluaciones "
+            f"en {len(instrumentos)} instrumentos (uk_eval_unica)"
+        )
+
+    # ---- Usuarios ----
+    role_rows = [(roles[nombre], peso) for nombre, peso in common.BENCH_ROLES]
+    user_id0 = _next_id(conn, "usuario", "usuario_id")
+    pwd = common.sha256_hex(common.BENCH_PASSWORD)
+    user_role = rng.integers(0, len(role_rows), size=users)
+    for start in range(0, users, chunk):
+        rows = []
+        for i in range(start, min(users, start + chunk)):
+            uid = user_id0 + i
+            rows.append((uid, f"{GEN_USER_PREFIX}{uid:07d}", pwd, "Sintético", f"Evaluador {uid}",
+                         "Generado", "N/A", role_rows[user_role[i]][0], 1))
+        writer.write("usuario", rows)
+
+    # ---- Evaluaciones por instrumento ----
+    eval_id = _next_id(conn, "evaluacion", "evaluacion_id")
+    t_base = datetime.now().replace(microsecond=0) - timedelta(days=30)
+    remaining = evaluations
+    for iid in instrumentos:
+        ins = catalog[iid]
+        n_eval = min(per_instr, remaining)
+        remaining -= n_eval
+        if n_eval <= 0:
+            break
+        campana_id = _campana_activa(conn, iid)
+        evaluators = rng.choice(users, size=n_eval, replace=False)
+        for start in range(0, n_eval, chunk):
+            idx = evaluators[start:start + chunk]
+            e = idx.shape[0]
+            ids = np.arange(eval_id, eval_id + e)
+            eval_id += e
+
+            cluster_of = rng.integers(0, model.clusters, size=e)
+            lazy = rng.random(e) < identity_frac
+            submitted = rng.random(e) < submitted_frac
+            offsets = rng.integers(0, 30 * 24 * 3600, size=e)
+
+            ev_rows = []
+            for j in range(e):
+                rol_id, peso = role_rows[user_role[idx[j]]]
+                created = t_base + timedelta(seconds=int(offsets[j]))
+                sub = (created + timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:%S") if submitted[j] else "\\N"
+                ev_rows.append((int(ids[j]), iid, campana_id, user_id0 + int(idx[j]), rol_id, peso,
+                                "submitted" if submitted[j] else "draft",
+                                created.strftime("%Y-%m-%d %H:%M:%S"), sub))
+            writer.write("evaluacion", ev_rows)
+
+            cats = ins["categorias"]
+            cat_ranks = model.ranks((iid, None), len(cats), cluster_of, lazy)
+            writer.write("evaluacion_categoria", [
+                (int(ids[j]), iid, code, int(cat_ranks[j, c]))
+                for j in range(e) for c, code in enumerate(cats)
+            ])
+
+            # Borradores: solo un prefijo aleatorio de categorías con ítems guardados
+            cats_done = np.where(submitted, len(cats), rng.integers(0, len(cats) + 1, size=e))
+            for c, code in enumerate(cats):
+                has_items = cats_done > c
+                if not has_items.any():
+                    continue
+                rows = []
+                for group, item_ids in ins["items"][code].items():
+                    r = model.ranks((iid, code, group), len(item_ids), cluster_of, lazy)
+                    for j in np.nonzero(has_items)[0]:
+                        eid = int(ids[j])
+                        rows.extend(
+                            (eid, item_id, code, group, int(r[j, k]))
+                            for k, item_id in enumerate(item_ids)
+                        )
+                writer.write("evaluacion_item", rows)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Genera datos sintéticos de evaluación a gran escala.")
+    ap.add_argument("--database", default=os.getenv("BENCH_DB_NAME", "multicriterio_bench"))
+    ap.add_argument("--setup", action="store_true", help="crear esquema + sembrar catálogos antes")
+    ap.add_argument("--users", type=int, default=40000)
+    ap.add_argument("--evaluations", type=int, default=100000)
+    ap.add_argument("--instrumentos", default="", help="ids separados por coma (default: todos)")
+    ap.add_argument("--seed", type=int, default=2024)
+    ap.add_argument("--clusters", type=int, default=3, help="número de consensos distintos")
+    ap.add_argument("--noise", type=float, default=0.35,
+                    help="desviación del evaluador respecto a su consenso (0 = idéntico)")
+    ap.add_argument("--cluster-spread", type=float, default=0.25,
+                    help="separación entre consensos de clusters (0 = un solo consenso)")
+    ap.add_argument("--identity-frac", type=float, default=0.05,
+                    help="fracción de evaluadores que dejan el orden oficial")
+    ap.add_argument("--submitted-frac", type=float, default=0.9)
+    ap.add_argument("--out", default="", help="directorio para TSV + load.sql")
+    ap.add_argument("--direct", action="store_true", help="INSERT multi-fila directo a la BD")
+    ap.add_argument("--batch", type=int, default=5000, help="filas por INSERT en modo --direct")
+    ap.add_argument("--finalize", action="store_true",
+                    help="solo recalcular acumuladores (tras cargar load.sql)")
+    args = ap.parse_args(argv)
+
+    if args.finalize:
+        _finalize(args.database)
+        return
+    if not args.out and not args.direct:
+        ap.error("indica --out DIR y/o --direct")
+
+    if args.setup:
+        common.setup_database(args.database)
+
+    conn = common.connect(args.database)
+    t0 = time.perf_counter()
+    writer = Writer(args.out, conn if args.direct else None, args.batch)
+    try:
+        generate(
+            conn, writer, args.users, args.evaluations,
+            [int(x) for x in args.instrumentos.split(",") if x.strip()],
+            args.seed, args.clusters, args.noise, args.cluster_spread,
+            args.identity_frac, args.submitted_frac,
+        )
+    finally:
+        writer.close()
+        conn.close()
+    elapsed = time.perf_counter() - t0
+    print(", ".join(f"{t}={n}" for t, n in writer.counts.items()) + f" en {elapsed:.1f}s")
+
+    if args.direct:
+        _finalize(args.database)
+    else:
+        print(f"Tras cargar {os.path.join(args.out, 'load.sql')}, recalcular acumuladores con:")
+        print(f"  python -m bench.dataset --database {args.database} --finalize")
+
+
+def _finalize(database: str):
+    t0 = time.perf_counter()
+    res = common.rebuild_derived(database)
+    reparados = sum(1 for r in res if r["reparado"])
+    print(f"acumuladores: {len(res)} instrumentos, {reparados} recalculados "
+          f"en {time.perf_counter() - t0:.1f}s")
+    if any("empaquetados" in r for r in res):
+        print(f"evaluacion_item_packed: {sum(r['empaquetados'] for r in res)} paquetes")
+
+
+if __name__ == "__main__":
+    main()
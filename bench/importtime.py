@@ -0,0 +1,124 @@
+# bench/importtime.py
+# ------------------------------------------------------------
+# Presupuesto de arranque: mide cuánto tarda un proceso nuevo en tener
+# lista la app WSGI (import wsgi -> create_app), igual que un worker de
+# gunicorn al arrancar o al reciclarse.
+#
+# - Corre N procesos limpios con python -X importtime y toma la mediana.
+# - Falla (exit 1) si supera --budget-ms o si al arrancar se importó
+#   algo que debe ser perezoso (numpy, módulos de analítica) o se abrió
+#   el pool MySQL.
+# - Muestra los módulos más caros (tiempo acumulado).
+#
+# No necesita MySQL: justamente verifica que el arranque no lo toque.
+#
+# Ejemplo:
+#   python -m bench.importtime
+#   python -m bench.importtime --runs 7 --budget-ms 400 --top 25
+# ------------------------------------------------------------
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que no deben cargarse al arrancar (se importan bajo demanda)
+PEREZOSOS = (
+    "numpy",
+    "services.acuerdo",
+    "services.pares",
+    "services.plackett_luce",
+    "services.prioridades",
+    "services.rankings",
+)
+
+_SONDA = """
+import json, sys, time
+t0 = time.perf_counter()
+import wsgi
+t1 = time.perf_counter()
+import db
+print(json.dumps({"ms": (t1 - t0) * 1000.0, "pool": db._pool is not None,
+                  "modules": sorted(sys.modules)}))
+"""
+
+
+def _correr(log_dir: str) -> Tuple[Dict, List[Tuple[str, int, int]]]:
+    env = dict(os.environ)
+    env.update({
+        "LOG_FILE": os.path.join(log_dir, "app.log"),
+    })
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SONDA],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+    if p.returncode != 0:
+        raise SystemExit(f"falló el arranque:\n{p.stderr[-4000:]}")
+    res = json.loads(p.stdout.strip().splitlines()[-1])
+
+    tiempos = []
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            head, cum_us, name = line.split("|", 2)
+            self_us = int(head.split(":", 1)[1])
+            cum_us = int(cum_us)
+        except ValueError:
+            continue
+        name = name.strip()
+        tiempos.append((name, self_us, cum_us))
+    return res, tiempos
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Presupuesto de tiempo de arranque (import wsgi).")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("BENCH_IMPORT_BUDGET_MS", "500")))
+    ap.add_argument("--top", type=int, default=15, help="módulos más caros a mostrar")
+    args = ap.parse_args(argv)
+
+    ms = []
+    ultimo: Tuple[Dict, List] = ({}, [])
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Primera corrida descartada: calienta caché de bytecode y de disco
+        _correr(log_dir)
+        for _ in range(max(1, args.runs)):
+            ultimo = _correr(log_dir)
+            ms.append(ultimo[0]["ms"])
+
+    res, tiempos = ultimo
+    mediana = statistics.median(ms)
+    print(f"import wsgi: mediana {mediana:.1f} ms  (min {min(ms):.1f}, max {max(ms):.1f}, runs={len(ms)})")
+    print(f"presupuesto: {args.budget_ms:.0f} ms")
+    print()
+    print(f"{'módulo':<48} {'self ms':>9} {'acum ms':>9}")
+    for name, self_us, cum_us in sorted(tiempos, key=lambda t: -t[2])[: args.top]:
+        print(f"{name:<48} {self_us / 1000:>9.1f} {cum_us / 1000:>9.1f}")
+
+    fallas = []
+    if mediana > args.budget_ms:
+        fallas.append(f"arranque {mediana:.1f} ms > {args.budget_ms:.0f} ms")
+    cargados = set(res["modules"])
+    for mod in PEREZOSOS:
+        if mod in cargados:
+            fallas.append(f"{mod} se importa al arrancar (debe ser perezoso)")
+    if res["pool"]:
+        fallas.append("el pool MySQL se abrió al arrancar")
+
+    print()
+    if fallas:
+        for f in fallas:
+            print(f"FALLA: {f}")
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
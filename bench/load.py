@@ -0,0 +1,250 @@
+# bench/load.py
+# ------------------------------------------------------------
+# Benchmark de carga reproducible contra una instancia corriendo
+# (python app.py o gunicorn wsgi:application) con MySQL/MariaDB local.
+#
+# Flujo por evaluador sintético (flujo completo del wizard):
+#   POST /login
+#   por instrumento:
+#     POST /api/evaluacion/<instrumento_id>/init
+#     GET  /api/catalogo/<instrumento_id>/categorias
+#     POST /api/evaluacion/<evaluacion_id>/categorias
+#     por categoría:
+#       GET  /api/catalogo/<instrumento_id>/items/<categoria_code>
+#       POST /api/evaluacion/<evaluacion_id>/items/<categoria_code>
+#     POST /api/evaluacion/<evaluacion_id>/submit
+# Admin (en paralelo, --admin-rounds vueltas):
+#   GET /api/admin/instruments, GET /api/admin/results/<instrumento_id>
+#
+# Reporta throughput global y p50/p95/p99 por endpoint.
+#
+# Ejemplo (BD de benchmark aparte, creada desde sql/):
+#   python -m bench.load --setup --drop --evaluators 200 --concurrency 16
+#   (BD por defecto: multicriterio_bench, o BENCH_DB_NAME; el servidor debe
+#    correr con DB_NAME apuntando a esa misma BD)
+#
+# Nota: el SQL de la app es dialecto MySQL (%s, NOW(), ENUM, ON DUPLICATE
+# KEY), por eso el benchmark corre contra MySQL/MariaDB local y no SQLite.
+# ------------------------------------------------------------
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import common
+
+
+class Stats:
+    """Latencias por endpoint (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, label: str, elapsed: float, ok: bool):
+        with self._lock:
+            self.samples.setdefault(label, []).append(elapsed)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def report(self, wall: float) -> dict:
+        out = {"wall_s": round(wall, 3), "endpoints": {}}
+        total = 0
+        for label, vals in sorted(self.samples.items()):
+            vals = sorted(vals)
+            total += len(vals)
+            out["endpoints"][label] = {
+                "count": len(vals),
+                "errors": self.errors.get(label, 0),
+                "rps": round(len(vals) / wall, 2) if wall else None,
+                "p50_ms": round(_percentile(vals, 50) * 1000, 2),
+                "p95_ms": round(_percentile(vals, 95) * 1000, 2),
+                "p99_ms": round(_percentile(vals, 99) * 1000, 2),
+                "max_ms": round(vals[-1] * 1000, 2),
+            }
+        out["requests"] = total
+        out["rps"] = round(total / wall, 2) if wall else None
+        return out
+
+
+def _percentile(sorted_vals, pct: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+class Client:
+    """Cliente HTTP con cookies de sesión (un cliente por usuario virtual)."""
+
+    def __init__(self, base_url: str, stats: Stats, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.stats = stats
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, label: str, method: str, path: str, body=None, form=None):
+        headers = {}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode("utf-8")
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+
+        t0 = time.perf_counter()
+        status = 0
+        payload = b""
+        try:
+            with self.opener.open(req, timeout=self.timeout) as res:
+                status = res.status
+                payload = res.read()
+        except urllib.error.HTTPError as e:
+            status = e.code
+            payload = e.read()
+        except (urllib.error.URLError, OSError):
+            status = 0
+        elapsed = time.perf_counter() - t0
+        self.stats.add(label, elapsed, 200 <= status < 400)
+
+        if payload and status and 200 <= status < 300:
+            try:
+                return json.loads(payload)
+            except ValueError:
+                return None
+        return None
+
+    def login(self, username: str):
+        self.request("POST /login", "POST", "/login",
+                     form={"username": username, "password": common.BENCH_PASSWORD})
+
+
+def run_evaluator(base_url, username, catalog, instrumentos, stats, seed, timeout):
+    rng = random.Random(seed)
+    c = Client(base_url, stats, timeout)
+    c.login(username)
+    for iid in instrumentos:
+        ins = catalog[iid]
+        init = c.request("POST /api/evaluacion/<id>/init", "POST", f"/api/evaluacion/{iid}/init", body={})
+        if not init:
+            continue
+        eid = init["evaluacion_id"]
+        c.request("GET /api/catalogo/<id>/categorias", "GET", f"/api/catalogo/{iid}/categorias")
+        c.request("POST /api/evaluacion/<id>/categorias", "POST", f"/api/evaluacion/{eid}/categorias",
+                  body=common.categorias_payload(ins["categorias"], rng))
+        for code in ins["categorias"]:
+            c.request("GET /api/catalogo/<id>/items/<code>", "GET", f"/api/catalogo/{iid}/items/{code}")
+            c.request("POST /api/evaluacion/<id>/items/<code>", "POST", f"/api/evaluacion/{eid}/items/{code}",
+                      body=common.items_payload(ins["items"][code], rng))
+        c.request("POST /api/evaluacion/<id>/submit", "POST", f"/api/evaluacion/{eid}/submit", body={})
+
+
+def run_admin(base_url, instrumentos, rounds, stats, timeout, stop_event):
+    c = Client(base_url, stats, timeout)
+    c.login(common.BENCH_ADMIN_USER)
+    done = 0
+    while done < rounds and not stop_event.is_set():
+        c.request("GET /api/admin/instruments", "GET", "/api/admin/instruments")
+        for iid in instrumentos:
+            c.request("GET /api/admin/results/<id>", "GET", f"/api/admin/results/{iid}")
+        done += 1
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de carga del wizard y resultados admin.")
+    ap.add_argument("--base-url", default=os.getenv("BENCH_BASE_URL", "http://127.0.0.1:5000"))
+    ap.add_argument("--database", default=os.getenv("BENCH_DB_NAME", "multicriterio_bench"),
+                    help="BD usada para sembrar/limpiar (debe ser la misma que usa el servidor)")
+    ap.add_argument("--setup", action="store_true", help="crear esquema + sembrar sql/1x_seed_*.sql")
+    ap.add_argument("--drop", action="store_true", help="con --setup: DROP DATABASE antes de crear")
+    ap.add_argument("--evaluators", type=int, default=50)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--admins", type=int, default=1, help="usuarios admin concurrentes")
+    ap.add_argument("--admin-rounds", type=int, default=20)
+    ap.add_argument("--instrumentos", default="", help="ids separados por coma (default: todos)")
+    ap.add_argument("--seed", type=int, default=12345)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--no-reset", action="store_true", help="no borrar evaluaciones bench_* previas")
+    ap.add_argument("--json", dest="json_out", default="", help="guardar reporte JSON en este archivo")
+    args = ap.parse_args(argv)
+
+    if args.setup:
+        common.setup_database(args.database, drop=args.drop)
+
+    admin_role = os.getenv("ADMIN_ROLE_NAME", "ADMIN")
+    conn = common.connect(args.database)
+    try:
+        roles = common.ensure_roles(conn, admin_role)
+        users = common.ensure_users(conn, args.evaluators, roles, admin_role)
+        if not args.no_reset:
+            common.reset_evaluations(conn)
+        catalog = common.load_catalog(conn)
+    finally:
+        conn.close()
+    if not args.no_reset:
+        # Las evaluaciones borradas seguían sumadas en agregado_*
+        common.rebuild_derived(args.database)
+
+    instrumentos = [int(x) for x in args.instrumentos.split(",") if x.strip()] or sorted(catalog)
+    stats = Stats()
+    stop_event = threading.Event()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.admins)) as admin_pool:
+        admin_futs = [
+            admin_pool.submit(run_admin, args.base_url, instrumentos, args.admin_rounds,
+                              stats, args.timeout, stop_event)
+            for _ in range(args.admins)
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+            futs = [
+                pool.submit(run_evaluator, args.base_url, u, catalog, instrumentos,
+                            stats, args.seed + i, args.timeout)
+                for i, u in enumerate(users)
+            ]
+            for f in futs:
+                f.result()
+        stop_event.set()
+        for f in admin_futs:
+            f.result()
+    wall = time.perf_counter() - t0
+
+    report = stats.report(wall)
+    report["config"] = {
+        "evaluators": args.evaluators,
+        "concurrency": args.concurrency,
+        "admins": args.admins,
+        "instrumentos": instrumentos,
+        "seed": args.seed,
+    }
+    _print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+def _print_report(report: dict):
+    print(f"{'endpoint':<42} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for label, r in report["endpoints"].items():
+        print(f"{label:<42} {r['count']:>7} {r['errors']:>5} {r['rps']:>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}")
+    print(f"total: {report['requests']} requests en {report['wall_s']}s -> {report['rps']} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,28 @@
 # - Compatible con Windows (sin MySQLdb/mysqlclient)
 # - Usa mysql.connector + pooling
 # - Mantiene API: query_one, query_all, execute, executemany, commit, rollback
+# - Una conexión del pool por hilo (request); se regresa al pool en el
+#   teardown de la app (release_connection)
+# - Pool único del proceso, creado en la primera consulta (importar este
+#   módulo no abre conexiones). Las variables DB_* las carga el punto de
+#   entrada (app.py / wsgi.py / gunicorn.conf.py con load_dotenv; los
+#   CLI como services/agregados.py y tools/ lo hacen antes de importar db).
+# - transaccion(fn): reintenta deadlocks (1213) y lock wait timeouts (1205)
+#   con backoff + jitter y un presupuesto de reintentos por proceso;
+#   métricas en tx_stats() (expuestas en /health).
 # ------------------------------------------------------------
 
 import os
+import time
+import random
 import logging
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
 
-from dotenv import load_dotenv
 import mysql.connector
 from mysql.connector import pooling, Error as MySQLError
+from mysql.connector.errors import PoolError
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 # -----------------------------
@@ -34,13 +45,28 @@ DB_CONFIG = {
 
 _POOL_NAME = os.getenv("DB_POOL_NAME", "multicriterio_pool")
 _POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+# Espera máxima por una conexión libre cuando el pool está agotado
+_POOL_WAIT_SECONDS = float(os.getenv("DB_POOL_WAIT_SECONDS", "10"))
 
 _pool: Optional[pooling.MySQLConnectionPool] = None
 
-# Conexión "actual" (simple, global por proceso)
-# Nota: esto funciona bien para desarrollo. Para producción multi-thread,
-# lo ideal es usar conexión por request (podemos hacerlo después).
-_conn = None
+# Reintentos de transacción (ver transaccion)
+_TRANSITORIOS = {1213: "deadlock", 1205: "lock_wait_timeout"}
+_TX_REINTENTOS = int(os.getenv("DB_TX_RETRIES", "3"))
+_TX_BACKOFF = float(os.getenv("DB_TX_BACKOFF", "0.02"))
+_TX_ESPERA_MAX = float(os.getenv("DB_TX_MAX_WAIT", "1.0"))
+# Presupuesto por proceso: cada transacción deposita RATIO reintentos y
+# hay un piso de MIN_POR_SEG por segundo; evita tormentas de reintentos
+_TX_RATIO = float(os.getenv("DB_TX_RETRY_RATIO", "0.2"))
+_TX_MIN_POR_SEG = float(os.getenv("DB_TX_RETRY_MIN_PER_SEC", "5"))
+
+# Conexión "actual" por hilo: cada request (hilo de gunicorn/werkzeug) usa
+# su propia conexión del pool y la regresa al terminar (release_connection).
+_local = threading.local()
+
+# Pools heredados por fork que no deben cerrarse ni recolectarse en el hijo
+# (ver descartar_pool)
+_heredados: List[Any] = []
 
 
 def _init_pool() -> pooling.MySQLConnectionPool:
@@ -66,22 +92,42 @@ def _init_pool() -> pooling.MySQLConnectionPool:
         raise
 
 
+def _checkout(pool):
+    """pool.get_connection() con espera acotada si el pool está agotado."""
+    deadline = time.monotonic() + _POOL_WAIT_SECONDS
+    delay = 0.005
+    while True:
+        try:
+            return pool.get_connection()
+        except PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+
 def get_connection():
     """
-    Regresa una conexión reutilizable. Para desarrollo, mantenemos una conexión
-    global abierta y la reutilizamos. Si se cae, se recrea.
+    Regresa la conexión del hilo actual (la toma del pool en el primer uso).
+    Si se cae, se recrea.
     """
-    global _conn
-    if _conn is not None:
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
         try:
-            if _conn.is_connected():
-                return _conn
+            if conn.is_connected():
+                return conn
         except Exception:
-            _conn = None
+            pass
+        release_connection()
 
     pool = _init_pool()
-    _conn = pool.get_connection()
-    return _conn
+    _local.conn = _checkout(pool)
+    return _local.conn
+
+
+def nueva_conexion():
+    """Conexión del pool independiente de la del hilo (el llamador la cierra)."""
+    return _checkout(_init_pool())
 
 
 def _cursor(dictionary: bool = True):
@@ -102,8 +148,8 @@ def query_one(sql: str, params: Optional[Sequence[Any]] = None) -> Optional[Dict
         cur.execute(sql, params or ())
         row = cur.fetchone()
         return row
-    except MySQLError:
-        logger.exception("DB query_one error")
+    except MySQLError as e:
+        _log_error("DB query_one error", e)
         raise
     finally:
         if cur is not None:
@@ -123,8 +169,8 @@ def query_all(sql: str, params: Optional[Sequence[Any]] = None) -> List[Dict[str
         cur.execute(sql, params or ())
         rows = cur.fetchall()
         return rows or []
-    except MySQLError:
-        logger.exception("DB query_all error")
+    except MySQLError as e:
+        _log_error("DB query_all error", e)
         raise
     finally:
         if cur is not None:
@@ -150,8 +196,8 @@ def execute(sql: str, params: Optional[Sequence[Any]] = None) -> int:
         if last_id:
             return int(last_id)
         return int(cur.rowcount)
-    except MySQLError:
-        logger.exception("DB execute error")
+    except MySQLError as e:
+        _log_error("DB execute error", e)
         raise
     finally:
         if cur is not None:
@@ -171,8 +217,8 @@ def executemany(sql: str, seq_params: Sequence[Sequence[Any]]) -> int:
         cur = _cursor(dictionary=False)
         cur.executemany(sql, seq_params)
         return int(cur.rowcount)
-    except MySQLError:
-        logger.exception("DB executemany error")
+    except MySQLError as e:
+        _log_error("DB executemany error", e)
         raise
     finally:
         if cur is not None:
@@ -206,14 +252,173 @@ def rollback():
         raise
 
 
-def close_connection():
+# -----------------------------
+# Transacciones con reintento
+# -----------------------------
+T = TypeVar("T")
+
+
+def es_transitorio(exc: BaseException) -> bool:
+    """Deadlock (1213) o lock wait timeout (1205): reintentar es seguro."""
+    return getattr(exc, "errno", None) in _TRANSITORIOS
+
+
+def _log_error(msg: str, exc: BaseException):
+    # Los transitorios se reintentan: sin traceback completo en cada intento
+    if es_transitorio(exc):
+        logger.warning("%s (transitorio errno=%s): %s", msg, getattr(exc, "errno", None), exc)
+    else:
+        logger.exception(msg)
+
+
+class _Presupuesto:
+    def __init__(self, ratio: float, min_por_seg: float, tope: float = 100.0):
+        self.ratio = ratio
+        self.min_por_seg = min_por_seg
+        self.tope = tope
+        self._saldo = tope
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def depositar(self):
+        with self._lock:
+            self._saldo = min(self.tope, self._saldo + self.ratio)
+
+    def retirar(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._saldo = min(self.tope, self._saldo + (now - self._t) * self.min_por_seg)
+            self._t = now
+            if self._saldo >= 1.0:
+                self._saldo -= 1.0
+                return True
+            return False
+
+
+_presupuesto = _Presupuesto(_TX_RATIO, _TX_MIN_POR_SEG)
+_tx_lock = threading.Lock()
+_tx_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _contar(nombre: str, campo: str):
+    with _tx_lock:
+        st = _tx_stats.setdefault(nombre, {
+            "transacciones": 0, "reintentos_deadlock": 0, "reintentos_lock_wait_timeout": 0,
+            "exito_tras_reintento": 0, "agotados": 0, "sin_presupuesto": 0,
+        })
+        st[campo] += 1
+
+
+def transaccion(fn: Callable[[], T], nombre: str = "tx") -> T:
     """
-    Cierra la conexión global (útil en shutdown).
+    Ejecuta fn() (consultas sin commit sobre la conexión del hilo) y hace
+    commit. Ante deadlock/lock wait timeout: rollback, espera con backoff
+    exponencial y jitter completo, y vuelve a ejecutar fn() desde cero (con
+    snapshot nuevo). Cualquier otro error hace rollback y se propaga.
+
+    fn debe ser re-ejecutable: todo su efecto debe ocurrir dentro de la
+    transacción (los efectos externos, p.ej. notificar, van después).
     """
-    global _conn
-    if _conn is not None:
+    _contar(nombre, "transacciones")
+    _presupuesto.depositar()
+    intento = 0
+    while True:
         try:
-            _conn.close()
-        except Exception:
-            pass
-        _conn = None
+            out = fn()
+            commit()
+            if intento:
+                _contar(nombre, "exito_tras_reintento")
+            return out
+        except MySQLError as e:
+            conn = getattr(_local, "conn", None)
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            if not es_transitorio(e):
+                raise
+            if intento >= _TX_REINTENTOS:
+                _contar(nombre, "agotados")
+                raise
+            if not _presupuesto.retirar():
+                _contar(nombre, "sin_presupuesto")
+                raise
+            intento += 1
+            _contar(nombre, "reintentos_" + _TRANSITORIOS[e.errno])
+            espera = random.uniform(0, min(_TX_ESPERA_MAX, _TX_BACKOFF * (2 ** intento)))
+            logger.info("Reintento %s/%s de %s tras errno=%s (%.0f ms)",
+                        intento, _TX_REINTENTOS, nombre, e.errno, espera * 1000)
+            time.sleep(espera)
+
+
+def tx_stats() -> Dict[str, Dict[str, int]]:
+    """Contadores de transacciones/reintentos por nombre (proceso actual)."""
+    with _tx_lock:
+        return {k: dict(v) for k, v in _tx_stats.items()}
+
+
+def release_connection():
+    """
+    Regresa la conexión del hilo actual al pool (fin de request).
+    Descarta cualquier transacción no confirmada.
+    """
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is None:
+        return
+    try:
+        conn.rollback()
+    except Exception:
+        pass
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def descartar_pool(pool, cerrar: bool = True):
+    """
+    Suelta un pool de conexiones.
+    - cerrar=True: cierra sus conexiones libres (master de gunicorn antes
+      del fork, para que ningún socket quede compartido entre workers).
+    - cerrar=False: solo suelta la referencia (worker recién forkeado): los
+      sockets son del padre y cerrarlos mandaría COM_QUIT por una conexión
+      ajena, así que se retienen sin usarlos para que el GC no los cierre.
+    """
+    if pool is None:
+        return
+    if not cerrar:
+        _heredados.append(pool)
+        return
+    try:
+        pool._remove_connections()
+    except Exception:
+        logger.exception("Error al cerrar conexiones del pool %s", getattr(pool, "pool_name", "?"))
+
+
+def reset_pool(cerrar: bool = True):
+    """
+    Descarta el pool del proceso y la conexión del hilo actual; el siguiente
+    get_connection() crea uno nuevo. Ver descartar_pool() para `cerrar`.
+    """
+    global _pool, _local
+    pool, _pool = _pool, None
+    conn = getattr(_local, "conn", None)
+    _local = threading.local()
+    if conn is not None:
+        if cerrar:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        else:
+            _heredados.append(conn)
+    descartar_pool(pool, cerrar)
+
+
+def close_connection():
+    """
+    Cierra la conexión del hilo actual (útil en shutdown).
+    """
+    release_connection()
@@ -0,0 +1,101 @@
+# gunicorn.conf.py
+# ------------------------------------------------------------
+# Configuración de producción para gunicorn (se carga sola desde la raíz):
+#   gunicorn                      (usa wsgi:application)
+#   APP_PREFIX=multicriterio_ipepd gunicorn
+#
+# - preload_app: la app (create_app en wsgi.py) se importa una vez en el
+#   master y los workers la comparten por copy-on-write.
+# - when_ready (master, antes de forkear): calienta el catálogo de
+#   instrumentos/categorías/ítems (services/catalogo.py) y cierra el pool
+#   MySQL para que ningún socket quede compartido entre workers.
+# - post_fork (cada worker): pool nuevo (perezoso, en la primera consulta)
+#   y un hilo escritor de logs nuevo (los hilos no sobreviven al fork).
+# - Reciclaje de workers cada GUNICORN_MAX_REQUESTS (+ jitter) requests.
+#
+# Variables (todas opcionales): GUNICORN_BIND, GUNICORN_WORKERS,
+# GUNICORN_THREADS, GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER,
+# GUNICORN_TIMEOUT, GUNICORN_WARM (1/0).
+# ------------------------------------------------------------
+
+import logging
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_cpus = multiprocessing.cpu_count()
+
+wsgi_app = "wsgi:application"
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:5000")
+
+# gthread: las vistas esperan MySQL (I/O) y los SSE mantienen un hilo
+# ocupado; con hilos se atiende más concurrencia por worker.
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS") or min(_cpus * 2 + 1, 9))
+threads = int(os.getenv("GUNICORN_THREADS") or max(2, min(_cpus * 2, 8)))
+
+# Cada stream SSE (/api/admin/results/<id>/stream) ocupa un hilo hasta
+# SSE_MAX_SECONDS: como máximo la mitad de los hilos del worker; los demás
+# streams reciben 503 + Retry-After (services/eventos.py).
+os.environ.setdefault("SSE_MAX_STREAMS", str(max(1, threads // 2)))
+
+# Control de admisión (services/admision.py): sus límites por defecto salen
+# de los hilos del worker (guardados threads // 2 + threads // 4 en cola,
+# analítica threads // 4), no de DB_POOL_SIZE, que se ajusta abajo.
+os.environ["GUNICORN_THREADS"] = str(threads)
+
+# Un hilo = una conexión del pool (db.py): el pool debe alcanzar para todos
+# los hilos del worker. Se ajusta antes de importar la app (preload).
+if int(os.getenv("DB_POOL_SIZE") or 0) < threads + 1:
+    os.environ["DB_POOL_SIZE"] = str(threads + 1)
+
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER") or max_requests // 10)
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Heartbeat de workers en memoria (evita bloqueos por disco lento en /tmp)
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+errorlog = "-"
+loglevel = (os.getenv("LOG_LEVEL") or "info").lower()
+
+_WARM = os.getenv("GUNICORN_WARM", "1") == "1"
+
+
+def when_ready(server):
+    """Master, antes de forkear: calentar catálogo y cerrar el pool."""
+    import db
+    from services import catalogo
+
+    log = logging.getLogger("gunicorn.conf")
+    if _WARM:
+        try:
+            ins = catalogo.instrumentos()
+            for i in ins:
+                catalogo.obtener(i["instrumento_id"])
+            log.info("Catálogo precargado: %s instrumentos", len(ins))
+        except Exception:
+            # Sin MySQL al arrancar: los workers lo cargarán bajo demanda
+            log.exception("No se pudo precargar el catálogo")
+
+    db.reset_pool(cerrar=True)
+
+
+def post_fork(server, worker):
+    """Worker recién creado: pool y escritor de logs propios."""
+    import db
+    from services import log_async
+
+    log_async.reiniciar_tras_fork()
+    db.reset_pool(cerrar=False)
+    server.log.info("Worker %s listo (threads=%s, pool=%s)", worker.pid, threads,
+                    os.environ.get("DB_POOL_SIZE"))
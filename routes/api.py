@@ -11,15 +11,38 @@
 #   GET  /api/evaluacion/<evaluacion_id>/resumen
 #   POST /api/evaluacion/<evaluacion_id>/submit
 #   POST /api/admin/evaluacion/<evaluacion_id>/reopen
+#   GET  /api/admin/instruments/overview
+#   GET  /api/admin/progress
+#   GET  /api/admin/results/<instrumento_id>/agregados
+#   POST /api/admin/results/<instrumento_id>/reconciliar
+#   GET  /api/admin/results/<instrumento_id>/stream   (SSE)
+#   GET  /api/admin/results/<instrumento_id>/acuerdo
+#   GET  /api/admin/results/<instrumento_id>/pares
+#   GET  /api/admin/results/<instrumento_id>/plackett-luce
+#   GET  /api/admin/results/<instrumento_id>/prioridades
 #
 # Notas clave:
 # - "submitted" es solo lectura para usuario normal; admin puede reabrir.
 # - Guardado idempotente: DELETE + INSERT (en transacción).
 # - Restricciones UNIQUE en DB aseguran no repetición de ranks.
+# - submit/reopen (y ediciones admin de evaluaciones submitted) publican
+#   deltas a los acumuladores de services/agregados.py en la misma transacción.
+# - Guardados, submit y reopen corren en db.transaccion: deadlocks y lock
+#   wait timeouts se reintentan; si se agotan -> 503 con Retry-After.
+# - Guardados y submit aceptan Idempotency-Key (services/idempotencia.py):
+#   un reintento con la misma clave recibe la respuesta original.
+# - DIARIO_WRITE_BEHIND=1: guardados de borrador van al diario local
+#   (services/diario.py) y se vacían a MySQL en segundo plano; init,
+#   resumen, submit y los guardados síncronos vacían antes lo pendiente;
+#   submit marca antes la evaluación para que el diario deje de aceptarla.
 # ------------------------------------------------------------
 
-from flask import Blueprint, jsonify, request, session, current_app
-from db import query_one, query_all, execute, executemany, commit, rollback
+import math
+import sqlite3
+
+from flask import Blueprint, Response, jsonify, request, session, current_app, stream_with_context
+from db import query_one, query_all, execute, executemany, commit, rollback, transaccion, es_transitorio
+from services import agregados, cache_resultados, campanas, catalogo, codec_ranking, diario, eventos, idempotencia, validacion
 
 bp = Blueprint("api", __name__)
 
@@ -47,6 +70,36 @@ def _json_error(msg: str, code: int = 400, extra=None):
     return jsonify(payload), code
 
 
+def _json_transitorio(msg: str):
+    """Conflicto de locks que persistió tras los reintentos: el cliente puede reintentar."""
+    resp, code = _json_error(msg, 503, {"transitorio": True})
+    resp.headers["Retry-After"] = "1"
+    return resp, code
+
+
+def _sincronizar_diario(evaluacion_id: int, msg: str):
+    """
+    Vacía lo pendiente del diario antes de un guardado síncrono. Si falla el
+    propio diario (SQLite) se registra y se sigue con la escritura síncrona;
+    un error de MySQL se responde como cualquier error del guardado.
+    """
+    try:
+        diario.sincronizar(evaluacion_id)
+    except sqlite3.Error:
+        current_app.logger.exception("Diario: no se pudo sincronizar %s; guardado síncrono", evaluacion_id)
+    except Exception as e:
+        rollback()
+        if es_transitorio(e):
+            return _json_transitorio(msg)
+        return _json_error(msg, 500)
+    return None
+
+
+def _json_errores(errores, code: int = 400):
+    """Error de validación con la lista completa; "error" = primer código (compatibilidad)."""
+    return _json_error(errores[0]["error"], code, {"errores": errores})
+
+
 def _is_duplicate_error(exc: Exception) -> bool:
     # MySQLdb IntegrityError -> args: (1062, "Duplicate entry ...")
     try:
@@ -91,14 +144,6 @@ def _snapshot_role(usuario_id: int):
     return int(row["rol_id"]), int(row["peso"])
 
 
-def _count_categorias(instrumento_id: int) -> int:
-    row = query_one(
-        "SELECT COUNT(*) AS total FROM categoria WHERE instrumento_id=%s AND is_active=1",
-        (instrumento_id,)
-    )
-    return int(row["total"]) if row else 0
-
-
 def _categoria_code_por_orden(instrumento_id: int, orden: int):
     row = query_one(
         "SELECT categoria_code FROM categoria "
@@ -108,6 +153,27 @@ def _categoria_code_por_orden(instrumento_id: int, orden: int):
     return row["categoria_code"] if row else None
 
 
+def _items_guardados_por_categoria(evaluacion_id: int):
+    """{categoria_code: nº de ítems guardados} de la evaluación."""
+    rows = query_all(
+        "SELECT categoria_code, COUNT(*) AS total FROM evaluacion_item "
+        "WHERE evaluacion_id=%s GROUP BY categoria_code",
+        (evaluacion_id,)
+    )
+    return {r["categoria_code"]: int(r["total"]) for r in rows}
+
+
+def _cached_json(key, huella, build):
+    """
+    Respuesta JSON desde la caché de resultados (pre-serializada); build()
+    se ejecuta una sola vez por clave+huella aunque lleguen N requests.
+    """
+    body, estado = cache_resultados.cache.obtener(
+        key, huella, lambda: current_app.json.dumps(build()) + "\n"
+    )
+    return Response(body, mimetype="application/json", headers={"X-Cache": estado})
+
+
 # =========================
 # Catálogo
 # =========================
@@ -151,7 +217,8 @@ def catalogo_items(instrumento_id: int, categoria_code: str):
 @bp.post("/evaluacion/<int:instrumento_id>/init")
 def init_evaluacion(instrumento_id: int):
     """
-    Crea o recupera evaluación para (usuario_id, instrumento_id).
+    Crea o recupera evaluación para (usuario_id, instrumento_id) en la
+    campaña activa del instrumento.
     Devuelve:
       - evaluacion_id
       - status
@@ -171,13 +238,21 @@ def init_evaluacion(instrumento_id: int):
     if not ins:
         return _json_error("instrumento_not_found", 404)
 
-    # Buscar evaluación existente
+    try:
+        camp = campanas.activa(instrumento_id)
+    except Exception:
+        return _json_error("db_error_init", 500)
+    campana_id = int(camp["campana_id"])
+
+    # Buscar evaluación existente (solo en la campaña activa)
     ev = query_one(
-        "SELECT evaluacion_id, status FROM evaluacion WHERE usuario_id=%s AND instrumento_id=%s",
-        (uid, instrumento_id)
+        "SELECT evaluacion_id, status FROM evaluacion "
+        "WHERE usuario_id=%s AND instrumento_id=%s AND campana_id=%s",
+        (uid, instrumento_id, campana_id)
     )
 
-    total_cats = _count_categorias(instrumento_id)
+    cat = catalogo.obtener(instrumento_id)
+    total_cats = cat.total_categorias
 
     if not ev:
         snap = _snapshot_role(uid)
@@ -186,19 +261,26 @@ def init_evaluacion(instrumento_id: int):
 
         rol_id_snap, peso_snap = snap
         try:
+            # Lectura con lock compartido de la campaña: si se está cerrando,
+            # espera y no inserta en una campaña ya archivada
             eval_id = execute(
-                "INSERT INTO evaluacion (instrumento_id, usuario_id, rol_id_snapshot, rol_peso_snapshot, status) "
-                "VALUES (%s,%s,%s,%s,'draft')",
-                (instrumento_id, uid, rol_id_snap, peso_snap)
+                "INSERT INTO evaluacion "
+                "  (instrumento_id, campana_id, usuario_id, rol_id_snapshot, rol_peso_snapshot, status) "
+                "SELECT %s, campana_id, %s, %s, %s, 'draft' FROM campana "
+                "WHERE campana_id=%s AND status='activa' LOCK IN SHARE MODE",
+                (instrumento_id, uid, rol_id_snap, peso_snap, campana_id)
             )
             commit()
-            ev = {"evaluacion_id": eval_id, "status": "draft"}
         except Exception:
             rollback()
             return _json_error("db_error_init", 500)
+        if not eval_id:
+            return _json_error("campana_cerrada", 409)
+        ev = {"evaluacion_id": eval_id, "status": "draft"}
 
     evaluacion_id = int(ev["evaluacion_id"])
     status = ev["status"]
+    diario.sincronizar(evaluacion_id)
 
     # Determinar siguiente paso:
     # 1) si no hay ranking de categorías -> categorias
@@ -218,34 +300,15 @@ def init_evaluacion(instrumento_id: int):
             "next_step": next_step
         })
 
-    # categorías ya completas, buscar primera categoría incompleta en ítems
-    # calculamos por catálogo cuántos ítems tiene cada categoría y comparamos con evaluacion_item
-    cats = query_all(
-        "SELECT categoria_code, orden FROM categoria WHERE instrumento_id=%s AND is_active=1 ORDER BY orden",
-        (instrumento_id,)
-    )
+    # categorías ya completas, buscar primera categoría incompleta en ítems:
+    # ítems esperados por categoría (main + sub-ítems) desde el índice del
+    # catálogo vs ítems guardados (una sola consulta agrupada)
+    saved = _items_guardados_por_categoria(evaluacion_id)
 
-    for c in cats:
+    for c in cat.categorias:
         code = c["categoria_code"]
-        orden = int(c["orden"])
-
-        # Total rankeable items (main items + sub-items) for this category
-        total_items = query_one(
-            "SELECT COUNT(*) AS total FROM item WHERE instrumento_id=%s AND categoria_code=%s AND is_active=1",
-            (instrumento_id, code)
-        )["total"]
-
-        # Count only items that are NOT parent-headers (i.e. items with no children)
-        # Parent-headers have children, so they are still ranked in the main group.
-        # Actually all items get ranked, so total_items is correct.
-
-        saved_items = query_one(
-            "SELECT COUNT(*) AS total FROM evaluacion_item WHERE evaluacion_id=%s AND categoria_code=%s",
-            (evaluacion_id, code)
-        )["total"]
-
-        if int(saved_items) < int(total_items):
-            next_step = {"view": "items", "categoria_orden": orden}
+        if saved.get(code, 0) < cat.items_por_categoria[code]:
+            next_step = {"view": "items", "categoria_orden": c["orden"]}
             break
     else:
         next_step = {"view": "resumen"}
@@ -263,6 +326,7 @@ def init_evaluacion(instrumento_id: int):
 # =========================
 
 @bp.post("/evaluacion/<int:evaluacion_id>/categorias")
+@idempotencia.idempotente
 def guardar_ranking_categorias(evaluacion_id: int):
     if not _require_login():
         return _json_error("unauthorized", 401)
@@ -279,42 +343,47 @@ def guardar_ranking_categorias(evaluacion_id: int):
         return _json_error("evaluacion_submitted_readonly", 403)
 
     data = request.get_json(silent=True) or {}
-    ranks = data.get("ranks", [])
-
-    if not isinstance(ranks, list) or len(ranks) == 0:
-        return _json_error("payload_invalid", 400)
-
     instrumento_id = int(ev["instrumento_id"])
 
-    # Validar que todas las categorías existan y pertenezcan al instrumento
-    valid_codes = {r["categoria_code"] for r in query_all(
-        "SELECT categoria_code FROM categoria WHERE instrumento_id=%s AND is_active=1",
-        (instrumento_id,)
-    )}
-
-    # Normalizar y validar
-    rows = []
-    for r in ranks:
-        code = (r.get("categoria_code") or "").strip()
-        val = r.get("rank_value")
-        if not code or not isinstance(val, int):
-            return _json_error("payload_invalid_rank", 400)
-        if code not in valid_codes:
-            return _json_error("categoria_invalida", 400, {"categoria_code": code})
-        if val < 1:
-            return _json_error("rank_value_min_1", 400, {"categoria_code": code})
-        rows.append((evaluacion_id, instrumento_id, code, val))
+    # Validación completa en memoria contra el catálogo (todas las categorías, ranks 1..K)
+    rows, errores = validacion.validar_categorias(
+        catalogo.obtener(instrumento_id), evaluacion_id, data.get("ranks")
+    )
+    if errores:
+        return _json_errores(errores)
+
+    # Write-behind: borrador del propio evaluador -> diario local
+    if diario.activo() and ev["status"] == "draft" and int(ev["usuario_id"]) == _usuario_id():
+        if diario.anotar(evaluacion_id, diario.CATEGORIAS, "", rows):
+            return jsonify({"ok": True, "diferido": True})
 
     # Idempotente: borrar e insertar todo
-    try:
+    err = _sincronizar_diario(evaluacion_id, "db_error_guardar_categorias")
+    if err is not None:
+        return err
+
+    def _tx():
+        # Status vigente bajo lock (pudo cambiar desde _get_eval)
+        locked = agregados.bloquear_estado(evaluacion_id)
+        if not locked or (locked["status"] == "submitted" and not _is_admin()):
+            return None
+        es_submitted = locked["status"] == "submitted"
+        if es_submitted:
+            agregados.bump_version(instrumento_id)
+            agregados.aplicar_delta(evaluacion_id, -1, items=False)
+
         execute("DELETE FROM evaluacion_categoria WHERE evaluacion_id=%s", (evaluacion_id,))
         executemany(
             "INSERT INTO evaluacion_categoria (evaluacion_id, instrumento_id, categoria_code, rank_value) "
             "VALUES (%s,%s,%s,%s)",
             rows
         )
-        commit()
-        return jsonify({"ok": True})
+        if es_submitted:
+            agregados.aplicar_delta(evaluacion_id, +1, items=False)
+        return es_submitted
+
+    try:
+        es_submitted = transaccion(_tx, "guardar_categorias")
     except Exception as e:
         rollback()
         if _is_duplicate_error(e):
@@ -323,14 +392,23 @@ def guardar_ranking_categorias(evaluacion_id: int):
                 400,
                 {"detalle": "Los valores deben ser únicos del 1 al N (sin repetición)."}
             )
+        if es_transitorio(e):
+            return _json_transitorio("db_error_guardar_categorias")
         return _json_error("db_error_guardar_categorias", 500)
 
+    if es_submitted is None:
+        return _json_error("evaluacion_submitted_readonly", 403)
+    if es_submitted:
+        eventos.notificar(instrumento_id)
+    return jsonify({"ok": True})
+
 
 # =========================
 # Guardar ranking de ítems por categoría
 # =========================
 
 @bp.post("/evaluacion/<int:evaluacion_id>/items/<categoria_code>")
+@idempotencia.idempotente
 def guardar_ranking_items(evaluacion_id: int, categoria_code: str):
     if not _require_login():
         return _json_error("unauthorized", 401)
@@ -347,60 +425,36 @@ def guardar_ranking_items(evaluacion_id: int, categoria_code: str):
         return _json_error("evaluacion_submitted_readonly", 403)
 
     data = request.get_json(silent=True) or {}
-    ranks = data.get("ranks", [])
-
-    if not isinstance(ranks, list) or len(ranks) == 0:
-        return _json_error("payload_invalid", 400)
-
     instrumento_id = int(ev["instrumento_id"])
     categoria_code = categoria_code.strip()
 
-    # Validar categoría existe y pertenece al instrumento
-    cat = query_one(
-        "SELECT categoria_code FROM categoria WHERE instrumento_id=%s AND categoria_code=%s AND is_active=1",
-        (instrumento_id, categoria_code)
-    )
-    if not cat:
-        return _json_error("categoria_not_found", 404)
-
-    # Validar items válidos de esa categoría
-    items_validos = query_all(
-        "SELECT item_id, parent_item_id FROM item WHERE instrumento_id=%s AND categoria_code=%s AND is_active=1",
-        (instrumento_id, categoria_code)
-    )
-    valid_item_map = {int(x["item_id"]): (int(x["parent_item_id"]) if x.get("parent_item_id") else None) for x in items_validos}
-    if not valid_item_map:
-        return _json_error("categoria_sin_items", 400)
-
-    rows = []
-    for r in ranks:
-        item_id = r.get("item_id")
-        val = r.get("rank_value")
-        rg = r.get("rank_group", 0)
-        if not isinstance(item_id, int) or not isinstance(val, int):
-            return _json_error("payload_invalid_rank", 400)
-        if item_id not in valid_item_map:
-            return _json_error("item_invalido", 400, {"item_id": item_id})
-        if val < 1:
-            return _json_error("rank_value_min_1", 400, {"item_id": item_id})
-        # Derive rank_group from item’s parent_item_id (0 for main items, parent_id for sub-items)
-        parent = valid_item_map[item_id]
-        rank_group = parent if parent else 0
-        rows.append((evaluacion_id, item_id, categoria_code, rank_group, val))
-
-    # Validate uniqueness per rank_group
-    from collections import Counter
-    group_vals = Counter()
-    for (_eid, _iid, _cc, rg, rv) in rows:
-        key = (rg, rv)
-        group_vals[key] += 1
-        if group_vals[key] > 1:
-            return _json_error(
-                "rank_duplicado", 400,
-                {"detalle": f"Valor {rv} repetido en grupo de ranking {rg}."}
-            )
+    # Validación completa en memoria contra el índice de estructura:
+    # ítems de la categoría sin repetir, todos presentes y cada rank_group 1..n
+    cat = catalogo.obtener(instrumento_id)
+    rows, errores = validacion.validar_items(cat, evaluacion_id, categoria_code, data.get("ranks"))
+    if errores:
+        if errores[0]["error"] == "categoria_not_found":
+            return _json_errores(errores, 404)
+        return _json_errores(errores)
+
+    # Write-behind: borrador del propio evaluador -> diario local
+    if diario.activo() and ev["status"] == "draft" and int(ev["usuario_id"]) == _usuario_id():
+        if diario.anotar(evaluacion_id, diario.ITEMS, categoria_code, rows):
+            return jsonify({"ok": True, "diferido": True})
+    err = _sincronizar_diario(evaluacion_id, "db_error_guardar_items")
+    if err is not None:
+        return err
+
+    def _tx():
+        # Status vigente bajo lock (pudo cambiar desde _get_eval)
+        locked = agregados.bloquear_estado(evaluacion_id)
+        if not locked or (locked["status"] == "submitted" and not _is_admin()):
+            return None
+        es_submitted = locked["status"] == "submitted"
+        if es_submitted:
+            agregados.bump_version(instrumento_id)
+            agregados.aplicar_delta(evaluacion_id, -1, categorias=False, categoria_code=categoria_code)
 
-    try:
         # Idempotente por categoría
         execute(
             "DELETE FROM evaluacion_item WHERE evaluacion_id=%s AND categoria_code=%s",
@@ -411,8 +465,14 @@ def guardar_ranking_items(evaluacion_id: int, categoria_code: str):
             "VALUES (%s,%s,%s,%s,%s)",
             rows
         )
-        commit()
-        return jsonify({"ok": True})
+        if codec_ranking.dual():
+            codec_ranking.escribir(cat.estructura, evaluacion_id, categoria_code, rows)
+        if es_submitted:
+            agregados.aplicar_delta(evaluacion_id, +1, categorias=False, categoria_code=categoria_code)
+        return es_submitted
+
+    try:
+        es_submitted = transaccion(_tx, "guardar_items")
     except Exception as e:
         rollback()
         if _is_duplicate_error(e):
@@ -421,8 +481,16 @@ def guardar_ranking_items(evaluacion_id: int, categoria_code: str):
                 400,
                 {"detalle": "Los valores deben ser únicos (sin repetición) dentro de cada grupo de ranking."}
             )
+        if es_transitorio(e):
+            return _json_transitorio("db_error_guardar_items")
         return _json_error("db_error_guardar_items", 500)
 
+    if es_submitted is None:
+        return _json_error("evaluacion_submitted_readonly", 403)
+    if es_submitted:
+        eventos.notificar(instrumento_id)
+    return jsonify({"ok": True})
+
 
 # =========================
 # Resumen
@@ -441,6 +509,7 @@ def resumen(evaluacion_id: int):
         return _json_error("forbidden", 403)
 
     instrumento_id = int(ev["instrumento_id"])
+    diario.sincronizar(evaluacion_id)
 
     instrumento = query_one(
         "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s",
@@ -494,6 +563,7 @@ def resumen(evaluacion_id: int):
 # =========================
 
 @bp.post("/evaluacion/<int:evaluacion_id>/submit")
+@idempotencia.idempotente
 def submit(evaluacion_id: int):
     if not _require_login():
         return _json_error("unauthorized", 401)
@@ -511,43 +581,74 @@ def submit(evaluacion_id: int):
 
     instrumento_id = int(ev["instrumento_id"])
 
+    # Write-behind: marca de cierre antes de vaciar; desde aquí los guardados
+    # de esta evaluación van por el camino síncrono (con lock)
+    try:
+        diario.marcar_cierre(evaluacion_id)
+    except Exception:
+        current_app.logger.exception("Diario: no se pudo marcar el cierre de %s", evaluacion_id)
+        return _json_transitorio("db_error_submit")
+
+    resp, sigue_draft = _enviar(evaluacion_id, instrumento_id)
+    if sigue_draft:
+        # Ante la duda (error en la transacción) la marca se queda hasta su TTL
+        try:
+            diario.desmarcar_cierre(evaluacion_id)
+        except Exception:
+            current_app.logger.exception("Diario: no se pudo quitar el cierre de %s", evaluacion_id)
+    return resp
+
+
+def _enviar(evaluacion_id: int, instrumento_id: int):
+    """Resto de submit, ya con la marca de cierre: (respuesta, seguro que sigue en draft)."""
+    # Lo pendiente del diario entra a MySQL antes de validar
+    try:
+        diario.sincronizar(evaluacion_id)
+    except Exception as e:
+        rollback()
+        if es_transitorio(e):
+            return _json_transitorio("db_error_submit"), True
+        return _json_error("db_error_submit", 500), True
+
     # Validación mínima: que categorías estén completas y que cada categoría tenga ítems completos
-    total_cats = _count_categorias(instrumento_id)
+    cat = catalogo.obtener(instrumento_id)
     cat_rank_count = query_one(
         "SELECT COUNT(*) AS cnt FROM evaluacion_categoria WHERE evaluacion_id=%s",
         (evaluacion_id,)
     )["cnt"]
 
-    if int(cat_rank_count) < total_cats:
-        return _json_error("faltan_ranks_categorias", 400)
+    if int(cat_rank_count) < cat.total_categorias:
+        return _json_error("faltan_ranks_categorias", 400), True
 
-    cats = query_all(
-        "SELECT categoria_code FROM categoria WHERE instrumento_id=%s AND is_active=1",
-        (instrumento_id,)
-    )
-    for c in cats:
+    saved = _items_guardados_por_categoria(evaluacion_id)
+    for c in cat.categorias:
         code = c["categoria_code"]
-        total_items = query_one(
-            "SELECT COUNT(*) AS total FROM item WHERE instrumento_id=%s AND categoria_code=%s AND is_active=1",
-            (instrumento_id, code)
-        )["total"]
-        saved_items = query_one(
-            "SELECT COUNT(*) AS total FROM evaluacion_item WHERE evaluacion_id=%s AND categoria_code=%s",
-            (evaluacion_id, code)
-        )["total"]
-        if int(saved_items) < int(total_items):
-            return _json_error("faltan_ranks_items", 400, {"categoria_code": code})
-
-    try:
-        execute(
-            "UPDATE evaluacion SET status='submitted', submitted_at=NOW() WHERE evaluacion_id=%s",
+        if saved.get(code, 0) < cat.items_por_categoria[code]:
+            return _json_error("faltan_ranks_items", 400, {"categoria_code": code}), True
+
+    def _tx():
+        # Solo la transición draft -> submitted publica el delta (evita doble suma
+        # si dos submits concurrentes pasan la validación)
+        updated = execute(
+            "UPDATE evaluacion SET status='submitted', submitted_at=NOW() "
+            "WHERE evaluacion_id=%s AND status='draft'",
             (evaluacion_id,)
         )
-        commit()
-        return jsonify({"ok": True, "status": "submitted"})
-    except Exception:
+        if updated:
+            agregados.publicar(instrumento_id, evaluacion_id, +1)
+        return updated
+
+    try:
+        updated = transaccion(_tx, "submit")
+    except Exception as e:
         rollback()
-        return _json_error("db_error_submit", 500)
+        if es_transitorio(e):
+            return _json_transitorio("db_error_submit"), False
+        return _json_error("db_error_submit", 500), False
+
+    if updated:
+        eventos.notificar(instrumento_id)
+    return jsonify({"ok": True, "status": "submitted"}), False
 
 
 # =========================
@@ -573,28 +674,43 @@ def admin_reopen(evaluacion_id: int):
     # - submitted_at=NULL
     # Si agregaste columnas reopened_at/reopened_by en schema, puedes habilitarlo aquí.
 
-    try:
+    def _tx():
         # Intento con trazabilidad si existen columnas (sin romper si no existen):
         # 1) probamos update extendido; si falla por columna, hacemos update simple.
         try:
-            execute(
+            updated = execute(
                 "UPDATE evaluacion "
                 "SET status='draft', submitted_at=NULL, reopened_at=NOW(), reopened_by=%s "
-                "WHERE evaluacion_id=%s",
+                "WHERE evaluacion_id=%s AND status='submitted'",
                 (_usuario_id(), evaluacion_id)
             )
-        except Exception:
-            execute(
-                "UPDATE evaluacion SET status='draft', submitted_at=NULL WHERE evaluacion_id=%s",
+        except Exception as e:
+            if es_transitorio(e):
+                raise
+            updated = execute(
+                "UPDATE evaluacion SET status='draft', submitted_at=NULL "
+                "WHERE evaluacion_id=%s AND status='submitted'",
                 (evaluacion_id,)
             )
 
-        commit()
-        return jsonify({"ok": True, "status": "draft"})
-    except Exception:
+        # Solo la transición submitted -> draft resta el delta
+        if updated:
+            agregados.publicar(int(ev["instrumento_id"]), evaluacion_id, -1, reopen=True)
+        return updated
+
+    try:
+        updated = transaccion(_tx, "reopen")
+    except Exception as e:
         rollback()
+        if es_transitorio(e):
+            return _json_transitorio("db_error_reopen")
         return _json_error("db_error_reopen", 500)
 
+    if updated:
+        diario.reabrir(evaluacion_id)
+        eventos.notificar(int(ev["instrumento_id"]))
+    return jsonify({"ok": True, "status": "draft"})
+
 
 # ================================================================
 # ADMIN: Gestión de Usuarios
@@ -794,13 +910,260 @@ def admin_list_instruments():
     if not _is_admin():
         return _json_error("forbidden", 403)
 
+    return _cached_json(
+        ("instruments", None),
+        cache_resultados.huella_global(),
+        _admin_list_instruments_payload,
+    )
+
+
+# Conteos por instrumento en una sola pasada agrupada sobre idx_eval_instr_status
+_SQL_CONTEOS_INSTRUMENTOS = (
+    "SELECT i.instrumento_id, i.nombre, "
+    "       COALESCE(x.total_submitted, 0) AS total_submitted, "
+    "       COALESCE(x.total_draft, 0) AS total_draft "
+    "FROM instrumento i "
+    "LEFT JOIN ("
+    "  SELECT instrumento_id, "
+    "         SUM(status='submitted') AS total_submitted, "
+    "         SUM(status='draft') AS total_draft "
+    "  FROM evaluacion GROUP BY instrumento_id"
+    ") x ON x.instrumento_id = i.instrumento_id "
+    "WHERE i.is_active=1 ORDER BY i.instrumento_id"
+)
+
+
+def _admin_list_instruments_payload():
+    rows = query_all(_SQL_CONTEOS_INSTRUMENTOS)
+    for r in rows:
+        r["total_submitted"] = int(r["total_submitted"])
+        r["total_draft"] = int(r["total_draft"])
+    return rows
+
+
+@bp.get("/admin/instruments/overview")
+def admin_instruments_overview():
+    """
+    Resumen de avance por instrumento: submitted, draft y no iniciadas
+    (respecto a usuarios activos no admin), y % de completitud por
+    categoría (evaluaciones con ítems guardados en la categoría).
+    Número fijo de consultas sin importar cuántos instrumentos haya.
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    instrumentos = _admin_list_instruments_payload()
+
+    admin_name = (current_app.config.get("ADMIN_ROLE_NAME") or "ADMIN").strip().upper()
+    row = query_one(
+        "SELECT COUNT(*) AS total FROM usuario u JOIN rol r ON r.rol_id = u.rol_id "
+        "WHERE u.is_active=1 AND UPPER(TRIM(r.nombre)) <> %s",
+        (admin_name,)
+    )
+    total_evaluadores = int(row["total"]) if row else 0
+
+    cats = query_all(
+        "SELECT c.instrumento_id, c.categoria_code, c.orden, c.nombre, "
+        "       COALESCE(x.completadas, 0) AS completadas "
+        "FROM categoria c "
+        "JOIN instrumento i ON i.instrumento_id = c.instrumento_id AND i.is_active=1 "
+        "LEFT JOIN ("
+        "  SELECT e.instrumento_id, ei.categoria_code, COUNT(DISTINCT ei.evaluacion_id) AS completadas "
+        "  FROM evaluacion e "
+        "  JOIN evaluacion_item ei ON ei.evaluacion_id = e.evaluacion_id "
+        "  GROUP BY e.instrumento_id, ei.categoria_code"
+        ") x ON x.instrumento_id = c.instrumento_id AND x.categoria_code = c.categoria_code "
+        "WHERE c.is_active=1 "
+        "ORDER BY c.instrumento_id, c.orden"
+    )
+    cats_por_instr = {}
+    for c in cats:
+        cats_por_instr.setdefault(int(c["instrumento_id"]), []).append(c)
+
+    def _pct(n: int, total: int):
+        return round(100.0 * n / total, 1) if total > 0 else None
+
+    out = []
+    for ins in instrumentos:
+        iid = int(ins["instrumento_id"])
+        submitted, draft = ins["total_submitted"], ins["total_draft"]
+        iniciadas = submitted + draft
+        out.append({
+            "instrumento_id": iid,
+            "nombre": ins["nombre"],
+            "total_submitted": submitted,
+            "total_draft": draft,
+            "total_no_iniciado": max(0, total_evaluadores - iniciadas),
+            "pct_submitted": _pct(submitted, total_evaluadores),
+            "categorias": [
+                {
+                    "categoria_code": c["categoria_code"],
+                    "orden": int(c["orden"]),
+                    "nombre": c["nombre"],
+                    "completadas": int(c["completadas"]),
+                    "pct_evaluadores": _pct(int(c["completadas"]), total_evaluadores),
+                    "pct_iniciadas": _pct(int(c["completadas"]), iniciadas),
+                }
+                for c in cats_por_instr.get(iid, [])
+            ],
+        })
+
+    return jsonify({"total_evaluadores": total_evaluadores, "instrumentos": out})
+
+
+_PROGRESO_STATUS = {
+    "no_iniciado": "e.evaluacion_id IS NULL",
+    "draft": "e.status='draft'",
+    "submitted": "e.status='submitted'",
+    "pendiente": "(e.evaluacion_id IS NULL OR e.status='draft')",
+}
+
+
+@bp.get("/admin/progress")
+def admin_progress():
+    """
+    Avance por usuario x instrumento (usuarios activos no admin).
+    Filtros: ?instrumento_id= ?rol_id= ?status=no_iniciado|draft|submitted|pendiente
+             ?q=<texto en usuario/nombre>  Paginación: ?page=1&per_page=50 (máx. 500)
+    Cada fila: fraccion_completada (pasos: categorías + una por categoría
+    de ítems) y primer_paso_incompleto (mismo formato que next_step de init).
+    Consultas fijas por página: conteo agrupado, página, ranks de
+    categorías e ítems de las evaluaciones de la página.
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    try:
+        page = max(1, int(request.args.get("page", 1)))
+        per_page = min(500, max(1, int(request.args.get("per_page", 50))))
+        instrumento_id = request.args.get("instrumento_id", type=int)
+        rol_id = request.args.get("rol_id", type=int)
+    except (TypeError, ValueError):
+        return _json_error("parametros_invalidos", 400)
+    status = (request.args.get("status") or "").strip().lower() or None
+    if status and status not in _PROGRESO_STATUS:
+        return _json_error("status_invalido", 400, {"status": list(_PROGRESO_STATUS)})
+    q = (request.args.get("q") or "").strip()
+
+    admin_name = (current_app.config.get("ADMIN_ROLE_NAME") or "ADMIN").strip().upper()
+    base = (
+        "FROM usuario u "
+        "JOIN rol r ON r.rol_id = u.rol_id "
+        "JOIN instrumento i ON i.is_active=1 "
+        "LEFT JOIN evaluacion e ON e.usuario_id = u.usuario_id AND e.instrumento_id = i.instrumento_id "
+        "WHERE u.is_active=1 AND UPPER(TRIM(r.nombre)) <> %s "
+    )
+    params = [admin_name]
+    if instrumento_id:
+        base += "AND i.instrumento_id=%s "
+        params.append(instrumento_id)
+    if rol_id:
+        base += "AND u.rol_id=%s "
+        params.append(rol_id)
+    if q:
+        base += ("AND (u.nombre_usuario LIKE %s "
+                 "OR CONCAT_WS(' ', u.nombre, u.apellido_paterno, u.apellido_materno) LIKE %s) ")
+        like = f"%{q}%"
+        params += [like, like]
+
+    resumen_rows = query_all(
+        "SELECT COALESCE(e.status, 'no_iniciado') AS st, COUNT(*) AS total " + base + "GROUP BY st",
+        tuple(params)
+    )
+    resumen = {k: 0 for k in ("no_iniciado", "draft", "submitted")}
+    for r in resumen_rows:
+        resumen[r["st"]] = int(r["total"])
+    if status == "pendiente":
+        total = resumen["no_iniciado"] + resumen["draft"]
+    elif status:
+        total = resumen[status]
+    else:
+        total = sum(resumen.values())
+
+    if status:
+        base += "AND " + _PROGRESO_STATUS[status] + " "
     rows = query_all(
-        "SELECT i.instrumento_id, i.nombre, "
-        "  (SELECT COUNT(*) FROM evaluacion e WHERE e.instrumento_id=i.instrumento_id AND e.status='submitted') AS total_submitted, "
-        "  (SELECT COUNT(*) FROM evaluacion e WHERE e.instrumento_id=i.instrumento_id AND e.status='draft') AS total_draft "
-        "FROM instrumento i WHERE i.is_active=1 ORDER BY i.instrumento_id"
+        "SELECT u.usuario_id, u.nombre_usuario, u.nombre, u.apellido_paterno, u.apellido_materno, "
+        "       r.rol_id, r.nombre AS rol_nombre, i.instrumento_id, i.nombre AS instrumento_nombre, "
+        "       e.evaluacion_id, e.status, e.submitted_at "
+        + base +
+        "ORDER BY u.usuario_id, i.instrumento_id LIMIT %s OFFSET %s",
+        tuple(params + [per_page, (page - 1) * per_page])
     )
-    return jsonify(rows)
+
+    eval_ids = [int(r["evaluacion_id"]) for r in rows if r.get("evaluacion_id")]
+    cat_saved = {}
+    item_saved = {}
+    if eval_ids:
+        ph = ",".join(["%s"] * len(eval_ids))
+        for r in query_all(
+            "SELECT evaluacion_id, COUNT(*) AS total FROM evaluacion_categoria "
+            f"WHERE evaluacion_id IN ({ph}) GROUP BY evaluacion_id",
+            tuple(eval_ids)
+        ):
+            cat_saved[int(r["evaluacion_id"])] = int(r["total"])
+        for r in query_all(
+            "SELECT evaluacion_id, categoria_code, COUNT(*) AS total FROM evaluacion_item "
+            f"WHERE evaluacion_id IN ({ph}) GROUP BY evaluacion_id, categoria_code",
+            tuple(eval_ids)
+        ):
+            item_saved[(int(r["evaluacion_id"]), r["categoria_code"])] = int(r["total"])
+
+    catalogos = {}
+    out = []
+    for r in rows:
+        iid = int(r["instrumento_id"])
+        cat = catalogos.get(iid)
+        if cat is None:
+            cat = catalogos[iid] = catalogo.obtener(iid)
+        pasos_total = 1 + cat.total_categorias
+
+        eid = int(r["evaluacion_id"]) if r.get("evaluacion_id") else None
+        if eid is None:
+            pasos, siguiente = 0, {"view": "categorias"}
+        elif r["status"] == "submitted":
+            pasos, siguiente = pasos_total, None
+        elif cat_saved.get(eid, 0) < cat.total_categorias:
+            pasos, siguiente = 0, {"view": "categorias"}
+        else:
+            pasos, siguiente = 1, None
+            for c in cat.categorias:
+                code = c["categoria_code"]
+                if item_saved.get((eid, code), 0) >= cat.items_por_categoria[code]:
+                    pasos += 1
+                elif siguiente is None:
+                    siguiente = {"view": "items", "categoria_orden": c["orden"]}
+            if siguiente is None:
+                siguiente = {"view": "resumen"}
+
+        out.append({
+            "usuario_id": int(r["usuario_id"]),
+            "nombre_usuario": r["nombre_usuario"],
+            "nombre": " ".join(p for p in (r["nombre"], r["apellido_paterno"], r["apellido_materno"]) if p),
+            "rol_id": int(r["rol_id"]),
+            "rol_nombre": r["rol_nombre"],
+            "instrumento_id": iid,
+            "instrumento_nombre": r["instrumento_nombre"],
+            "evaluacion_id": eid,
+            "status": r["status"] or "no_iniciado",
+            "submitted_at": r["submitted_at"],
+            "pasos_completados": pasos,
+            "pasos_total": pasos_total,
+            "fraccion_completada": round(pasos / pasos_total, 4) if pasos_total else None,
+            "primer_paso_incompleto": siguiente,
+        })
+
+    return jsonify({
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "resumen": resumen,
+        "rows": out,
+    })
 
 
 @bp.get("/admin/results/<int:instrumento_id>")
@@ -824,6 +1187,14 @@ def admin_results(instrumento_id: int):
     if not ins:
         return _json_error("instrumento_not_found", 404)
 
+    return _cached_json(
+        ("results", instrumento_id),
+        cache_resultados.huella_instrumento(instrumento_id),
+        lambda: _admin_results_payload(instrumento_id, ins),
+    )
+
+
+def _admin_results_payload(instrumento_id: int, ins):
     # ----- Evaluadores que han enviado -----
     evaluadores = query_all(
         "SELECT e.evaluacion_id, e.usuario_id, e.status, e.submitted_at, "
@@ -842,8 +1213,8 @@ def admin_results(instrumento_id: int):
     cat_rankings = query_all(
         "SELECT c.categoria_code, c.orden, c.nombre, "
         "       ROUND(SUM(ec.rank_value * e.rol_peso_snapshot) / SUM(e.rol_peso_snapshot), 2) AS rank_ponderado, "
-        "       ROUND(AVG(ec.rank_value), 2) AS rank_promedio, "
-        "       COUNT(ec.rank_value) AS total_respuestas "
+        "       ROUND(AVG(CASE WHEN e.evaluacion_id IS NOT NULL THEN ec.rank_value END), 2) AS rank_promedio, "
+        "       COUNT(e.evaluacion_id) AS total_respuestas "
         "FROM categoria c "
         "LEFT JOIN evaluacion_categoria ec ON ec.categoria_code = c.categoria_code "
         "  AND ec.instrumento_id = c.instrumento_id "
@@ -861,8 +1232,8 @@ def admin_results(instrumento_id: int):
         "       i.parent_item_id, "
         "       ei.rank_group, "
         "       ROUND(SUM(ei.rank_value * e.rol_peso_snapshot) / SUM(e.rol_peso_snapshot), 2) AS rank_ponderado, "
-        "       ROUND(AVG(ei.rank_value), 2) AS rank_promedio, "
-        "       COUNT(ei.rank_value) AS total_respuestas "
+        "       ROUND(AVG(CASE WHEN e.evaluacion_id IS NOT NULL THEN ei.rank_value END), 2) AS rank_promedio, "
+        "       COUNT(e.evaluacion_id) AS total_respuestas "
         "FROM item i "
         "LEFT JOIN evaluacion_item ei ON ei.item_id = i.item_id "
         "LEFT JOIN evaluacion e ON e.evaluacion_id = ei.evaluacion_id "
@@ -878,12 +1249,326 @@ def admin_results(instrumento_id: int):
         it["parent_item_id"] = int(it["parent_item_id"]) if it.get("parent_item_id") else None
         it["rank_group"] = int(it["rank_group"]) if it.get("rank_group") is not None else 0
 
-    return jsonify({
+    return {
         "instrumento": {
             "instrumento_id": int(ins["instrumento_id"]),
             "nombre": ins["nombre"]
         },
+        # Versión de datos submitted (para el stream SSE: ?since=version)
+        "version": agregados.version(instrumento_id)["version"],
         "evaluadores": evaluadores,
         "categorias": cat_rankings,
         "items": item_rankings
+    }
+
+
+@bp.get("/admin/results/<int:instrumento_id>/agregados")
+def admin_results_agregados(instrumento_id: int):
+    """
+    Medias y desviaciones estándar (ponderadas y simples) por categoría e
+    ítem, leídas de los acumuladores incrementales (sin recalcular).
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    ins = query_one(
+        "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s AND is_active=1",
+        (instrumento_id,)
+    )
+    if not ins:
+        return _json_error("instrumento_not_found", 404)
+
+    data = agregados.leer(instrumento_id)
+    data["instrumento"] = {"instrumento_id": int(ins["instrumento_id"]), "nombre": ins["nombre"]}
+    return jsonify(data)
+
+
+@bp.post("/admin/results/<int:instrumento_id>/reconciliar")
+def admin_results_reconciliar(instrumento_id: int):
+    """
+    Verifica los acumuladores contra un recálculo completo.
+    ?reparar=1 reescribe los acumuladores si hay diferencias.
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    reparar = request.args.get("reparar") in ("1", "true", "yes")
+    try:
+        return jsonify(agregados.reconciliar(instrumento_id, reparar=reparar))
+    except Exception:
+        current_app.logger.exception("Error al reconciliar agregados instrumento=%s", instrumento_id)
+        return _json_error("db_error_reconciliar", 500)
+
+
+@bp.get("/admin/instruments/<int:instrumento_id>/campanas")
+def admin_list_campanas(instrumento_id: int):
+    """Campañas del instrumento (la activa y las cerradas/archivadas)."""
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    return jsonify(campanas.listar(instrumento_id))
+
+
+@bp.post("/admin/instruments/<int:instrumento_id>/campanas/cerrar")
+def admin_cerrar_campana(instrumento_id: int):
+    """
+    Cierra la campaña activa (la archiva y la saca de las tablas
+    calientes; los borradores se descartan) y abre una nueva.
+    Body: {"nombre": "2027-1"}
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    data = request.get_json(silent=True)
+    nombre = data.get("nombre") if isinstance(data, dict) else None
+    if not isinstance(nombre, str):
+        return _json_error("nombre_invalido")
+    nombre = nombre.strip()
+    if not nombre or len(nombre) > 80:
+        return _json_error("nombre_invalido")
+
+    ins = query_one(
+        "SELECT instrumento_id FROM instrumento WHERE instrumento_id=%s AND is_active=1",
+        (instrumento_id,)
+    )
+    if not ins:
+        return _json_error("instrumento_not_found", 404)
+
+    try:
+        res = campanas.cerrar(instrumento_id, nombre)
+    except Exception as e:
+        rollback()
+        if es_transitorio(e):
+            return _json_transitorio("db_error_cerrar_campana")
+        current_app.logger.exception("Error al cerrar campaña instrumento=%s", instrumento_id)
+        return _json_error("db_error_cerrar_campana", 500)
+    if res is None:
+        return _json_error("campana_activa_not_found", 404)
+
+    eventos.notificar(instrumento_id)
+    return jsonify(res)
+
+
+@bp.get("/admin/results/<int:instrumento_id>/campanas")
+def admin_results_campanas(instrumento_id: int):
+    """
+    Comparación entre campañas: estadísticas por categoría e ítem de cada
+    campaña, desde los snapshots archivados (la activa, de los acumuladores).
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    return _cached_json(
+        ("campanas", instrumento_id),
+        cache_resultados.huella_instrumento(instrumento_id),
+        lambda: campanas.comparar(instrumento_id),
+    )
+
+
+@bp.get("/admin/results/<int:instrumento_id>/stream")
+def admin_results_stream(instrumento_id: int):
+    """
+    Stream SSE de deltas de resultados (conteos y promedios que cambiaron)
+    cuando se envían o reabren evaluaciones del instrumento.
+    ?since=<version> (o Last-Event-ID) = versión que el cliente ya tiene.
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    since = request.args.get("since") or request.headers.get("Last-Event-ID")
+    try:
+        since = int(since) if since not in (None, "") else None
+    except (TypeError, ValueError):
+        since = None
+
+    # Cada stream retiene un hilo del worker: cupo por proceso
+    liberar = eventos.reservar_stream()
+    if liberar is None:
+        resp, code = _json_error("streams_ocupados", 503)
+        resp.headers["Retry-After"] = str(eventos.OCUPADO_RETRY_AFTER)
+        return resp, code
+
+    resp = Response(
+        stream_with_context(eventos.stream_resultados(instrumento_id, since)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # close() del iterable lo llama el servidor WSGI siempre, aunque el
+    # generador nunca haya empezado (cliente que se fue antes)
+    resp.call_on_close(liberar)
+    return resp
+
+
+@bp.get("/admin/results/<int:instrumento_id>/acuerdo")
+def admin_results_acuerdo(instrumento_id: int):
+    """
+    Acuerdo de cada evaluación submitted con el consenso ponderado
+    (Spearman / Kendall por grupo), atípicos por z robusto y evaluaciones
+    que dejaron el orden del catálogo (identidad / inverso).
+    ?umbral=<z> (default ACUERDO_UMBRAL_Z)
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    ins = query_one(
+        "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s AND is_active=1",
+        (instrumento_id,)
+    )
+    if not ins:
+        return _json_error("instrumento_not_found", 404)
+
+    from services import acuerdo, rankings
+
+    try:
+        umbral = float(request.args.get("umbral", acuerdo.UMBRAL_Z))
+    except (TypeError, ValueError):
+        return _json_error("parametros_invalidos", 400)
+    # float() acepta "nan"/"inf"
+    if not math.isfinite(umbral):
+        return _json_error("parametros_invalidos", 400)
+
+    data = acuerdo.analizar(rankings.obtener(instrumento_id), umbral=umbral)
+
+    usuarios = query_all(
+        "SELECT e.evaluacion_id, u.nombre, u.apellido_paterno, u.apellido_materno, "
+        "       r.nombre AS rol_nombre "
+        "FROM evaluacion e "
+        "JOIN usuario u ON u.usuario_id = e.usuario_id "
+        "JOIN rol r ON r.rol_id = e.rol_id_snapshot "
+        "WHERE e.instrumento_id=%s AND e.status='submitted'",
+        (instrumento_id,)
+    )
+    por_eval = {int(u["evaluacion_id"]): u for u in usuarios}
+    for ev in data["evaluaciones"]:
+        u = por_eval.get(ev["evaluacion_id"])
+        if u:
+            ev["nombre"] = " ".join(p for p in (u["nombre"], u["apellido_paterno"], u["apellido_materno"]) if p)
+            ev["rol_nombre"] = u["rol_nombre"]
+
+    data["instrumento"] = {"instrumento_id": int(ins["instrumento_id"]), "nombre": ins["nombre"]}
+    return jsonify(data)
+
+
+@bp.get("/admin/results/<int:instrumento_id>/pares")
+def admin_results_pares(instrumento_id: int):
+    """
+    Matrices de preferencia por pares (w = Σ pesos, n = conteo de
+    evaluaciones que pusieron la fila arriba de la columna) por grupo.
+    ?categoria_code=<code> limita a los ítems de esa categoría
+    (?categoria_code=CAT solo categorías).
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    ins = query_one(
+        "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s AND is_active=1",
+        (instrumento_id,)
+    )
+    if not ins:
+        return _json_error("instrumento_not_found", 404)
+
+    from services import pares
+
+    version, matrices = pares.obtener(instrumento_id)
+    filtro = request.args.get("categoria_code")
+    grupos = []
+    for (tipo, code, _), m in matrices.items():
+        if filtro == "CAT" and tipo != "CAT":
+            continue
+        if filtro and filtro != "CAT" and code != filtro:
+            continue
+        grupos.append(m.to_json())
+
+    return jsonify({
+        "instrumento": {"instrumento_id": int(ins["instrumento_id"]), "nombre": ins["nombre"]},
+        "version": version,
+        "grupos": grupos,
     })
+
+
+@bp.get("/admin/results/<int:instrumento_id>/plackett-luce")
+def admin_results_plackett_luce(instrumento_id: int):
+    """
+    Worth Plackett-Luce (máxima verosimilitud, MM) por grupo de ranking,
+    ponderado por rol_peso_snapshot.
+    ?tol=<float>  ?max_iter=<int>  ?presupuesto=<segundos> (máx. 10)
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    ins = query_one(
+        "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s AND is_active=1",
+        (instrumento_id,)
+    )
+    if not ins:
+        return _json_error("instrumento_not_found", 404)
+
+    from services import plackett_luce, rankings
+
+    try:
+        tol = float(request.args.get("tol", plackett_luce.TOL))
+        max_iter = int(request.args.get("max_iter", plackett_luce.MAX_ITER))
+        presupuesto = float(request.args.get("presupuesto", plackett_luce.PRESUPUESTO_SEG))
+    except (TypeError, ValueError):
+        return _json_error("parametros_invalidos", 400)
+    # float() acepta "nan"/"inf": NaN pasa `tol <= 0` y nunca converge
+    if not (math.isfinite(tol) and math.isfinite(presupuesto)):
+        return _json_error("parametros_invalidos", 400)
+    if tol <= 0 or max_iter < 1 or presupuesto <= 0:
+        return _json_error("parametros_invalidos", 400)
+
+    data = plackett_luce.analizar(
+        rankings.obtener(instrumento_id),
+        presupuesto=min(presupuesto, 10.0), tol=tol, max_iter=min(max_iter, 100000)
+    )
+    data["instrumento"] = {"instrumento_id": int(ins["instrumento_id"]), "nombre": ins["nombre"]}
+    return jsonify(data)
+
+
+@bp.get("/admin/results/<int:instrumento_id>/prioridades")
+def admin_results_prioridades(instrumento_id: int):
+    """
+    Prioridades compuestas categoría × ítem (× sub-ítem) a partir de
+    transformaciones rank -> peso.
+    ?metodo=roc|rank_sum|reciproco (default roc)
+    """
+    if not _require_login():
+        return _json_error("unauthorized", 401)
+    if not _is_admin():
+        return _json_error("forbidden", 403)
+
+    ins = query_one(
+        "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s AND is_active=1",
+        (instrumento_id,)
+    )
+    if not ins:
+        return _json_error("instrumento_not_found", 404)
+
+    from services import prioridades, rankings
+
+    metodo = (request.args.get("metodo") or "roc").strip().lower()
+    if metodo not in prioridades.METODOS:
+        return _json_error("metodo_invalido", 400, {"metodos": list(prioridades.METODOS)})
+
+    # El resultado cacheado se comparte entre requests: no modificarlo
+    data = dict(prioridades.obtener(rankings.obtener(instrumento_id), metodo))
+    data["instrumento"] = {"instrumento_id": int(ins["instrumento_id"]), "nombre": ins["nombre"]}
+    return jsonify(data)
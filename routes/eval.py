@@ -10,13 +10,24 @@
 # - Persistencia/guardado se hará vía API (routes/api.py) usando fetch en JS.
 # - Aquí solo renderizamos vistas y pasamos contexto mínimo (ids, flags, etc.).
 # - "submitted" será solo lectura para usuario; admin podrá reabrir via API.
+# - Instrumento/categorías salen del catálogo cacheado (services/catalogo.py);
+#   categorias.html e items.html se cachean ya renderizados por instrumento
+#   y categoría, con la huella del catálogo como versión. Solo el estado de
+#   la evaluación del usuario consulta la DB.
 # ------------------------------------------------------------
 
-from flask import Blueprint, render_template, session, redirect, url_for, abort, flash
+import os
+
+from flask import Blueprint, render_template, session, redirect, url_for, abort, flash, request
 from db import query_all, query_one
+from services import catalogo
+from services.cache_resultados import CacheLRU
 
 bp = Blueprint("eval", __name__)
 
+# HTML renderizado por (vista, instrumento, categoría, prefijo de URL)
+_vistas = CacheLRU(max_entries=int(os.getenv("VIEW_CACHE_SIZE", "256")), ttl=0)
+
 
 def require_login():
     return "usuario_id" in session
@@ -38,6 +49,20 @@ def _block_admin():
     return None
 
 
+def _render_cacheado(key, huella, template: str, **ctx) -> str:
+    """
+    render_template con caché del HTML. Solo para vistas cuyo contenido no
+    depende del usuario: el navbar de base.html es igual para todo usuario
+    no admin; si hay mensajes flash pendientes se renderiza sin caché.
+    """
+    if session.get("_flashes"):
+        return render_template(template, **ctx)
+    body, _ = _vistas.obtener(
+        (key, request.script_root), huella, lambda: render_template(template, **ctx)
+    )
+    return body
+
+
 @bp.get("/dashboard")
 def dashboard():
     if not require_login():
@@ -49,13 +74,8 @@ def dashboard():
 
     usuario_id = get_usuario_id()
 
-    # Instrumentos del menú (por ahora: los que estén cargados en DB)
-    instrumentos = query_all(
-        "SELECT instrumento_id, nombre "
-        "FROM instrumento "
-        "WHERE is_active=1 "
-        "ORDER BY instrumento_id"
-    )
+    # Instrumentos del menú (catálogo cacheado)
+    instrumentos = catalogo.instrumentos()
 
     # Estado por instrumento para este usuario (no iniciado / draft / submitted)
     evals = query_all(
@@ -105,16 +125,15 @@ def categorias(instrumento_id: int):
     if blocked:
         return blocked
 
-    ins = query_one(
-        "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s AND is_active=1",
-        (instrumento_id,)
-    )
+    ins = catalogo.instrumento(instrumento_id)
     if not ins:
         abort(404)
 
-    return render_template(
+    return _render_cacheado(
+        ("categorias", instrumento_id),
+        catalogo.huella_instrumentos(),
         "categorias.html",
-        instrumento_id=int(ins["instrumento_id"]),
+        instrumento_id=ins["instrumento_id"],
         instrumento_nombre=ins["nombre"],
         is_admin=is_admin()
     )
@@ -138,37 +157,27 @@ def items(instrumento_id: int, categoria_orden: int):
     if blocked:
         return blocked
 
-    ins = query_one(
-        "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s AND is_active=1",
-        (instrumento_id,)
-    )
+    ins = catalogo.instrumento(instrumento_id)
     if not ins:
         abort(404)
 
     # Validar que exista esa categoría en ese instrumento
-    cat = query_one(
-        "SELECT categoria_code, orden, nombre "
-        "FROM categoria "
-        "WHERE instrumento_id=%s AND orden=%s AND is_active=1",
-        (instrumento_id, categoria_orden)
-    )
+    cat_inst = catalogo.obtener(instrumento_id)
+    cat = cat_inst.por_orden.get(categoria_orden)
     if not cat:
         abort(404)
 
-    # Total de categorías para navegación (progreso)
-    total_categorias = query_one(
-        "SELECT COUNT(*) AS total FROM categoria WHERE instrumento_id=%s AND is_active=1",
-        (instrumento_id,)
-    )["total"]
-
-    return render_template(
+    return _render_cacheado(
+        ("items", instrumento_id, categoria_orden),
+        (catalogo.huella_instrumentos(), cat_inst.huella),
         "items.html",
-        instrumento_id=int(ins["instrumento_id"]),
+        instrumento_id=ins["instrumento_id"],
         instrumento_nombre=ins["nombre"],
-        categoria_orden=int(cat["orden"]),
+        categoria_orden=cat["orden"],
         categoria_code=cat["categoria_code"],
         categoria_nombre=cat["nombre"],
-        total_categorias=int(total_categorias),
+        # Total de categorías para navegación (progreso)
+        total_categorias=cat_inst.total_categorias,
         is_admin=is_admin()
     )
 
@@ -188,10 +197,7 @@ def resumen(instrumento_id: int):
     if blocked:
         return blocked
 
-    ins = query_one(
-        "SELECT instrumento_id, nombre FROM instrumento WHERE instrumento_id=%s AND is_active=1",
-        (instrumento_id,)
-    )
+    ins = catalogo.instrumento(instrumento_id)
     if not ins:
         abort(404)
 
@@ -205,7 +211,7 @@ def resumen(instrumento_id: int):
 
     return render_template(
         "resumen.html",
-        instrumento_id=int(ins["instrumento_id"]),
+        instrumento_id=ins["instrumento_id"],
         instrumento_nombre=ins["nombre"],
         evaluacion_id=int(ev["evaluacion_id"]) if ev else None,
         evaluacion_status=ev["status"] if ev else None,
@@ -0,0 +1,211 @@
+# services/acuerdo.py
+# ------------------------------------------------------------
+# Acuerdo de cada evaluador con el consenso ponderado y detección de
+# evaluaciones atípicas / de "orden por defecto".
+#
+# Por cada grupo (categorías, ítems de cada categoría y cada rank_group
+# de sub-ítems):
+#   - consenso: media ponderada (rol_peso_snapshot) de rank_value por
+#     elemento, convertida a ranks 1..k (empates -> rank promedio).
+#   - Spearman rho de cada evaluación vs consenso (correlación de Pearson
+#     sobre ranks, producto matriz-vector sobre E x k).
+#   - distancia de Kendall normalizada = pares discordantes / (k(k-1)/2),
+#     con tensores de signos E x k x k procesados por bloques de filas.
+#   - identidad: ranks iguales a la posición de catálogo (orden 1..k);
+#     inversa: k..1.
+# Atípicos: distancia de Kendall global (promedio de grupos ponderado
+# por nº de pares) con z robusto (mediana / MAD) > umbral.
+# ------------------------------------------------------------
+
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+from services.rankings import CAT, Grupo, Rankings
+
+UMBRAL_Z = float(os.getenv("ACUERDO_UMBRAL_Z", "3.0"))
+# Filas por bloque del tensor de signos (E_bloque x k x k int8)
+BLOQUE = int(os.getenv("ACUERDO_BLOQUE", "2048"))
+
+
+def ranks_promedio(m: np.ndarray) -> np.ndarray:
+    """Ranks 1..k ascendentes de `m`; valores empatados reciben el rank promedio."""
+    k = m.shape[0]
+    order = np.argsort(m, kind="stable")
+    s = m[order]
+    nuevo = np.empty(k, dtype=bool)
+    nuevo[:1] = True
+    nuevo[1:] = s[1:] != s[:-1]
+    gid = np.cumsum(nuevo) - 1
+    pos = np.arange(1, k + 1, dtype=np.float64)
+    medias = np.bincount(gid, weights=pos) / np.bincount(gid)
+    out = np.empty(k, dtype=np.float64)
+    out[order] = medias[gid]
+    return out
+
+
+def media_ponderada(R: np.ndarray, w: np.ndarray) -> np.ndarray:
+    total = w.sum()
+    if total <= 0:
+        return np.zeros(R.shape[1], dtype=np.float64)
+    return (w @ R.astype(np.float64)) / total
+
+
+def spearman(R: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Spearman rho de cada fila de R contra el vector de ranks c."""
+    X = R.astype(np.float64)
+    X -= X.mean(axis=1, keepdims=True)
+    cc = c - c.mean()
+    den = np.linalg.norm(X, axis=1) * np.linalg.norm(cc)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rho = (X @ cc) / den
+    return np.nan_to_num(rho, nan=0.0)
+
+
+def kendall_discordantes(R: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Nº de pares (i<j) en que cada fila de R ordena distinto que c."""
+    sc = np.sign(c[:, None] - c[None, :]).astype(np.int8)
+    out = np.empty(R.shape[0], dtype=np.int64)
+    for a in range(0, R.shape[0], BLOQUE):
+        blk = R[a:a + BLOQUE]
+        s = np.sign(blk[:, :, None] - blk[:, None, :]).astype(np.int8)
+        # cada par cuenta dos veces (i,j) y (j,i)
+        out[a:a + BLOQUE] = (s * sc < 0).sum(axis=(1, 2)) // 2
+    return out
+
+
+def _analizar_grupo(g: Grupo, pesos: np.ndarray) -> Dict[str, Any]:
+    k = g.k
+    ok = g.completos
+    R = g.R[ok]
+    m = media_ponderada(R, pesos[ok])
+    c = ranks_promedio(m)
+    pares = k * (k - 1) // 2
+
+    rho = spearman(R, c)
+    disc = kendall_discordantes(R, c)
+    identidad = (R == np.arange(1, k + 1, dtype=R.dtype)).all(axis=1)
+    inversa = (R == np.arange(k, 0, -1, dtype=R.dtype)).all(axis=1)
+
+    return {
+        "ok": ok,
+        "pares": pares,
+        "media": m,
+        "consenso": c,
+        "rho": rho,
+        "kendall": disc / pares,
+        "identidad": identidad,
+        "inversa": inversa,
+    }
+
+
+def _z_robusto(d: np.ndarray) -> np.ndarray:
+    if d.size == 0:
+        return d
+    med = np.median(d)
+    escala = 1.4826 * np.median(np.abs(d - med))
+    if escala <= 0:
+        escala = d.std()
+    if escala <= 0:
+        return np.zeros_like(d)
+    return (d - med) / escala
+
+
+def _r(x, nd=4):
+    return round(float(x), nd)
+
+
+def analizar(rk: Rankings, umbral: float = UMBRAL_Z) -> Dict[str, Any]:
+    """
+    Resultado:
+      grupos: consenso y acuerdo medio por grupo
+      evaluaciones: distancia por evaluación (de mayor a menor), z, banderas
+    """
+    e = rk.n
+    # Acumuladores por evaluación: (suma ponderada por pares, pares) de Kendall
+    # y Spearman por tipo de grupo
+    acc = {t: {"kd": np.zeros(e), "rho": np.zeros(e), "pares": np.zeros(e), "n": np.zeros(e)}
+           for t in ("categorias", "items")}
+    grupos_ident = np.zeros(e, dtype=np.int64)
+    grupos_inv = np.zeros(e, dtype=np.int64)
+    grupos_eval = np.zeros(e, dtype=np.int64)
+
+    grupos_out: List[Dict[str, Any]] = []
+    for key, g in rk.grupos.items():
+        if g.k < 2:
+            continue
+        res = _analizar_grupo(g, rk.pesos)
+        ok = res["ok"]
+        tipo = "categorias" if key[0] == CAT else "items"
+        a = acc[tipo]
+        a["kd"][ok] += res["kendall"] * res["pares"]
+        a["rho"][ok] += res["rho"]
+        a["pares"][ok] += res["pares"]
+        a["n"][ok] += 1
+        grupos_ident[ok] += res["identidad"]
+        grupos_inv[ok] += res["inversa"]
+        grupos_eval[ok] += 1
+
+        n = int(ok.sum())
+        orden = np.argsort(-res["consenso"], kind="stable")
+        grupos_out.append({
+            **g.to_json_key(),
+            "k": g.k,
+            "n": n,
+            "spearman_medio": _r(res["rho"].mean()) if n else None,
+            "kendall_medio": _r(res["kendall"].mean()) if n else None,
+            "identidad": int(res["identidad"].sum()),
+            "inversa": int(res["inversa"].sum()),
+            "consenso": [
+                {"id": g.ids[j], "etiqueta": g.etiquetas[j],
+                 "rank_ponderado": _r(res["media"][j], 2), "rank_consenso": _r(res["consenso"][j], 1)}
+                for j in orden
+            ] if n else [],
+        })
+
+    pares_tot = acc["categorias"]["pares"] + acc["items"]["pares"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distancia = (acc["categorias"]["kd"] + acc["items"]["kd"]) / pares_tot
+        por_tipo = {
+            t: {"kendall": a["kd"] / a["pares"], "spearman": a["rho"] / a["n"]}
+            for t, a in acc.items()
+        }
+    evaluado = pares_tot > 0
+    z = np.zeros(e)
+    z[evaluado] = _z_robusto(distancia[evaluado])
+    outlier = evaluado & (z > umbral)
+    identidad_total = evaluado & (grupos_ident == grupos_eval)
+    inversa_total = evaluado & (grupos_inv == grupos_eval)
+
+    def _opt(x):
+        return None if np.isnan(x) else _r(x)
+
+    evaluaciones = []
+    for i in np.argsort(-np.nan_to_num(distancia, nan=-1.0), kind="stable"):
+        evaluaciones.append({
+            "evaluacion_id": int(rk.eval_ids[i]),
+            "usuario_id": int(rk.usuario_ids[i]),
+            "peso": float(rk.pesos[i]),
+            "distancia": _opt(distancia[i]),
+            "z": _r(z[i], 2),
+            "outlier": bool(outlier[i]),
+            "categorias": {k: _opt(v[i]) for k, v in por_tipo["categorias"].items()},
+            "items": {k: _opt(v[i]) for k, v in por_tipo["items"].items()},
+            "grupos_evaluados": int(grupos_eval[i]),
+            "grupos_identidad": int(grupos_ident[i]),
+            "grupos_inversa": int(grupos_inv[i]),
+            "orden_identidad": bool(identidad_total[i]),
+            "orden_inverso": bool(inversa_total[i]),
+        })
+
+    return {
+        "version": rk.version,
+        "umbral_z": umbral,
+        "total_evaluaciones": e,
+        "total_outliers": int(outlier.sum()),
+        "total_orden_identidad": int(identidad_total.sum()),
+        "total_orden_inverso": int(inversa_total.sum()),
+        "grupos": grupos_out,
+        "evaluaciones": evaluaciones,
+    }
@@ -0,0 +1,223 @@
+# services/admision.py
+# ------------------------------------------------------------
+# Control de admisión y recorte de carga (por worker) para picos de
+# cierre de evaluación.
+#
+# Clases de endpoint (por regla de URL, ver _clase):
+#   guardado   POST /api/evaluacion/...  (init, categorías, ítems, submit)
+#   analitica  GET  /api/admin/results/..., /admin/progress, /overview
+#   (resto, incluido el SSE /stream, no se limita)
+#
+# - Cada clase tiene un límite de concurrencia (semáforo) y una cola de
+#   espera acotada: si la cola está llena, o no se obtiene lugar antes de
+#   ADMISION_<CLASE>_ESPERA segundos, se responde 503 al instante con
+#   Retry-After (con jitter) en vez de quedar esperando el pool MySQL.
+# - Guardados: token bucket por usuario (ADMISION_RATE tokens/s, ráfaga
+#   ADMISION_BURST); excedido -> 429 con Retry-After.
+# - static/js/api.js reintenta 503/429 respetando Retry-After.
+#
+# Límites por defecto (ADMISION_<CLASE>_MAX/COLA los reemplazan):
+# - Con gunicorn gthread se derivan de los hilos del worker
+#   (GUNICORN_THREADS, que gunicorn.conf.py exporta). Un worker nunca
+#   corre más de `threads` requests a la vez, así que un límite >= threads
+#   no recorta nada; y gunicorn.conf.py sube DB_POOL_SIZE a threads + 1,
+#   por eso el pool no sirve de referencia. Guardados: threads // 2 en
+#   curso + threads // 4 esperando; analítica: threads // 4. Quedan hilos
+#   para login, vistas y SSE, y el exceso recibe 503 en vez de encolarse
+#   detrás de los guardados.
+# - Sin gunicorn (python app.py: un hilo por request) el límite lo pone el
+#   pool: guardados DB_POOL_SIZE - 1, dejando una conexión libre.
+# ------------------------------------------------------------
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, g, jsonify, request, session
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER = int(os.getenv("ADMISION_RETRY_AFTER", "2"))
+RATE = float(os.getenv("ADMISION_RATE", "2"))
+BURST = float(os.getenv("ADMISION_BURST", "10"))
+_MAX_BUCKETS = 10000
+
+
+class Limite:
+    """Semáforo con cola de espera acotada y espera máxima."""
+
+    def __init__(self, nombre: str, maximo: int, cola: int, espera: float):
+        self.nombre = nombre
+        self.maximo = max(1, maximo)
+        self.cola = max(0, cola)
+        self.espera = max(0.0, espera)
+        self._sem = threading.BoundedSemaphore(self.maximo)
+        self._lock = threading.Lock()
+        self._esperando = 0
+        self.admitidos = 0
+        self.rechazados = 0
+
+    def entrar(self) -> bool:
+        if self._sem.acquire(blocking=False):
+            with self._lock:
+                self.admitidos += 1
+            return True
+        with self._lock:
+            if self._esperando >= self.cola:
+                self.rechazados += 1
+                return False
+            self._esperando += 1
+        ok = False
+        try:
+            ok = self._sem.acquire(timeout=self.espera) if self.espera else False
+        finally:
+            with self._lock:
+                self._esperando -= 1
+                if ok:
+                    self.admitidos += 1
+                else:
+                    self.rechazados += 1
+        return ok
+
+    def salir(self):
+        self._sem.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max": self.maximo,
+                "cola": self.cola,
+                "esperando": self._esperando,
+                "admitidos": self.admitidos,
+                "rechazados": self.rechazados,
+            }
+
+
+def _limite(nombre: str, maximo: int, cola: int, espera: float) -> Limite:
+    pre = f"ADMISION_{nombre.upper()}_"
+    return Limite(
+        nombre,
+        int(os.getenv(pre + "MAX") or maximo),
+        int(os.getenv(pre + "COLA") or cola),
+        float(os.getenv(pre + "ESPERA") or espera),
+    )
+
+
+_hilos = int(os.getenv("GUNICORN_THREADS") or 0)
+if _hilos:
+    LIMITES: Dict[str, Limite] = {
+        "guardado": _limite("guardado", max(1, _hilos // 2), _hilos // 4, 2.0),
+        "analitica": _limite("analitica", max(1, _hilos // 4), _hilos // 8, 1.0),
+    }
+else:
+    _pool = int(os.getenv("DB_POOL_SIZE", "5"))
+    LIMITES = {
+        "guardado": _limite("guardado", max(1, _pool - 1), 4 * _pool, 2.0),
+        "analitica": _limite("analitica", max(1, _pool // 2), _pool, 1.0),
+    }
+
+
+# =========================
+# Token bucket por usuario
+# =========================
+
+_buckets: Dict[int, Tuple[float, float]] = {}   # usuario_id -> (tokens, t)
+_buckets_lock = threading.Lock()
+_limitados = 0
+
+
+def consumir(usuario_id: int, ahora: Optional[float] = None) -> float:
+    """0.0 si hay token; si no, segundos hasta el siguiente token."""
+    global _limitados
+    if RATE <= 0:
+        return 0.0
+    ahora = time.monotonic() if ahora is None else ahora
+    with _buckets_lock:
+        tokens, t = _buckets.get(usuario_id, (BURST, ahora))
+        tokens = min(BURST, tokens + (ahora - t) * RATE)
+        if tokens >= 1.0:
+            _buckets[usuario_id] = (tokens - 1.0, ahora)
+            return 0.0
+        _buckets[usuario_id] = (tokens, ahora)
+        _limitados += 1
+        if len(_buckets) > _MAX_BUCKETS:
+            # Buckets que ya estarían llenos equivalen a no tener entrada
+            lleno = BURST / RATE
+            for uid in [u for u, (_tk, tt) in _buckets.items() if ahora - tt >= lleno]:
+                del _buckets[uid]
+        return (1.0 - tokens) / RATE
+
+
+# =========================
+# Integración Flask
+# =========================
+
+_clases: Dict[Tuple[str, str], Optional[str]] = {}
+
+
+def _clase(method: str, rule: str) -> Optional[str]:
+    key = (method, rule)
+    if key not in _clases:
+        clase = None
+        if method == "POST" and rule.startswith("/api/evaluacion/"):
+            clase = "guardado"
+        elif method == "GET" and not rule.endswith("/stream") and (
+            rule.startswith("/api/admin/results/")
+            or rule in ("/api/admin/progress", "/api/admin/instruments/overview")
+        ):
+            clase = "analitica"
+        _clases[key] = clase
+    return _clases[key]
+
+
+def _rechazo(error: str, status: int, retry_after: float, extra=None):
+    segundos = max(1, int(retry_after + 0.999)) + random.randint(0, RETRY_AFTER)
+    payload = {"error": error, "retry_after": segundos}
+    if extra:
+        payload.update(extra)
+    resp = jsonify(payload)
+    resp.status_code = status
+    resp.headers["Retry-After"] = str(segundos)
+    return resp
+
+
+def _antes():
+    rule = request.url_rule
+    clase = _clase(request.method, rule.rule) if rule is not None else None
+    if clase is None:
+        return None
+
+    if clase == "guardado" and "usuario_id" in session:
+        espera = consumir(int(session["usuario_id"]))
+        if espera > 0:
+            return _rechazo("rate_limited", 429, espera)
+
+    limite = LIMITES[clase]
+    if not limite.entrar():
+        logger.warning("Admisión: rechazo clase=%s path=%s", clase, request.path)
+        return _rechazo("servidor_ocupado", 503, RETRY_AFTER, {"clase": clase})
+    g._admision = limite
+    return None
+
+
+def _despues(exc):
+    limite = g.pop("_admision", None)
+    if limite is not None:
+        limite.salir()
+
+
+def stats() -> dict:
+    out = {c: lim.stats() for c, lim in LIMITES.items()}
+    with _buckets_lock:
+        out["rate_limit"] = {"rate": RATE, "burst": BURST, "usuarios": len(_buckets), "limitados": _limitados}
+    return out
+
+
+def init_app(app: Flask):
+    if os.getenv("ADMISION", "1") != "1":
+        return
+    app.before_request(_antes)
+    app.teardown_request(_despues)
@@ -0,0 +1,418 @@
+# services/agregados.py
+# ------------------------------------------------------------
+# Agregados incrementales por instrumento (tablas agregado_*).
+#
+# - submit suma (+1) y reopen resta (-1) los vectores de rank de la
+#   evaluación en los acumuladores: n, Σw, Σr, Σr², Σw·r, Σw·r²
+#   (w = rol_peso_snapshot). Las ediciones admin de una evaluación
+#   submitted restan lo anterior y suman lo nuevo.
+# - Los mismos deltas mantienen las matrices por pares
+#   (agregado_par_*: n y Σw de "a quedó arriba de b"); ver services/pares.py.
+# - Los deltas corren en la MISMA transacción que el cambio de status
+#   (usan db.execute sobre la conexión actual; el commit lo hace la ruta).
+# - leer(): medias y desviaciones estándar en O(1) por ítem/categoría.
+# - reconciliar(): compara contra un recálculo completo y opcionalmente
+#   repara. Uso en línea de comandos:
+#     python -m services.agregados reconciliar [--reparar] [instrumento_id ...]
+#   (también sirve como backfill inicial de instalaciones existentes)
+# ------------------------------------------------------------
+
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+if __name__ == "__main__":
+    # CLI: cargar .env ANTES de importar db (DB_CONFIG y el pool se leen al
+    # importar); la app lo hace en su punto de entrada (app.py / wsgi.py)
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+from db import query_one, query_all, execute, commit, rollback  # noqa: E402
+
+_SUMS = ("n", "sum_w", "sum_r", "sum_r2", "sum_wr", "sum_wr2")
+
+
+def _delta_select(signo: int, rank_col: str) -> str:
+    s = int(signo)
+    return (
+        f"{s}, {s}*e.rol_peso_snapshot, {s}*{rank_col}, {s}*{rank_col}*{rank_col}, "
+        f"{s}*e.rol_peso_snapshot*{rank_col}, {s}*e.rol_peso_snapshot*{rank_col}*{rank_col}"
+    )
+
+
+_ON_DUP = "ON DUPLICATE KEY UPDATE " + ", ".join(f"{c}={c}+VALUES({c})" for c in _SUMS)
+
+_PAR_SUMS = ("n", "sum_w")
+_PAR_ON_DUP = "ON DUPLICATE KEY UPDATE n=n+VALUES(n), sum_w=sum_w+VALUES(sum_w)"
+
+
+# =========================
+# Escritura (deltas)
+# =========================
+
+def bloquear_estado(evaluacion_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Lee status/instrumento de la evaluación con SELECT ... FOR UPDATE:
+    serializa guardados, submit y reopen de la misma evaluación para que
+    los deltas se apliquen sobre el status vigente.
+    """
+    return query_one(
+        "SELECT evaluacion_id, instrumento_id, status FROM evaluacion "
+        "WHERE evaluacion_id=%s FOR UPDATE",
+        (evaluacion_id,)
+    )
+
+
+def bump_version(instrumento_id: int, reopen: bool = False):
+    """Incrementa la versión de datos submitted del instrumento (toma su lock de fila)."""
+    execute(
+        "INSERT INTO agregado_version (instrumento_id, version, reopen_count, updated_at) "
+        "VALUES (%s, 1, %s, NOW()) "
+        "ON DUPLICATE KEY UPDATE version=version+1, reopen_count=reopen_count+VALUES(reopen_count), "
+        "updated_at=NOW()",
+        (instrumento_id, 1 if reopen else 0)
+    )
+
+
+def aplicar_delta(evaluacion_id: int, signo: int, categorias: bool = True, items: bool = True,
+                  categoria_code: Optional[str] = None):
+    """
+    Suma (signo=+1) o resta (signo=-1) los ranks guardados de la evaluación
+    en los acumuladores. categoria_code limita el delta de ítems a esa categoría.
+    """
+    if categorias:
+        execute(
+            "INSERT INTO agregado_categoria (instrumento_id, categoria_code, " + ", ".join(_SUMS) + ") "
+            "SELECT ec.instrumento_id, ec.categoria_code, " + _delta_select(signo, "ec.rank_value") + " "
+            "FROM evaluacion_categoria ec "
+            "JOIN evaluacion e ON e.evaluacion_id = ec.evaluacion_id "
+            "WHERE ec.evaluacion_id=%s " + _ON_DUP,
+            (evaluacion_id,)
+        )
+    if items:
+        sql = (
+            "INSERT INTO agregado_item (instrumento_id, item_id, " + ", ".join(_SUMS) + ") "
+            "SELECT e.instrumento_id, ei.item_id, " + _delta_select(signo, "ei.rank_value") + " "
+            "FROM evaluacion_item ei "
+            "JOIN evaluacion e ON e.evaluacion_id = ei.evaluacion_id "
+            "WHERE ei.evaluacion_id=%s "
+        )
+        params = [evaluacion_id]
+        if categoria_code:
+            sql += "AND ei.categoria_code=%s "
+            params.append(categoria_code)
+        execute(sql + _ON_DUP, tuple(params))
+
+    _aplicar_delta_pares(evaluacion_id, signo, categorias, items, categoria_code)
+
+
+def _aplicar_delta_pares(evaluacion_id: int, signo: int, categorias: bool, items: bool,
+                         categoria_code: Optional[str]):
+    """Pares (a arriba de b) de la evaluación: k(k-1)/2 filas por grupo."""
+    s = int(signo)
+    if categorias:
+        execute(
+            "INSERT INTO agregado_par_categoria (instrumento_id, cat_a, cat_b, n, sum_w) "
+            f"SELECT a.instrumento_id, a.categoria_code, b.categoria_code, {s}, {s}*e.rol_peso_snapshot "
+            "FROM evaluacion_categoria a "
+            "JOIN evaluacion_categoria b ON b.evaluacion_id = a.evaluacion_id "
+            "  AND a.rank_value > b.rank_value "
+            "JOIN evaluacion e ON e.evaluacion_id = a.evaluacion_id "
+            "WHERE a.evaluacion_id=%s " + _PAR_ON_DUP,
+            (evaluacion_id,)
+        )
+    if items:
+        sql = (
+            "INSERT INTO agregado_par_item (instrumento_id, item_a, item_b, n, sum_w) "
+            f"SELECT e.instrumento_id, a.item_id, b.item_id, {s}, {s}*e.rol_peso_snapshot "
+            "FROM evaluacion_item a "
+            "JOIN evaluacion_item b ON b.evaluacion_id = a.evaluacion_id "
+            "  AND b.categoria_code = a.categoria_code AND b.rank_group = a.rank_group "
+            "  AND a.rank_value > b.rank_value "
+            "JOIN evaluacion e ON e.evaluacion_id = a.evaluacion_id "
+            "WHERE a.evaluacion_id=%s "
+        )
+        params = [evaluacion_id]
+        if categoria_code:
+            sql += "AND a.categoria_code=%s "
+            params.append(categoria_code)
+        execute(sql + _PAR_ON_DUP, tuple(params))
+
+
+def publicar(instrumento_id: int, evaluacion_id: int, signo: int, reopen: bool = False):
+    """Delta completo de una evaluación (submit: +1, reopen: -1)."""
+    bump_version(instrumento_id, reopen=reopen)
+    aplicar_delta(evaluacion_id, signo)
+
+
+# =========================
+# Lectura
+# =========================
+
+def estadisticas(row: Dict[str, Any]) -> Dict[str, Any]:
+    n = int(row["n"] or 0)
+    sum_w = int(row["sum_w"] or 0)
+    out = {
+        "total_respuestas": n,
+        "rank_ponderado": None,
+        "rank_promedio": None,
+        "std_ponderada": None,
+        "std": None,
+    }
+    if n > 0:
+        mean = int(row["sum_r"]) / n
+        out["rank_promedio"] = round(mean, 2)
+        out["std"] = round(math.sqrt(max(0.0, int(row["sum_r2"]) / n - mean * mean)), 4)
+    if sum_w > 0:
+        wmean = int(row["sum_wr"]) / sum_w
+        out["rank_ponderado"] = round(wmean, 2)
+        out["std_ponderada"] = round(math.sqrt(max(0.0, int(row["sum_wr2"]) / sum_w - wmean * wmean)), 4)
+    return out
+
+
+def version(instrumento_id: int) -> Dict[str, int]:
+    row = query_one(
+        "SELECT version, reopen_count FROM agregado_version WHERE instrumento_id=%s",
+        (instrumento_id,)
+    )
+    if not row:
+        return {"version": 0, "reopen_count": 0}
+    return {"version": int(row["version"]), "reopen_count": int(row["reopen_count"])}
+
+
+def leer(instrumento_id: int) -> Dict[str, Any]:
+    """Medias y desviaciones por categoría e ítem desde los acumuladores."""
+    cats = query_all(
+        "SELECT c.categoria_code, c.orden, c.nombre, " + ", ".join(f"a.{c}" for c in _SUMS) + " "
+        "FROM categoria c "
+        "LEFT JOIN agregado_categoria a ON a.instrumento_id = c.instrumento_id "
+        "  AND a.categoria_code = c.categoria_code "
+        "WHERE c.instrumento_id=%s AND c.is_active=1 "
+        "ORDER BY c.orden",
+        (instrumento_id,)
+    )
+    items = query_all(
+        "SELECT i.item_id, i.categoria_code, i.orden, i.codigo_visible, i.parent_item_id, "
+        + ", ".join(f"a.{c}" for c in _SUMS) + " "
+        "FROM item i "
+        "LEFT JOIN agregado_item a ON a.instrumento_id = i.instrumento_id AND a.item_id = i.item_id "
+        "WHERE i.instrumento_id=%s AND i.is_active=1 "
+        "ORDER BY i.categoria_code, i.orden",
+        (instrumento_id,)
+    )
+
+    out_cats = []
+    for c in cats:
+        d = {"categoria_code": c["categoria_code"], "orden": int(c["orden"]), "nombre": c["nombre"]}
+        d.update(estadisticas(c))
+        out_cats.append(d)
+
+    out_items = []
+    for it in items:
+        parent = int(it["parent_item_id"]) if it.get("parent_item_id") else None
+        d = {
+            "item_id": int(it["item_id"]),
+            "categoria_code": it["categoria_code"],
+            "orden": int(it["orden"]),
+            "codigo_visible": it["codigo_visible"],
+            "parent_item_id": parent,
+            "rank_group": parent or 0,
+        }
+        d.update(estadisticas(it))
+        out_items.append(d)
+
+    out = {"instrumento_id": instrumento_id, "categorias": out_cats, "items": out_items}
+    out.update(version(instrumento_id))
+    return out
+
+
+# =========================
+# Reconciliación
+# =========================
+
+_FULL_CATS = (
+    "SELECT ec.categoria_code AS k, COUNT(*) AS n, SUM(e.rol_peso_snapshot) AS sum_w, "
+    "       SUM(ec.rank_value) AS sum_r, SUM(ec.rank_value*ec.rank_value) AS sum_r2, "
+    "       SUM(e.rol_peso_snapshot*ec.rank_value) AS sum_wr, "
+    "       SUM(e.rol_peso_snapshot*ec.rank_value*ec.rank_value) AS sum_wr2 "
+    "FROM evaluacion e "
+    "JOIN evaluacion_categoria ec ON ec.evaluacion_id = e.evaluacion_id "
+    "WHERE e.instrumento_id=%s AND e.status='submitted' "
+    "GROUP BY ec.categoria_code"
+)
+
+_FULL_ITEMS = (
+    "SELECT ei.item_id AS k, COUNT(*) AS n, SUM(e.rol_peso_snapshot) AS sum_w, "
+    "       SUM(ei.rank_value) AS sum_r, SUM(ei.rank_value*ei.rank_value) AS sum_r2, "
+    "       SUM(e.rol_peso_snapshot*ei.rank_value) AS sum_wr, "
+    "       SUM(e.rol_peso_snapshot*ei.rank_value*ei.rank_value) AS sum_wr2 "
+    "FROM evaluacion e "
+    "JOIN evaluacion_item ei ON ei.evaluacion_id = e.evaluacion_id "
+    "WHERE e.instrumento_id=%s AND e.status='submitted' "
+    "GROUP BY ei.item_id"
+)
+
+
+_FULL_PAR_CATS = (
+    "SELECT CONCAT(a.categoria_code, '>', b.categoria_code) AS k, "
+    "       a.categoria_code AS ka, b.categoria_code AS kb, "
+    "       COUNT(*) AS n, SUM(e.rol_peso_snapshot) AS sum_w "
+    "FROM evaluacion e "
+    "JOIN evaluacion_categoria a ON a.evaluacion_id = e.evaluacion_id "
+    "JOIN evaluacion_categoria b ON b.evaluacion_id = a.evaluacion_id "
+    "  AND a.rank_value > b.rank_value "
+    "WHERE e.instrumento_id=%s AND e.status='submitted' "
+    "GROUP BY a.categoria_code, b.categoria_code"
+)
+
+_FULL_PAR_ITEMS = (
+    "SELECT CONCAT(a.item_id, '>', b.item_id) AS k, a.item_id AS ka, b.item_id AS kb, "
+    "       COUNT(*) AS n, SUM(e.rol_peso_snapshot) AS sum_w "
+    "FROM evaluacion e "
+    "JOIN evaluacion_item a ON a.evaluacion_id = e.evaluacion_id "
+    "JOIN evaluacion_item b ON b.evaluacion_id = a.evaluacion_id "
+    "  AND b.categoria_code = a.categoria_code AND b.rank_group = a.rank_group "
+    "  AND a.rank_value > b.rank_value "
+    "WHERE e.instrumento_id=%s AND e.status='submitted' "
+    "GROUP BY a.item_id, b.item_id"
+)
+
+
+def _as_map(rows, sums=_SUMS) -> Dict[Any, tuple]:
+    out = {}
+    for r in rows:
+        vals = tuple(int(r[c] or 0) for c in sums)
+        if any(vals):
+            out[r["k"]] = vals
+    return out
+
+
+def _diff(kind: str, esperado: Dict[Any, tuple], actual: Dict[Any, tuple],
+          sums=_SUMS) -> List[Dict[str, Any]]:
+    out = []
+    for k in sorted(set(esperado) | set(actual), key=str):
+        e = esperado.get(k, (0,) * len(sums))
+        a = actual.get(k, (0,) * len(sums))
+        if e != a:
+            out.append({"tipo": kind, "clave": k,
+                        "esperado": dict(zip(sums, e)), "acumulado": dict(zip(sums, a))})
+    return out
+
+
+def reconciliar(instrumento_id: int, reparar: bool = False) -> Dict[str, Any]:
+    """
+    Verifica acumuladores vs recálculo completo (solo submitted).
+    Con reparar=True, reescribe los acumuladores del instrumento.
+    """
+    try:
+        # Toma el lock de la fila de versión: los deltas concurrentes del
+        # instrumento esperan a que termine la reconciliación (si no se
+        # repara, el rollback deshace el incremento).
+        bump_version(instrumento_id)
+
+        diferencias = _diff(
+            "categoria",
+            _as_map(query_all(_FULL_CATS, (instrumento_id,))),
+            _as_map(query_all(
+                "SELECT categoria_code AS k, " + ", ".join(_SUMS) + " "
+                "FROM agregado_categoria WHERE instrumento_id=%s",
+                (instrumento_id,)
+            )),
+        ) + _diff(
+            "item",
+            _as_map(query_all(_FULL_ITEMS, (instrumento_id,))),
+            _as_map(query_all(
+                "SELECT item_id AS k, " + ", ".join(_SUMS) + " "
+                "FROM agregado_item WHERE instrumento_id=%s",
+                (instrumento_id,)
+            )),
+        ) + _diff(
+            "par_categoria",
+            _as_map(query_all(_FULL_PAR_CATS, (instrumento_id,)), _PAR_SUMS),
+            _as_map(query_all(
+                "SELECT CONCAT(cat_a, '>', cat_b) AS k, n, sum_w "
+                "FROM agregado_par_categoria WHERE instrumento_id=%s",
+                (instrumento_id,)
+            ), _PAR_SUMS),
+            _PAR_SUMS,
+        ) + _diff(
+            "par_item",
+            _as_map(query_all(_FULL_PAR_ITEMS, (instrumento_id,)), _PAR_SUMS),
+            _as_map(query_all(
+                "SELECT CONCAT(item_a, '>', item_b) AS k, n, sum_w "
+                "FROM agregado_par_item WHERE instrumento_id=%s",
+                (instrumento_id,)
+            ), _PAR_SUMS),
+            _PAR_SUMS,
+        )
+
+        reparado = False
+        if diferencias and reparar:
+            execute("DELETE FROM agregado_categoria WHERE instrumento_id=%s", (instrumento_id,))
+            execute("DELETE FROM agregado_item WHERE instrumento_id=%s", (instrumento_id,))
+            execute(
+                "INSERT INTO agregado_categoria (instrumento_id, categoria_code, " + ", ".join(_SUMS) + ") "
+                "SELECT %s, x.k, x.n, x.sum_w, x.sum_r, x.sum_r2, x.sum_wr, x.sum_wr2 "
+                "FROM (" + _FULL_CATS + ") x",
+                (instrumento_id, instrumento_id)
+            )
+            execute(
+                "INSERT INTO agregado_item (instrumento_id, item_id, " + ", ".join(_SUMS) + ") "
+                "SELECT %s, x.k, x.n, x.sum_w, x.sum_r, x.sum_r2, x.sum_wr, x.sum_wr2 "
+                "FROM (" + _FULL_ITEMS + ") x",
+                (instrumento_id, instrumento_id)
+            )
+            execute("DELETE FROM agregado_par_categoria WHERE instrumento_id=%s", (instrumento_id,))
+            execute("DELETE FROM agregado_par_item WHERE instrumento_id=%s", (instrumento_id,))
+            execute(
+                "INSERT INTO agregado_par_categoria (instrumento_id, cat_a, cat_b, n, sum_w) "
+                "SELECT %s, x.ka, x.kb, x.n, x.sum_w FROM (" + _FULL_PAR_CATS + ") x",
+                (instrumento_id, instrumento_id)
+            )
+            execute(
+                "INSERT INTO agregado_par_item (instrumento_id, item_a, item_b, n, sum_w) "
+                "SELECT %s, x.ka, x.kb, x.n, x.sum_w FROM (" + _FULL_PAR_ITEMS + ") x",
+                (instrumento_id, instrumento_id)
+            )
+            reparado = True
+
+        if reparado:
+            commit()
+        else:
+            rollback()
+    except Exception:
+        rollback()
+        raise
+
+    return {
+        "instrumento_id": instrumento_id,
+        "ok": not diferencias,
+        "diferencias": diferencias,
+        "reparado": reparado,
+    }
+
+
+def _main(argv=None):
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="Reconciliación de agregados incrementales.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("reconciliar")
+    rec.add_argument("--reparar", action="store_true")
+    rec.add_argument("instrumentos", nargs="*", type=int)
+    args = ap.parse_args(argv)
+
+    ids = args.instrumentos or [
+        int(r["instrumento_id"]) for r in query_all("SELECT instrumento_id FROM instrumento ORDER BY instrumento_id")
+    ]
+    failed = False
+    for iid in ids:
+        res = reconciliar(iid, reparar=args.reparar)
+        failed = failed or (not res["ok"] and not res["reparado"])
+        print(json.dumps(res, ensure_ascii=False, default=str))
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    _main()
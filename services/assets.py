@@ -0,0 +1,78 @@
+# services/assets.py
+# ------------------------------------------------------------
+# URLs de assets con hash y entrega de variantes precomprimidas.
+#
+# - asset_url('js/items.js') (global de Jinja): si existe
+#   static/dist/manifest.json (python -m tools.build_assets) devuelve
+#   /static/dist/js/items.<hash>.js; si no, /static/js/items.js.
+# - /static/dist/<archivo>: sirve .br / .gz según Accept-Encoding (misma
+#   negociación con q-values que services/compresion.py, q=0 excluye), con
+#   Cache-Control: public, max-age=31536000, immutable (el nombre cambia
+#   con el contenido, así que nunca hace falta revalidar).
+# - En producción el proxy puede servir static/dist/ directamente con las
+#   mismas cabeceras; esta ruta cubre python app.py / gunicorn solo.
+# ------------------------------------------------------------
+
+import json
+import logging
+import mimetypes
+import os
+from typing import Dict
+
+from flask import Flask, request, send_from_directory, url_for
+
+from services import compresion
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE = 31536000
+_VARIANTES = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest: Dict[str, str] = {}
+_dist_dir = ""
+
+
+def cargar_manifest(static_folder: str) -> Dict[str, str]:
+    path = os.getenv("ASSET_MANIFEST") or os.path.join(static_folder, "dist", "manifest.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        logger.info("Manifest de assets cargado (%s entradas): %s", len(data), path)
+        return data
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.exception("Manifest de assets inválido: %s", path)
+        return {}
+
+
+def asset_url(path: str) -> str:
+    return url_for("static", filename=_manifest.get(path, path))
+
+
+def servir_dist(filename: str):
+    q = compresion.calidades(request.headers.get("Accept-Encoding", ""))
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    resp = None
+    for encoding, ext in _VARIANTES:
+        if compresion.acepta(q, encoding) and os.path.isfile(os.path.join(_dist_dir, filename + ext)):
+            resp = send_from_directory(_dist_dir, filename + ext, mimetype=mimetype, max_age=MAX_AGE)
+            resp.headers["Content-Encoding"] = encoding
+            break
+    if resp is None:
+        resp = send_from_directory(_dist_dir, filename, mimetype=mimetype, max_age=MAX_AGE)
+    resp.headers["Cache-Control"] = f"public, max-age={MAX_AGE}, immutable"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def init_app(app: Flask):
+    global _manifest, _dist_dir
+    _dist_dir = os.path.join(app.static_folder, "dist")
+    _manifest = cargar_manifest(app.static_folder)
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.add_url_rule(
+        f"{app.static_url_path}/dist/<path:filename>",
+        endpoint="assets_dist",
+        view_func=servir_dist,
+    )
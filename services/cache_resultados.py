@@ -0,0 +1,148 @@
+# services/cache_resultados.py
+# ------------------------------------------------------------
+# Caché de respuestas del dashboard admin (admin_results,
+# admin_list_instruments) ya serializadas a JSON.
+#
+# - Clave: (nombre, instrumento_id); cada entrada guarda la "huella" de
+#   los datos con la que se calculó. Huella = conteo y MAX(submitted_at)
+#   por status (índice idx_eval_instr_status) + versión y reopen_count de
+#   agregado_version. Si la huella cambió, la entrada no sirve.
+# - LRU acotado (RESULTS_CACHE_SIZE) y TTL opcional (RESULTS_CACHE_TTL,
+#   segundos; 0 = sin TTL) para cambios que no mueven la huella
+#   (p. ej. nombres de usuario).
+# - Single-flight: si varios admins piden la misma clave+huella a la vez,
+#   uno calcula y los demás esperan su resultado.
+# ------------------------------------------------------------
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from db import query_all, query_one
+
+MAX_ENTRIES = int(os.getenv("RESULTS_CACHE_SIZE", "64"))
+TTL_SECONDS = float(os.getenv("RESULTS_CACHE_TTL", "60"))
+# Tiempo máximo que un seguidor espera al líder antes de calcular por su cuenta
+WAIT_SECONDS = float(os.getenv("RESULTS_CACHE_WAIT", "30"))
+
+
+class CacheLRU:
+    """LRU + TTL de cuerpos serializados, con single-flight por clave+huella."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, str]]" = OrderedDict()
+        self._inflight: Dict[Tuple[Hashable, Any], threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _get_locked(self, key: Hashable, huella: Any) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        fp, created, body = entry
+        if fp != huella or (self.ttl > 0 and time.monotonic() - created > self.ttl):
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return body
+
+    def _put_locked(self, key: Hashable, huella: Any, body: str):
+        self._data[key] = (huella, time.monotonic(), body)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def obtener(self, key: Hashable, huella: Any, construir: Callable[[], str]) -> Tuple[str, str]:
+        """Devuelve (cuerpo, estado) con estado HIT | MISS | WAIT."""
+        flight = (key, huella)
+        with self._lock:
+            body = self._get_locked(key, huella)
+            if body is not None:
+                self.hits += 1
+                return body, "HIT"
+            ev = self._inflight.get(flight)
+            lider = ev is None
+            if lider:
+                ev = self._inflight[flight] = threading.Event()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not lider:
+            ev.wait(WAIT_SECONDS)
+            with self._lock:
+                body = self._get_locked(key, huella)
+            if body is not None:
+                return body, "WAIT"
+            # El líder falló o tardó demasiado: calcular sin compartir
+            return construir(), "MISS"
+
+        try:
+            body = construir()
+            with self._lock:
+                self._put_locked(key, huella, body)
+            return body, "MISS"
+        finally:
+            with self._lock:
+                self._inflight.pop(flight, None)
+            ev.set()
+
+    def invalidar(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+cache = CacheLRU()
+
+
+def huella_instrumento(instrumento_id: int) -> tuple:
+    """Conteo y último submitted_at por status + versión/reopens del instrumento."""
+    rows = query_all(
+        "SELECT status, COUNT(*) AS n, MAX(submitted_at) AS ultimo "
+        "FROM evaluacion WHERE instrumento_id=%s GROUP BY status",
+        (instrumento_id,)
+    )
+    ver = query_one(
+        "SELECT version, reopen_count FROM agregado_version WHERE instrumento_id=%s",
+        (instrumento_id,)
+    )
+    return (
+        tuple(sorted((r["status"], int(r["n"]), str(r["ultimo"])) for r in rows)),
+        (int(ver["version"]), int(ver["reopen_count"])) if ver else (0, 0),
+    )
+
+
+def huella_global() -> tuple:
+    """Huella de todos los instrumentos (para la lista del dashboard)."""
+    rows = query_all(
+        "SELECT instrumento_id, status, COUNT(*) AS n, MAX(submitted_at) AS ultimo "
+        "FROM evaluacion GROUP BY instrumento_id, status"
+    )
+    ver = query_one(
+        "SELECT COALESCE(SUM(version), 0) AS v, COALESCE(SUM(reopen_count), 0) AS r "
+        "FROM agregado_version"
+    )
+    return (
+        tuple(sorted((int(r["instrumento_id"]), r["status"], int(r["n"]), str(r["ultimo"])) for r in rows)),
+        (int(ver["v"]), int(ver["r"])) if ver else (0, 0),
+    )
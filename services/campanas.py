@@ -0,0 +1,227 @@
+# services/campanas.py
+# ------------------------------------------------------------
+# Campañas (periodos de evaluación) por instrumento.
+#
+# - Cada instrumento tiene a lo sumo una campaña 'activa'; las
+#   evaluaciones nuevas se crean en ella (una por usuario y campaña).
+# - Las tablas calientes (evaluacion, evaluacion_categoria,
+#   evaluacion_item[_packed], agregado_*) contienen SOLO la campaña
+#   activa: las consultas del wizard y del dashboard no cambian y su
+#   volumen no crece semestre a semestre.
+# - cerrar(): en una transacción congela la campaña activa en el archivo
+#   (campana_agregado_*: acumuladores; campana_evaluacion*: rankings
+#   submitted por evaluación, filas comprimidas), borra sus evaluaciones
+#   de las tablas calientes (los borradores se descartan), vacía los
+#   acumuladores y abre la campaña siguiente.
+# - comparar(): resultados por campaña desde los snapshots congelados
+#   (más la activa desde los acumuladores), sin recalcular nada.
+#
+# Se usa archivo por campaña y no particionado RANGE/LIST: en MySQL 5.7
+# las tablas InnoDB particionadas no admiten claves foráneas, y todas las
+# tablas de ranking cuelgan de evaluacion con ON DELETE CASCADE.
+# ------------------------------------------------------------
+
+import os
+from typing import Any, Dict, List, Optional
+
+import db
+from db import query_one, query_all, execute, commit, rollback
+from services import agregados
+
+NOMBRE_INICIAL = os.getenv("CAMPANA_INICIAL", "Inicial")
+
+_SUMS = "n, sum_w, sum_r, sum_r2, sum_wr, sum_wr2"
+
+
+def activa(instrumento_id: int) -> Optional[Dict[str, Any]]:
+    """Campaña activa del instrumento; la crea (NOMBRE_INICIAL) si no hay ninguna."""
+    sql = (
+        "SELECT campana_id, nombre, abierta_at FROM campana "
+        "WHERE instrumento_id=%s AND status='activa'"
+    )
+    row = query_one(sql, (instrumento_id,))
+    if row:
+        return row
+    try:
+        # uk_campana_activa: si otro request la creó antes, esto no hace nada
+        execute(
+            "INSERT IGNORE INTO campana (instrumento_id, nombre) VALUES (%s,%s)",
+            (instrumento_id, NOMBRE_INICIAL)
+        )
+        commit()
+    except Exception:
+        rollback()
+        raise
+    return query_one(sql, (instrumento_id,))
+
+
+def listar(instrumento_id: int) -> List[Dict[str, Any]]:
+    rows = query_all(
+        "SELECT campana_id, nombre, status, abierta_at, cerrada_at, total_submitted, total_descartadas "
+        "FROM campana WHERE instrumento_id=%s ORDER BY campana_id",
+        (instrumento_id,)
+    )
+    for r in rows:
+        for k in ("abierta_at", "cerrada_at"):
+            r[k] = r[k].isoformat() if r[k] else None
+        r["campana_id"] = int(r["campana_id"])
+        r["total_submitted"] = int(r["total_submitted"])
+        r["total_descartadas"] = int(r["total_descartadas"])
+    return rows
+
+
+def cerrar(instrumento_id: int, nombre_nueva: str) -> Optional[Dict[str, Any]]:
+    """
+    Archiva la campaña activa y abre `nombre_nueva`. Una sola transacción
+    (con reintento de deadlocks): o queda todo archivado o nada.
+    None si el instrumento no tiene campaña activa.
+    """
+
+    def _tx():
+        act = query_one(
+            "SELECT campana_id FROM campana WHERE instrumento_id=%s AND status='activa' FOR UPDATE",
+            (instrumento_id,)
+        )
+        if not act:
+            return None
+        cid = int(act["campana_id"])
+
+        # Mismo lock que guardados/submit/reopen (agregados.bloquear_estado)
+        evals = query_all(
+            "SELECT evaluacion_id, status FROM evaluacion WHERE campana_id=%s "
+            "ORDER BY evaluacion_id FOR UPDATE",
+            (cid,)
+        )
+        submitted = sum(1 for e in evals if e["status"] == "submitted")
+
+        # Snapshot de acumuladores (ya reflejan solo las submitted)
+        execute(
+            f"INSERT INTO campana_agregado_categoria (campana_id, categoria_code, {_SUMS}) "
+            f"SELECT %s, categoria_code, {_SUMS} FROM agregado_categoria "
+            "WHERE instrumento_id=%s AND n > 0",
+            (cid, instrumento_id)
+        )
+        execute(
+            f"INSERT INTO campana_agregado_item (campana_id, item_id, {_SUMS}) "
+            f"SELECT %s, item_id, {_SUMS} FROM agregado_item "
+            "WHERE instrumento_id=%s AND n > 0",
+            (cid, instrumento_id)
+        )
+
+        # Rankings por evaluación (solo submitted)
+        execute(
+            "INSERT INTO campana_evaluacion (campana_id, evaluacion_id, usuario_id, rol_id_snapshot, "
+            "  rol_peso_snapshot, created_at, submitted_at) "
+            "SELECT campana_id, evaluacion_id, usuario_id, rol_id_snapshot, rol_peso_snapshot, "
+            "  created_at, submitted_at "
+            "FROM evaluacion WHERE campana_id=%s AND status='submitted'",
+            (cid,)
+        )
+        execute(
+            "INSERT INTO campana_evaluacion_categoria (campana_id, evaluacion_id, categoria_code, rank_value) "
+            "SELECT e.campana_id, ec.evaluacion_id, ec.categoria_code, ec.rank_value "
+            "FROM evaluacion e JOIN evaluacion_categoria ec ON ec.evaluacion_id = e.evaluacion_id "
+            "WHERE e.campana_id=%s AND e.status='submitted'",
+            (cid,)
+        )
+        execute(
+            "INSERT INTO campana_evaluacion_item (campana_id, evaluacion_id, item_id, categoria_code, "
+            "  rank_group, rank_value) "
+            "SELECT e.campana_id, ei.evaluacion_id, ei.item_id, ei.categoria_code, ei.rank_group, ei.rank_value "
+            "FROM evaluacion e JOIN evaluacion_item ei ON ei.evaluacion_id = e.evaluacion_id "
+            "WHERE e.campana_id=%s AND e.status='submitted'",
+            (cid,)
+        )
+
+        # Tablas calientes: fuera la campaña (CASCADE a los rankings)
+        execute("DELETE FROM evaluacion WHERE campana_id=%s", (cid,))
+        for tabla in ("agregado_categoria", "agregado_item", "agregado_par_categoria", "agregado_par_item"):
+            execute(f"DELETE FROM {tabla} WHERE instrumento_id=%s", (instrumento_id,))
+        agregados.bump_version(instrumento_id)
+
+        execute(
+            "UPDATE campana SET status='cerrada', cerrada_at=NOW(), total_submitted=%s, total_descartadas=%s "
+            "WHERE campana_id=%s",
+            (submitted, len(evals) - submitted, cid)
+        )
+        nueva = execute(
+            "INSERT INTO campana (instrumento_id, nombre) VALUES (%s,%s)",
+            (instrumento_id, nombre_nueva)
+        )
+        return {
+            "cerrada": {"campana_id": cid, "total_submitted": submitted,
+                        "total_descartadas": len(evals) - submitted},
+            "activa": {"campana_id": int(nueva), "nombre": nombre_nueva},
+        }
+
+    return db.transaccion(_tx, "cerrar_campana")
+
+
+def comparar(instrumento_id: int) -> Dict[str, Any]:
+    """
+    Estadísticas por categoría e ítem en cada campaña: cerradas desde
+    campana_agregado_*, la activa desde los acumuladores vigentes.
+    Incluye códigos/ítems que ya no están en el catálogo activo.
+    """
+    campanas = listar(instrumento_id)
+    cerradas = [c["campana_id"] for c in campanas if c["status"] == "cerrada"]
+
+    filas_cat: List[Dict[str, Any]] = []
+    filas_item: List[Dict[str, Any]] = []
+    if cerradas:
+        marcas = ",".join(["%s"] * len(cerradas))
+        filas_cat = query_all(
+            f"SELECT campana_id, categoria_code, {_SUMS} FROM campana_agregado_categoria "
+            f"WHERE campana_id IN ({marcas})",
+            tuple(cerradas)
+        )
+        filas_item = query_all(
+            f"SELECT campana_id, item_id, {_SUMS} FROM campana_agregado_item "
+            f"WHERE campana_id IN ({marcas})",
+            tuple(cerradas)
+        )
+    act = next((c["campana_id"] for c in campanas if c["status"] == "activa"), None)
+    if act is not None:
+        filas_cat += query_all(
+            f"SELECT %s AS campana_id, categoria_code, {_SUMS} FROM agregado_categoria "
+            "WHERE instrumento_id=%s AND n > 0",
+            (act, instrumento_id)
+        )
+        filas_item += query_all(
+            f"SELECT %s AS campana_id, item_id, {_SUMS} FROM agregado_item "
+            "WHERE instrumento_id=%s AND n > 0",
+            (act, instrumento_id)
+        )
+
+    cats = {
+        r["categoria_code"]: {"categoria_code": r["categoria_code"], "nombre": r["nombre"],
+                              "orden": int(r["orden"]), "por_campana": {}}
+        for r in query_all(
+            "SELECT categoria_code, nombre, orden FROM categoria WHERE instrumento_id=%s ORDER BY orden",
+            (instrumento_id,)
+        )
+    }
+    items = {
+        int(r["item_id"]): {"item_id": int(r["item_id"]), "categoria_code": r["categoria_code"],
+                            "codigo_visible": r["codigo_visible"], "por_campana": {}}
+        for r in query_all(
+            "SELECT item_id, categoria_code, codigo_visible FROM item "
+            "WHERE instrumento_id=%s ORDER BY categoria_code, orden",
+            (instrumento_id,)
+        )
+    }
+    for r in filas_cat:
+        d = cats.setdefault(r["categoria_code"], {"categoria_code": r["categoria_code"], "nombre": None,
+                                                  "orden": None, "por_campana": {}})
+        d["por_campana"][str(int(r["campana_id"]))] = agregados.estadisticas(r)
+    for r in filas_item:
+        d = items.setdefault(int(r["item_id"]), {"item_id": int(r["item_id"]), "categoria_code": None,
+                                                 "codigo_visible": None, "por_campana": {}})
+        d["por_campana"][str(int(r["campana_id"]))] = agregados.estadisticas(r)
+
+    return {
+        "instrumento_id": instrumento_id,
+        "campanas": campanas,
+        "categorias": [d for d in cats.values() if d["por_campana"]],
+        "items": [d for d in items.values() if d["por_campana"]],
+    }
@@ -0,0 +1,239 @@
+# services/catalogo.py
+# ------------------------------------------------------------
+# Caché en memoria del catálogo activo por instrumento (categorías en
+# orden, nº de ítems activos por categoría e índice de estructura).
+#
+# - Versión del catálogo = huella barata (COUNT + SUM(CRC32(...)) de las
+#   filas de categoria/item del instrumento, decenas de filas).
+# - La huella se revisa como máximo cada CATALOGO_CHECK_SECONDS; si no
+#   cambió, se reutiliza la entrada sin releer el catálogo.
+# - Las entradas son inmutables: cada versión es un objeto nuevo.
+# - instrumentos(): lista de instrumentos activos con la misma estrategia.
+#
+# Índice de estructura (Estructura), construido una vez por versión:
+#   item_ids / parent_ids / grupo_de : arreglos compactos (array 'l'),
+#     ítems ordenados por (categoría.orden, rank_group, item.orden)
+#   grupos  : (categoria_code, rank_group, inicio, tamaño); los ítems de
+#             un grupo son contiguos
+#   limites : categoria_code -> (inicio, fin) en los arreglos
+#   pos     : item_id -> posición (búsqueda O(1))
+# ------------------------------------------------------------
+
+import os
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from db import query_all, query_one
+
+CHECK_SECONDS = float(os.getenv("CATALOGO_CHECK_SECONDS", "5"))
+
+
+class Estructura:
+    """Índice compacto e inmutable de ítems y grupos de ranking de un instrumento."""
+
+    __slots__ = ("item_ids", "parent_ids", "grupo_de", "grupos", "limites", "pos", "_grupo_idx")
+
+    def __init__(self, items: List[Dict], orden_cats: List[str]):
+        rank_cat = {code: n for n, code in enumerate(orden_cats)}
+        items = sorted(
+            (it for it in items if it["categoria_code"] in rank_cat),
+            key=lambda it: (rank_cat[it["categoria_code"]], it["rank_group"], it["orden"]),
+        )
+        self.item_ids = array("l", (it["item_id"] for it in items))
+        self.parent_ids = array("l", (it["rank_group"] for it in items))
+        self.grupo_de = array("l", [0] * len(items))
+        self.pos = {it["item_id"]: n for n, it in enumerate(items)}
+
+        grupos = []
+        limites = {}
+        grupo_idx = {}
+        for n, it in enumerate(items):
+            key = (it["categoria_code"], it["rank_group"])
+            g = grupo_idx.get(key)
+            if g is None:
+                g = grupo_idx[key] = len(grupos)
+                grupos.append([it["categoria_code"], it["rank_group"], n, 0])
+            grupos[g][3] += 1
+            self.grupo_de[n] = g
+            ini, _ = limites.get(it["categoria_code"], (n, n))
+            limites[it["categoria_code"]] = (ini, n + 1)
+        self.grupos = tuple(tuple(g) for g in grupos)
+        self.limites = limites
+        self._grupo_idx = grupo_idx
+
+    def rank_group(self, item_id: int) -> Optional[int]:
+        """rank_group del ítem (0 = principal, parent_item_id = sub-ítem); None si no existe."""
+        n = self.pos.get(item_id)
+        return None if n is None else self.parent_ids[n]
+
+    def categoria_de(self, item_id: int) -> Optional[str]:
+        n = self.pos.get(item_id)
+        return None if n is None else self.grupos[self.grupo_de[n]][0]
+
+    def tamano_grupo(self, categoria_code: str, rank_group: int) -> int:
+        g = self._grupo_idx.get((categoria_code, rank_group))
+        return 0 if g is None else self.grupos[g][3]
+
+    def grupos_categoria(self, categoria_code: str) -> List[Tuple[str, int, int, int]]:
+        ini, fin = self.limites.get(categoria_code, (0, 0))
+        if fin <= ini:
+            return []
+        return [g for g in self.grupos[self.grupo_de[ini]:self.grupo_de[fin - 1] + 1]]
+
+    def total_items(self, categoria_code: str) -> int:
+        ini, fin = self.limites.get(categoria_code, (0, 0))
+        return fin - ini
+
+
+class Catalogo:
+    """Catálogo activo de un instrumento (solo lectura)."""
+
+    __slots__ = ("instrumento_id", "huella", "categorias", "codigos", "por_orden",
+                 "items_por_categoria", "total_items", "estructura")
+
+    def __init__(self, instrumento_id: int, huella: Tuple[str, str],
+                 categorias: List[Dict], estructura: Estructura):
+        self.instrumento_id = instrumento_id
+        self.huella = huella
+        # [{"categoria_code", "orden", "nombre"}] en orden
+        self.categorias = categorias
+        self.codigos = frozenset(c["categoria_code"] for c in categorias)
+        self.por_orden = {c["orden"]: c for c in categorias}
+        self.estructura = estructura
+        self.items_por_categoria = {
+            c["categoria_code"]: estructura.total_items(c["categoria_code"]) for c in categorias
+        }
+        self.total_items = len(estructura.item_ids)
+
+    @property
+    def total_categorias(self) -> int:
+        return len(self.categorias)
+
+
+_lock = threading.Lock()
+_cache: Dict[int, Tuple[float, Catalogo]] = {}
+
+
+def huella(instrumento_id: int) -> Tuple[str, str]:
+    row = query_one(
+        "SELECT "
+        " (SELECT CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS('|', categoria_code, orden, "
+        "         is_active, nombre))), 0)) "
+        "  FROM categoria WHERE instrumento_id=%s) AS cats, "
+        " (SELECT CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS('|', item_id, categoria_code, orden, "
+        "         IFNULL(parent_item_id, 0), is_active, codigo_visible))), 0)) "
+        "  FROM item WHERE instrumento_id=%s) AS items",
+        (instrumento_id, instrumento_id)
+    )
+    return (row["cats"], row["items"]) if row else ("", "")
+
+
+def _construir(instrumento_id: int, h: Tuple[str, str]) -> Catalogo:
+    cats = query_all(
+        "SELECT categoria_code, orden, nombre FROM categoria "
+        "WHERE instrumento_id=%s AND is_active=1 ORDER BY orden",
+        (instrumento_id,)
+    )
+    items = query_all(
+        "SELECT item_id, categoria_code, orden, parent_item_id FROM item "
+        "WHERE instrumento_id=%s AND is_active=1",
+        (instrumento_id,)
+    )
+    categorias = [
+        {"categoria_code": c["categoria_code"], "orden": int(c["orden"]), "nombre": c["nombre"]}
+        for c in cats
+    ]
+    estructura = Estructura(
+        [
+            {
+                "item_id": int(it["item_id"]),
+                "categoria_code": it["categoria_code"],
+                "orden": int(it["orden"]),
+                "rank_group": int(it["parent_item_id"]) if it.get("parent_item_id") else 0,
+            }
+            for it in items
+        ],
+        [c["categoria_code"] for c in categorias],
+    )
+    return Catalogo(instrumento_id, h, categorias, estructura)
+
+
+def obtener(instrumento_id: int) -> Catalogo:
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(instrumento_id)
+    if hit is not None and now - hit[0] < CHECK_SECONDS:
+        return hit[1]
+
+    h = huella(instrumento_id)
+    if hit is not None and hit[1].huella == h:
+        cat = hit[1]
+    else:
+        cat = _construir(instrumento_id, h)
+    with _lock:
+        _cache[instrumento_id] = (now, cat)
+    return cat
+
+
+def invalidar(instrumento_id: Optional[int] = None):
+    global _instrumentos
+    with _lock:
+        if instrumento_id is None:
+            _cache.clear()
+            _instrumentos = None
+        else:
+            _cache.pop(instrumento_id, None)
+
+
+# =========================
+# Instrumentos activos
+# =========================
+
+_instrumentos: Optional[Tuple[float, str, Tuple[Dict, ...]]] = None
+
+
+def _huella_instrumentos() -> str:
+    row = query_one(
+        "SELECT CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS('|', instrumento_id, nombre, "
+        "       is_active))), 0)) AS h FROM instrumento"
+    )
+    return row["h"] if row else ""
+
+
+def instrumentos() -> Tuple[Dict, ...]:
+    """Instrumentos activos [{"instrumento_id", "nombre"}] ordenados por id (solo lectura)."""
+    global _instrumentos
+    now = time.monotonic()
+    with _lock:
+        hit = _instrumentos
+    if hit is not None and now - hit[0] < CHECK_SECONDS:
+        return hit[2]
+
+    h = _huella_instrumentos()
+    if hit is not None and hit[1] == h:
+        data = hit[2]
+    else:
+        data = tuple(
+            {"instrumento_id": int(r["instrumento_id"]), "nombre": r["nombre"]}
+            for r in query_all(
+                "SELECT instrumento_id, nombre FROM instrumento WHERE is_active=1 ORDER BY instrumento_id"
+            )
+        )
+    with _lock:
+        _instrumentos = (now, h, data)
+    return data
+
+
+def instrumento(instrumento_id: int) -> Optional[Dict]:
+    for ins in instrumentos():
+        if ins["instrumento_id"] == instrumento_id:
+            return ins
+    return None
+
+
+def huella_instrumentos() -> str:
+    """Huella vigente de la lista de instrumentos (tras instrumentos())."""
+    with _lock:
+        return _instrumentos[1] if _instrumentos else ""
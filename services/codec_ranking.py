@@ -0,0 +1,150 @@
+# services/codec_ranking.py
+# ------------------------------------------------------------
+# Formato empaquetado de rankings de ítems: una fila por (evaluación,
+# categoría) en evaluacion_item_packed en lugar de una fila por ítem.
+#
+# Formato (VERSION 1):
+#   byte 0      : versión
+#   bytes 1..n  : rank_value (uint8) de cada ítem activo de la categoría,
+#                 en el orden del índice de estructura del catálogo
+#                 (rank_group, item.orden); los ítems de cada rank_group
+#                 son contiguos, así que cada tramo es una permutación 1..k.
+#   disposicion : CRC32 de (item_id, rank_group) del orden usado; si el
+#                 catálogo cambia, el paquete deja de ser decodificable y
+#                 se usa la tabla normalizada.
+#
+# Modos (ITEM_STORAGE):
+#   normalizada  (default) solo evaluacion_item
+#   dual         además escribe el paquete en la misma transacción; la
+#                analítica (services/rankings.py) decodifica los paquetes
+#                directo a NumPy y evaluacion_item queda como vista
+#                materializada para SQL ad hoc y para los acumuladores.
+#
+# Backfill de datos existentes: python -m tools.empaquetar_items
+# ------------------------------------------------------------
+
+import os
+import struct
+import zlib
+from typing import Iterable, List, Sequence, Tuple
+
+from db import execute
+from services.catalogo import Estructura
+
+VERSION = 1
+MAX_RANK = 255
+
+NORMALIZADA = "normalizada"
+DUAL = "dual"
+MODO = (os.getenv("ITEM_STORAGE") or NORMALIZADA).strip().lower()
+
+
+class CodecError(ValueError):
+    """Paquete inválido o incompatible con el catálogo vigente."""
+
+
+def dual() -> bool:
+    return MODO == DUAL
+
+
+def _limites(est: Estructura, categoria_code: str) -> Tuple[int, int]:
+    ini, fin = est.limites.get(categoria_code, (0, 0))
+    if fin <= ini:
+        raise CodecError(f"categoría sin ítems: {categoria_code}")
+    return ini, fin
+
+
+def disposicion(est: Estructura, categoria_code: str) -> int:
+    """CRC32 del orden (item_id, rank_group) de la categoría (independiente de plataforma)."""
+    ini, fin = _limites(est, categoria_code)
+    pares = []
+    for p in range(ini, fin):
+        pares.extend((est.item_ids[p], est.parent_ids[p]))
+    return zlib.crc32(struct.pack(f"<{len(pares)}Q", *pares))
+
+
+def validar(est: Estructura, categoria_code: str, ranks: Sequence[int]):
+    """Cada tramo de rank_group debe ser una permutación 1..k."""
+    ini, fin = _limites(est, categoria_code)
+    if len(ranks) != fin - ini:
+        raise CodecError(f"largo {len(ranks)} != {fin - ini} ítems en {categoria_code}")
+    for (_code, rank_group, g_ini, k) in est.grupos_categoria(categoria_code):
+        off = g_ini - ini
+        if sorted(ranks[off:off + k]) != list(range(1, k + 1)):
+            raise CodecError(f"rank_group {rank_group} de {categoria_code} no es permutación 1..{k}")
+
+
+def codificar(est: Estructura, categoria_code: str, filas: Iterable[Sequence]) -> bytes:
+    """Filas normalizadas (evaluacion_id, item_id, code, rank_group, rank) -> paquete."""
+    ini, fin = _limites(est, categoria_code)
+    buf = bytearray(1 + fin - ini)
+    buf[0] = VERSION
+    for f in filas:
+        item_id, val = int(f[1]), int(f[4])
+        p = est.pos.get(item_id)
+        if p is None or not ini <= p < fin:
+            raise CodecError(f"ítem {item_id} no pertenece a {categoria_code}")
+        if not 1 <= val <= MAX_RANK:
+            raise CodecError(f"rank {val} fuera de 1..{MAX_RANK}")
+        buf[1 + p - ini] = val
+    validar(est, categoria_code, buf[1:])
+    return bytes(buf)
+
+
+def decodificar(est: Estructura, categoria_code: str, data: bytes, disp: int) -> List[int]:
+    """Paquete -> ranks en orden de estructura (valida versión, disposición y permutaciones)."""
+    if disp != disposicion(est, categoria_code):
+        raise CodecError(f"disposición de {categoria_code} no coincide con el catálogo vigente")
+    if not data or data[0] != VERSION:
+        raise CodecError("versión de paquete desconocida")
+    ranks = list(data[1:])
+    validar(est, categoria_code, ranks)
+    return ranks
+
+
+def a_filas(est: Estructura, evaluacion_id: int, categoria_code: str,
+            data: bytes, disp: int) -> List[tuple]:
+    """Paquete -> filas normalizadas (para materializar evaluacion_item)."""
+    ranks = decodificar(est, categoria_code, data, disp)
+    ini, _fin = _limites(est, categoria_code)
+    return [
+        (evaluacion_id, est.item_ids[ini + j], categoria_code, est.parent_ids[ini + j], r)
+        for j, r in enumerate(ranks)
+    ]
+
+
+def decodificar_lote(est: Estructura, categoria_code: str, blobs: Sequence[bytes]):
+    """
+    Varios paquetes de la misma categoría -> matriz NumPy E x n (int16),
+    columnas en orden de estructura. Validación vectorizada por grupo.
+    """
+    import numpy as np
+
+    ini, fin = _limites(est, categoria_code)
+    n = fin - ini
+    if any(len(b) != n + 1 for b in blobs):
+        raise CodecError(f"paquete de largo inválido en {categoria_code}")
+    raw = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), n + 1)
+    if (raw[:, 0] != VERSION).any():
+        raise CodecError("versión de paquete desconocida")
+    R = raw[:, 1:].astype(np.int16)
+    for (_code, rank_group, g_ini, k) in est.grupos_categoria(categoria_code):
+        off = g_ini - ini
+        if not (np.sort(R[:, off:off + k], axis=1) == np.arange(1, k + 1, dtype=np.int16)).all():
+            raise CodecError(f"rank_group {rank_group} de {categoria_code} no es permutación 1..{k}")
+    return R
+
+
+# =========================
+# Almacenamiento
+# =========================
+
+def escribir(est: Estructura, evaluacion_id: int, categoria_code: str, filas: Sequence[Sequence]):
+    """Upsert del paquete (en la transacción del llamador)."""
+    execute(
+        "INSERT INTO evaluacion_item_packed (evaluacion_id, categoria_code, disposicion, ranks) "
+        "VALUES (%s,%s,%s,%s) "
+        "ON DUPLICATE KEY UPDATE disposicion=VALUES(disposicion), ranks=VALUES(ranks)",
+        (evaluacion_id, categoria_code, disposicion(est, categoria_code),
+         codificar(est, categoria_code, filas))
+    )
@@ -0,0 +1,272 @@
+# services/compresion.py
+# ------------------------------------------------------------
+# Middleware WSGI de compresión negociada (br / gzip) para HTML, JSON,
+# CSS y JS. Se monta en wsgi.py alrededor de toda la pila
+# (incluido el DispatcherMiddleware de APP_PREFIX).
+#
+# - Negociación por Accept-Encoding (respeta q=0); br solo si el módulo
+#   brotli está instalado.
+# - No toca: respuestas ya codificadas (static/dist/*.br|.gz), 204/304,
+#   HEAD, Cache-Control: no-transform, text/event-stream (SSE), cuerpos
+#   con Content-Length menor a COMPRESS_MIN_SIZE y respuestas por rangos
+#   (206, Content-Range o Accept-Ranges: los offsets del cliente son del
+#   cuerpo sin comprimir).
+# - Sin Content-Length (streaming): compresión incremental con flush por
+#   chunk, sin acumular el cuerpo.
+# - Caché LRU de cuerpos comprimidos para rutas cacheables (catálogo):
+#   clave = (sha1 del cuerpo sin comprimir, codificación), así que nunca
+#   sirve contenido viejo aunque el catálogo cambie.
+# ------------------------------------------------------------
+
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import brotli  # opcional
+except ImportError:  # pragma: no cover
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+CACHE_ENTRIES = int(os.getenv("COMPRESS_CACHE_SIZE", "256"))
+CACHE_PATHS = tuple(
+    p.strip() for p in os.getenv("COMPRESS_CACHE_PATHS", "/api/catalogo/").split(",") if p.strip()
+)
+
+_COMPRIMIBLES = (
+    "text/html", "text/plain", "text/css", "text/javascript",
+    "application/json", "application/javascript", "image/svg+xml",
+)
+
+
+def calidades(accept: str) -> Dict[str, float]:
+    """q de cada codificación en Accept-Encoding (sin q = 1; q inválido = 0)."""
+    q = {}
+    for part in accept.split(","):
+        bits = part.strip().split(";")
+        name = bits[0].strip().lower()
+        if not name:
+            continue
+        val = 1.0
+        for b in bits[1:]:
+            b = b.strip()
+            if b.startswith("q="):
+                try:
+                    val = float(b[2:])
+                except ValueError:
+                    val = 0.0
+        q[name] = val
+    return q
+
+
+def acepta(q: Dict[str, float], encoding: str) -> bool:
+    """encoding aceptada (q > 0, explícita o por "*") según calidades()."""
+    return q.get(encoding, q.get("*", 0)) > 0
+
+
+def _aceptadas(accept: str) -> List[str]:
+    """Codificaciones aceptadas con q>0, en orden de preferencia del servidor."""
+    q = calidades(accept)
+    out = []
+    if brotli is not None and acepta(q, "br"):
+        out.append("br")
+    if acepta(q, "gzip"):
+        out.append("gzip")
+    return out
+
+
+def comprimir(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class _Streaming:
+    """Compresor incremental: cada chunk sale comprimido de inmediato."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def fin(self) -> bytes:
+        return self._c.finish() if self.encoding == "br" else self._c.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_size: int = MIN_SIZE, cache_entries: int = CACHE_ENTRIES,
+                 cache_paths: Tuple[str, ...] = CACHE_PATHS):
+        self.app = app
+        self.min_size = min_size
+        self.cache_paths = cache_paths
+        self.cache_entries = max(0, cache_entries)
+        self._cache: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---- caché de cuerpos comprimidos ----
+    def _comprimir_cacheado(self, body: bytes, encoding: str) -> bytes:
+        key = (hashlib.sha1(body).digest(), encoding)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+        out = comprimir(body, encoding)
+        with self._lock:
+            self._cache[key] = out
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return out
+
+    def _cacheable(self, environ) -> bool:
+        if not self.cache_entries:
+            return False
+        path = environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")
+        return any(p in path for p in self.cache_paths)
+
+    def __call__(self, environ, start_response):
+        encodings = _aceptadas(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        if not encodings or environ.get("REQUEST_METHOD") == "HEAD":
+            return self.app(environ, start_response)
+
+        captured = {}
+
+        def _start(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers
+            captured["exc_info"] = exc_info
+            # write() legado: se desactiva la compresión para esta respuesta
+            return lambda data: captured.setdefault("legacy", []).append(data)
+
+        app_iter = self.app(environ, _start)
+        if "status" not in captured:
+            # start_response diferido hasta el primer chunk
+            close = getattr(app_iter, "close", None)
+            it = iter(app_iter)
+            first = next(it, b"")
+            app_iter = _Chain([first], it, close)
+
+        status = captured["status"]
+        headers = captured["headers"]
+        modo = self._modo(status, headers, captured.get("legacy"))
+        if modo is None:
+            write = start_response(status, headers, captured.get("exc_info"))
+            for data in captured.get("legacy", ()):
+                write(data)
+            return app_iter
+
+        encoding = encodings[0]
+        hdrs = _headers_comprimidos(headers, encoding)
+
+        if modo == "stream":
+            # Streaming: comprimir chunk a chunk
+            start_response(status, hdrs, captured.get("exc_info"))
+            return _StreamIter(app_iter, _Streaming(encoding))
+
+        try:
+            body = b"".join(app_iter)
+        finally:
+            close = getattr(app_iter, "close", None)
+            if close:
+                close()
+        if len(body) < self.min_size:
+            start_response(status, headers, captured.get("exc_info"))
+            return [body]
+        data = self._comprimir_cacheado(body, encoding) if self._cacheable(environ) else comprimir(body, encoding)
+        hdrs.append(("Content-Length", str(len(data))))
+        start_response(status, hdrs, captured.get("exc_info"))
+        return [data]
+
+    def _modo(self, status: str, headers, legacy) -> Optional[str]:
+        """None = pasar tal cual; "buffer" si hay Content-Length; "stream" si no."""
+        if legacy:
+            return None
+        code = status.split(" ", 1)[0]
+        if code in ("204", "206", "304") or code.startswith("1"):
+            return None
+        h = {k.lower(): v for k, v in headers}
+        if "content-encoding" in h:
+            return None
+        if "content-range" in h or h.get("accept-ranges", "none").strip().lower() != "none":
+            return None
+        if "no-transform" in h.get("cache-control", "").lower():
+            return None
+        ctype = h.get("content-type", "").split(";")[0].strip().lower()
+        if ctype == "text/event-stream" or ctype not in _COMPRIMIBLES:
+            return None
+        if "content-length" in h:
+            try:
+                if int(h["content-length"]) < self.min_size:
+                    return None
+            except ValueError:
+                return None
+            return "buffer"
+        return "stream"
+
+
+def _headers_comprimidos(headers, encoding: str):
+    out = []
+    vary = None
+    for k, v in headers:
+        lk = k.lower()
+        if lk == "content-length":
+            continue
+        if lk == "etag" and not v.startswith("W/"):
+            v = "W/" + v
+        if lk == "vary":
+            vary = v
+            continue
+        out.append((k, v))
+    out.append(("Content-Encoding", encoding))
+    if vary and "accept-encoding" not in vary.lower():
+        out.append(("Vary", vary + ", Accept-Encoding"))
+    else:
+        out.append(("Vary", vary or "Accept-Encoding"))
+    return out
+
+
+class _Chain:
+    def __init__(self, head: List[bytes], tail: Iterable[bytes], close):
+        self._head = head
+        self._tail = tail
+        self._close = close
+
+    def __iter__(self):
+        yield from self._head
+        yield from self._tail
+
+    def close(self):
+        if self._close:
+            self._close()
+
+
+class _StreamIter:
+    def __init__(self, app_iter, comp: _Streaming):
+        self._it = app_iter
+        self._comp = comp
+
+    def __iter__(self):
+        for data in self._it:
+            if data:
+                out = self._comp.chunk(data)
+                if out:
+                    yield out
+        yield self._comp.fin()
+
+    def close(self):
+        close = getattr(self._it, "close", None)
+        if close:
+            close()
@@ -0,0 +1,378 @@
+# services/diario.py
+# ------------------------------------------------------------
+# Diario write-behind (opcional) para guardados de borrador.
+#
+# Con DIARIO_WRITE_BEHIND=1, un guardado de categorías/ítems de una
+# evaluación en 'draft' (hecho por su dueño) no escribe en InnoDB: se
+# anota en un diario local SQLite (modo WAL, synchronous=FULL) y se
+# responde. El throughput de guardados queda acotado por el append al
+# diario, no por la latencia de commit de MySQL.
+#
+# - Coalescencia: una fila por (evaluacion_id, tipo, categoria_code); un
+#   guardado nuevo reemplaza al pendiente (solo importa el último estado).
+# - Group commit: los requests encolan y esperan; un hilo escritor junta
+#   lo encolado y lo confirma en una sola transacción SQLite (un fsync).
+# - Vaciado: un hilo por worker pasa lo pendiente a MySQL en lotes
+#   (DIARIO_BATCH evaluaciones por transacción, con db.transaccion). Bajo
+#   el lock de la evaluación (SELECT ... FOR UPDATE) relee la última
+#   versión del diario, así que varios workers pueden vaciar el mismo
+#   archivo sin escribir un estado viejo encima de uno nuevo. Lo escrito
+#   se borra del diario solo si no cambió (seq).
+# - Lectura consistente: submit, init y resumen llaman sincronizar(eid)
+#   antes de leer, que vacía en el acto lo pendiente de esa evaluación.
+# - Si la evaluación ya no está en 'draft' al vaciar, el pendiente se
+#   descarta (el guardado habría sido rechazado con 403 de todos modos).
+# - Si el diario falla o no confirma a tiempo, el guardado cae al camino
+#   síncrono de siempre.
+# - Cierre: submit marca la evaluación en el diario (tabla cierre) ANTES
+#   de sincronizar. El escritor revisa la marca en la misma transacción
+#   SQLite en que anota, así que un guardado queda o bien anotado antes
+#   de la marca (y submit lo vacía) o bien rechazado (camino síncrono,
+#   con lock y 403 si ya se envió). Sin esto, un guardado que leyó
+#   'draft' antes del submit podía confirmarse al cliente y descartarse
+#   al vaciar. Un submit fallido quita su marca; uno exitoso la deja
+#   hasta el reopen o hasta DIARIO_CIERRE_TTL.
+#
+# El archivo es local al host: usar solo si todos los workers corren en
+# la misma máquina (un gunicorn). Los acumuladores de resultados no se
+# ven afectados: solo cuentan evaluaciones submitted.
+# ------------------------------------------------------------
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import db
+from db import execute, executemany
+from services import agregados, catalogo, codec_ranking
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ACTIVO = os.getenv("DIARIO_WRITE_BEHIND", "0") == "1"
+PATH = os.getenv("DIARIO_PATH") or os.path.join(BASE_DIR, "data", "diario_guardados.sqlite3")
+FLUSH_INTERVAL = float(os.getenv("DIARIO_FLUSH_INTERVAL", "0.5"))
+BATCH = int(os.getenv("DIARIO_BATCH", "50"))
+APPEND_TIMEOUT = float(os.getenv("DIARIO_APPEND_TIMEOUT", "5"))
+CIERRE_TTL = float(os.getenv("DIARIO_CIERRE_TTL", "3600"))
+
+CATEGORIAS = "categorias"
+ITEMS = "items"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS pendiente ("
+    "  evaluacion_id INTEGER NOT NULL,"
+    "  tipo TEXT NOT NULL,"
+    "  categoria_code TEXT NOT NULL,"
+    "  filas TEXT NOT NULL,"
+    "  seq INTEGER NOT NULL,"
+    "  PRIMARY KEY (evaluacion_id, tipo, categoria_code))"
+)
+
+# n: submits en curso o exitosos sobre la evaluación (dos clics seguidos)
+_SCHEMA_CIERRE = (
+    "CREATE TABLE IF NOT EXISTS cierre ("
+    "  evaluacion_id INTEGER PRIMARY KEY,"
+    "  n INTEGER NOT NULL,"
+    "  desde REAL NOT NULL)"
+)
+
+_UPSERT = (
+    "INSERT INTO pendiente (evaluacion_id, tipo, categoria_code, filas, seq) VALUES (?,?,?,?,?) "
+    "ON CONFLICT (evaluacion_id, tipo, categoria_code) DO UPDATE SET filas=excluded.filas, seq=excluded.seq"
+)
+
+
+def activo() -> bool:
+    return ACTIVO
+
+
+# =========================
+# SQLite (una conexión por hilo)
+# =========================
+
+_local = threading.local()
+
+
+def _sqlite() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        os.makedirs(os.path.dirname(PATH), exist_ok=True)
+        conn = sqlite3.connect(PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(_SCHEMA)
+        conn.execute(_SCHEMA_CIERRE)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+# =========================
+# Append con group commit
+# =========================
+
+class _Pendiente:
+    __slots__ = ("clave", "filas", "hecho", "error", "rechazado")
+
+    def __init__(self, clave: Tuple[int, str, str], filas: str):
+        self.clave = clave
+        self.filas = filas
+        self.hecho = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.rechazado = False
+
+
+_cond = threading.Condition()
+_cola: List[_Pendiente] = []
+_hilos_pid: Optional[int] = None
+_seq = 0
+_stats = {"anotados": 0, "commits_diario": 0, "vaciados": 0, "descartados": 0,
+          "lotes_mysql": 0, "errores": 0, "rechazados_cierre": 0}
+_stats_lock = threading.Lock()
+
+
+def _contar(campo: str, n: int = 1):
+    with _stats_lock:
+        _stats[campo] += n
+
+
+def _siguiente_seq() -> int:
+    # Creciente por proceso; entre procesos basta con que difiera del leído
+    global _seq
+    _seq = max(_seq + 1, time.time_ns())
+    return _seq
+
+
+def _escritor():
+    while True:
+        with _cond:
+            while not _cola:
+                _cond.wait()
+            lote = _cola[:]
+            del _cola[:]
+        try:
+            conn = _sqlite()
+            conn.execute("BEGIN IMMEDIATE")
+            cerradas = _en_cierre(conn, {p.clave[0] for p in lote})
+            aceptados = [p for p in lote if p.clave[0] not in cerradas]
+            conn.executemany(_UPSERT, [p.clave + (p.filas, _siguiente_seq()) for p in aceptados])
+            conn.execute("COMMIT")
+            for p in lote:
+                p.rechazado = p.clave[0] in cerradas
+            _contar("commits_diario")
+            _contar("anotados", len(aceptados))
+            if len(aceptados) < len(lote):
+                _contar("rechazados_cierre", len(lote) - len(aceptados))
+        except Exception as e:
+            logger.exception("Diario: no se pudo anotar un lote de %s guardados", len(lote))
+            _contar("errores")
+            try:
+                _sqlite().execute("ROLLBACK")
+            except Exception:
+                pass
+            for p in lote:
+                p.error = e
+        for p in lote:
+            p.hecho.set()
+
+
+def _en_cierre(conn: sqlite3.Connection, evals) -> set:
+    evals = list(evals)
+    marcas = ",".join("?" * len(evals))
+    return {int(r[0]) for r in conn.execute(
+        f"SELECT evaluacion_id FROM cierre WHERE evaluacion_id IN ({marcas})", evals
+    )}
+
+
+def _vaciador():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            # Marcas de submits viejos: ya no hay guardados en vuelo anteriores a ellos
+            _sqlite().execute("DELETE FROM cierre WHERE desde < ?", (time.time() - CIERRE_TTL,))
+            while vaciar() >= BATCH:
+                pass
+        except Exception:
+            logger.exception("Diario: error al vaciar a MySQL")
+            _contar("errores")
+            time.sleep(min(5.0, FLUSH_INTERVAL * 4))
+        finally:
+            db.release_connection()
+
+
+def _asegurar_hilos():
+    """Arranca escritor y vaciador una vez por proceso (también tras fork)."""
+    global _hilos_pid, _cond, _cola
+    if _hilos_pid == os.getpid():
+        return
+    with _stats_lock:
+        if _hilos_pid == os.getpid():
+            return
+        if _hilos_pid is not None:
+            # Proceso hijo: la cola/condición del padre no sirven aquí
+            _cond = threading.Condition()
+            _cola = []
+        _sqlite()
+        threading.Thread(target=_escritor, name="diario-escritor", daemon=True).start()
+        threading.Thread(target=_vaciador, name="diario-vaciador", daemon=True).start()
+        _hilos_pid = os.getpid()
+
+
+def anotar(evaluacion_id: int, tipo: str, categoria_code: str, filas: List[tuple]) -> bool:
+    """
+    Anota el guardado en el diario y espera su commit durable.
+    False si el diario no respondió a tiempo, falló o la evaluación está
+    en cierre (usar camino síncrono).
+    """
+    _asegurar_hilos()
+    p = _Pendiente((evaluacion_id, tipo, categoria_code or ""), json.dumps(filas))
+    with _cond:
+        _cola.append(p)
+        _cond.notify()
+    if not p.hecho.wait(APPEND_TIMEOUT) or p.error is not None or p.rechazado:
+        return False
+    return True
+
+
+# =========================
+# Marcas de cierre (submit)
+# =========================
+
+def marcar_cierre(evaluacion_id: int):
+    """Desde aquí el diario rechaza guardados de la evaluación. Llamar antes de sincronizar()."""
+    if not ACTIVO:
+        return
+    _sqlite().execute(
+        "INSERT INTO cierre (evaluacion_id, n, desde) VALUES (?,1,?) "
+        "ON CONFLICT (evaluacion_id) DO UPDATE SET n=n+1, desde=excluded.desde",
+        (evaluacion_id, time.time())
+    )
+
+
+def desmarcar_cierre(evaluacion_id: int):
+    """Submit que no llegó a enviar: quita su marca (la de otro submit en curso sigue)."""
+    if not ACTIVO:
+        return
+    conn = _sqlite()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("UPDATE cierre SET n=n-1 WHERE evaluacion_id=?", (evaluacion_id,))
+        conn.execute("DELETE FROM cierre WHERE evaluacion_id=? AND n<=0", (evaluacion_id,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def reabrir(evaluacion_id: int):
+    """Reopen: la evaluación vuelve a 'draft' y a aceptar guardados diferidos."""
+    if ACTIVO:
+        _sqlite().execute("DELETE FROM cierre WHERE evaluacion_id=?", (evaluacion_id,))
+
+
+# =========================
+# Vaciado a MySQL
+# =========================
+
+def _escribir(tipo: str, instrumento_id: int, evaluacion_id: int, categoria_code: str, filas: List[list]):
+    if tipo == CATEGORIAS:
+        execute("DELETE FROM evaluacion_categoria WHERE evaluacion_id=%s", (evaluacion_id,))
+        executemany(
+            "INSERT INTO evaluacion_categoria (evaluacion_id, instrumento_id, categoria_code, rank_value) "
+            "VALUES (%s,%s,%s,%s)",
+            [tuple(f) for f in filas]
+        )
+    else:
+        execute(
+            "DELETE FROM evaluacion_item WHERE evaluacion_id=%s AND categoria_code=%s",
+            (evaluacion_id, categoria_code)
+        )
+        executemany(
+            "INSERT INTO evaluacion_item (evaluacion_id, item_id, categoria_code, rank_group, rank_value) "
+            "VALUES (%s,%s,%s,%s,%s)",
+            [tuple(f) for f in filas]
+        )
+        if codec_ranking.dual():
+            est = catalogo.obtener(instrumento_id).estructura
+            try:
+                codec_ranking.escribir(est, evaluacion_id, categoria_code, filas)
+            except codec_ranking.CodecError:
+                # Anotado con otro catálogo: sin paquete, la analítica lee evaluacion_item
+                execute(
+                    "DELETE FROM evaluacion_item_packed WHERE evaluacion_id=%s AND categoria_code=%s",
+                    (evaluacion_id, categoria_code)
+                )
+
+
+def vaciar(evaluacion_id: Optional[int] = None) -> int:
+    """
+    Pasa a MySQL lo pendiente (de una evaluación, o hasta BATCH
+    evaluaciones) en una transacción. Devuelve nº de evaluaciones tratadas.
+    """
+    conn = _sqlite()
+    if evaluacion_id is None:
+        evals = [int(r[0]) for r in conn.execute(
+            "SELECT DISTINCT evaluacion_id FROM pendiente ORDER BY evaluacion_id LIMIT ?", (BATCH,)
+        )]
+    else:
+        evals = [evaluacion_id] if conn.execute(
+            "SELECT 1 FROM pendiente WHERE evaluacion_id=? LIMIT 1", (evaluacion_id,)
+        ).fetchone() else []
+    if not evals:
+        return 0
+
+    def _tx():
+        hechas: List[Tuple[int, str, str, int]] = []
+        descartadas = 0
+        # Orden por evaluacion_id: locks en el mismo orden que otros vaciadores
+        for eid in evals:
+            locked = agregados.bloquear_estado(eid)
+            entradas = conn.execute(
+                "SELECT tipo, categoria_code, filas, seq FROM pendiente WHERE evaluacion_id=?", (eid,)
+            ).fetchall()
+            for tipo, code, filas, seq in entradas:
+                if locked and locked["status"] == "draft":
+                    _escribir(tipo, int(locked["instrumento_id"]), eid, code, json.loads(filas))
+                else:
+                    descartadas += 1
+                hechas.append((eid, tipo, code, seq))
+        return hechas, descartadas
+
+    hechas, descartadas = db.transaccion(_tx, "diario_vaciado")
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany(
+        "DELETE FROM pendiente WHERE evaluacion_id=? AND tipo=? AND categoria_code=? AND seq=?", hechas
+    )
+    conn.execute("COMMIT")
+    _contar("lotes_mysql")
+    _contar("vaciados", len(hechas) - descartadas)
+    if descartadas:
+        _contar("descartados", descartadas)
+        logger.info("Diario: %s guardados descartados (evaluación ya no está en draft)", descartadas)
+    return len(evals)
+
+
+def sincronizar(evaluacion_id: int):
+    """Vacía en el acto lo pendiente de la evaluación (antes de leerla o enviarla)."""
+    if ACTIVO:
+        _asegurar_hilos()
+        vaciar(evaluacion_id)
+
+
+def stats() -> Dict[str, object]:
+    if not ACTIVO:
+        return {"enabled": False}
+    with _stats_lock:
+        out: Dict[str, object] = dict(_stats)
+    out["enabled"] = True
+    try:
+        out["pendientes"] = _sqlite().execute("SELECT COUNT(*) FROM pendiente").fetchone()[0]
+    except sqlite3.Error:
+        out["pendientes"] = None
+    return out
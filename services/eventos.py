@@ -0,0 +1,166 @@
+# services/eventos.py
+# ------------------------------------------------------------
+# Stream SSE (Server-Sent Events) de resultados por instrumento.
+#
+# - notificar(instrumento_id): despierta a los streams de ESTE proceso
+#   tras un commit (submit/reopen/edición admin).
+# - Entre procesos (workers de gunicorn) el cambio se detecta con un
+#   sondeo barato a agregado_version (PK) cada SSE_POLL_SECONDS.
+# - Solo cuando cambia la versión se leen los acumuladores
+#   (services/agregados.py, O(ítems)) y se emiten deltas:
+#     event: delta
+#     data: {"version", "total_submitted", "total_draft",
+#            "categorias": [cambiadas], "items": [cambiados]}
+# - Cada stream ocupa un hilo del worker: se cierra a los
+#   SSE_MAX_SECONDS y el EventSource del navegador reconecta solo.
+# - A lo sumo SSE_MAX_STREAMS streams por proceso (reservar_stream); el
+#   resto recibe 503 + Retry-After para que los streams no dejen sin
+#   hilos a los guardados. gunicorn.conf.py lo fija en threads // 2.
+# - La conexión MySQL se regresa al pool entre sondeos.
+# ------------------------------------------------------------
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from db import query_all, release_connection
+from services import agregados
+
+POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "2"))
+HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", "300"))
+RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+MAX_STREAMS = max(1, int(os.getenv("SSE_MAX_STREAMS", "2")))
+# Segundos sugeridos al cliente cuando no hay cupo
+OCUPADO_RETRY_AFTER = int(os.getenv("SSE_BUSY_RETRY_AFTER", "30"))
+
+_cond = threading.Condition()
+_seq: Dict[int, int] = {}
+
+
+_streams = threading.BoundedSemaphore(MAX_STREAMS)
+_streams_lock = threading.Lock()
+_streams_stats = {"activos": 0, "rechazados": 0}
+
+
+def reservar_stream() -> Optional[Callable[[], None]]:
+    """
+    Cupo para un stream SSE en este proceso. None si no hay; si no, una
+    función liberar() idempotente (llamarla al cerrar la respuesta).
+    """
+    if not _streams.acquire(blocking=False):
+        with _streams_lock:
+            _streams_stats["rechazados"] += 1
+        return None
+    with _streams_lock:
+        _streams_stats["activos"] += 1
+    hecho = []
+
+    def liberar():
+        with _streams_lock:
+            if hecho:
+                return
+            hecho.append(True)
+            _streams_stats["activos"] -= 1
+        _streams.release()
+
+    return liberar
+
+
+def stats() -> Dict[str, int]:
+    with _streams_lock:
+        return {"max": MAX_STREAMS, **_streams_stats}
+
+
+def notificar(instrumento_id: int):
+    """Despierta los streams locales del instrumento (llamar después del commit)."""
+    with _cond:
+        _seq[instrumento_id] = _seq.get(instrumento_id, 0) + 1
+        _cond.notify_all()
+
+
+def _esperar(instrumento_id: int, visto: int, timeout: float) -> int:
+    with _cond:
+        _cond.wait_for(lambda: _seq.get(instrumento_id, 0) != visto, timeout=timeout)
+        return _seq.get(instrumento_id, 0)
+
+
+def _conteos(instrumento_id: int) -> Dict[str, int]:
+    rows = query_all(
+        "SELECT status, COUNT(*) AS total FROM evaluacion "
+        "WHERE instrumento_id=%s GROUP BY status",
+        (instrumento_id,)
+    )
+    by_status = {r["status"]: int(r["total"]) for r in rows}
+    return {
+        "total_submitted": by_status.get("submitted", 0),
+        "total_draft": by_status.get("draft", 0),
+    }
+
+
+_CAMPOS = ("rank_ponderado", "rank_promedio", "std_ponderada", "std", "total_respuestas")
+
+
+def _snapshot(data: Dict[str, Any]) -> Dict[Tuple[str, Any], Dict[str, Any]]:
+    snap = {}
+    for c in data["categorias"]:
+        snap[("c", c["categoria_code"])] = {"categoria_code": c["categoria_code"],
+                                            **{k: c[k] for k in _CAMPOS}}
+    for it in data["items"]:
+        snap[("i", it["item_id"])] = {"item_id": it["item_id"], "categoria_code": it["categoria_code"],
+                                      **{k: it[k] for k in _CAMPOS}}
+    return snap
+
+
+def _sse(event: str, payload: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+def stream_resultados(instrumento_id: int, since: Optional[int] = None) -> Iterator[str]:
+    """
+    Generador SSE. `since` es la versión que el cliente ya tiene (de
+    admin_results o Last-Event-ID); si hay algo más nuevo se emite de inmediato.
+    """
+    yield f"retry: {RETRY_MS}\n\n"
+
+    started = time.monotonic()
+    last_beat = started
+    local_seq = _seq.get(instrumento_id, 0)
+    prev = None
+    version_vista = since
+
+    try:
+        while time.monotonic() - started < MAX_SECONDS:
+            v = agregados.version(instrumento_id)["version"]
+            if version_vista is None or v != version_vista:
+                data = agregados.leer(instrumento_id)
+                snap = _snapshot(data)
+                if prev is None and version_vista is None:
+                    # Primer sondeo sin versión del cliente: solo fija la base
+                    prev = snap
+                else:
+                    changed = [val for key, val in snap.items() if prev is None or prev.get(key) != val]
+                    prev = snap
+                    payload = {
+                        "version": data["version"],
+                        **_conteos(instrumento_id),
+                        "categorias": [c for c in changed if "item_id" not in c],
+                        "items": [c for c in changed if "item_id" in c],
+                    }
+                    yield _sse("delta", payload, data["version"])
+                    last_beat = time.monotonic()
+                version_vista = data["version"]
+
+            # No retener la conexión ni el snapshot de la transacción entre sondeos
+            release_connection()
+
+            if time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+                yield ": ping\n\n"
+                last_beat = time.monotonic()
+
+            local_seq = _esperar(instrumento_id, local_seq, POLL_SECONDS)
+    finally:
+        release_connection()
@@ -0,0 +1,176 @@
+# services/idempotencia.py
+# ------------------------------------------------------------
+# Soporte de la cabecera Idempotency-Key en guardados y submit
+# (POST /api/evaluacion/<id>/categorias, /items/<code>, /submit).
+#
+# - Clave = (usuario_id, método, ruta, Idempotency-Key). Se guarda la
+#   huella (sha256) del cuerpo del request y la respuesta ya serializada.
+# - Reintento con la misma clave y el mismo cuerpo: se responde la
+#   respuesta guardada sin tocar MySQL (cabecera Idempotent-Replayed).
+# - Misma clave con otro cuerpo: 422 idempotency_key_reutilizada.
+# - Dos requests simultáneos con la misma clave (doble clic): el segundo
+#   espera al primero (IDEMPOTENCY_WAIT) y recibe su respuesta; si no
+#   termina a tiempo -> 409 idempotency_key_en_proceso.
+# - Solo se guardan respuestas < 500 (y no 429): un error transitorio
+#   se vuelve a intentar de verdad.
+# - Almacén en memoria por worker, acotado (IDEMPOTENCY_MAX_ENTRIES, LRU)
+#   y de vida corta (IDEMPOTENCY_TTL). Un reintento que cae en otro worker
+#   vuelve a ejecutar el guardado, que de todos modos es idempotente
+#   (DELETE + INSERT / transición draft -> submitted).
+# ------------------------------------------------------------
+
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple
+
+from flask import Response, current_app, jsonify, request, session
+
+MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "5000"))
+TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL", "300"))
+WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+MAX_KEY_LEN = 255
+# Respuestas más grandes no se guardan (los guardados responden JSON corto)
+MAX_BODY_BYTES = 64 * 1024
+
+
+class Guardada(NamedTuple):
+    huella: bytes
+    creada: float
+    status: int
+    body: bytes
+    mimetype: str
+
+
+class Almacen:
+    """LRU + TTL de respuestas por clave de idempotencia, con espera por clave en curso."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Guardada]" = OrderedDict()
+        self._inflight: Dict[Hashable, Tuple[bytes, threading.Event]] = {}
+        self.replays = 0
+        self.conflictos = 0
+        self.guardadas = 0
+
+    def _get_locked(self, clave: Hashable) -> Optional[Guardada]:
+        e = self._data.get(clave)
+        if e is None:
+            return None
+        if time.monotonic() - e.creada > self.ttl:
+            del self._data[clave]
+            return None
+        self._data.move_to_end(clave)
+        return e
+
+    def reservar(self, clave: Hashable, huella: bytes) -> Tuple[str, Optional[Guardada]]:
+        """
+        -> ("replay", guardada) | ("conflicto", None) | ("en_proceso", None)
+           | ("lider", None): el llamador ejecuta y luego guardar()/liberar().
+        """
+        deadline = time.monotonic() + WAIT_SECONDS
+        while True:
+            with self._lock:
+                e = self._get_locked(clave)
+                if e is not None:
+                    if e.huella != huella:
+                        self.conflictos += 1
+                        return "conflicto", None
+                    self.replays += 1
+                    return "replay", e
+                vuelo = self._inflight.get(clave)
+                if vuelo is None:
+                    self._inflight[clave] = (huella, threading.Event())
+                    return "lider", None
+                if vuelo[0] != huella:
+                    self.conflictos += 1
+                    return "conflicto", None
+            restante = deadline - time.monotonic()
+            if restante <= 0 or not vuelo[1].wait(restante):
+                return "en_proceso", None
+            # El líder terminó: releer (si no guardó nada, este toma su lugar)
+
+    def guardar(self, clave: Hashable, e: Guardada):
+        with self._lock:
+            self._data[clave] = e
+            self._data.move_to_end(clave)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self.guardadas += 1
+        self.liberar(clave)
+
+    def liberar(self, clave: Hashable):
+        with self._lock:
+            vuelo = self._inflight.pop(clave, None)
+        if vuelo is not None:
+            vuelo[1].set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "en_curso": len(self._inflight),
+                "guardadas": self.guardadas,
+                "replays": self.replays,
+                "conflictos": self.conflictos,
+            }
+
+
+almacen = Almacen()
+
+
+def _error(msg: str, code: int):
+    resp = jsonify({"error": msg})
+    resp.status_code = code
+    return resp
+
+
+def idempotente(view):
+    """Decorador de vista: aplica Idempotency-Key si el cliente la manda."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key or "usuario_id" not in session:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LEN:
+            return _error("idempotency_key_invalida", 400)
+
+        clave = (int(session["usuario_id"]), request.method, request.path, key)
+        huella = hashlib.sha256(request.get_data(cache=True)).digest()
+        estado, e = almacen.reservar(clave, huella)
+        if estado == "replay":
+            resp = Response(e.body, status=e.status, mimetype=e.mimetype)
+            resp.headers["Idempotent-Replayed"] = "true"
+            return resp
+        if estado == "conflicto":
+            return _error("idempotency_key_reutilizada", 422)
+        if estado == "en_proceso":
+            return _error("idempotency_key_en_proceso", 409)
+
+        try:
+            resp = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            almacen.liberar(clave)
+            raise
+        if resp.status_code < 500 and resp.status_code != 429 and not resp.is_streamed:
+            body = resp.get_data()
+            if len(body) <= MAX_BODY_BYTES:
+                almacen.guardar(clave, Guardada(huella, time.monotonic(), resp.status_code,
+                                                body, resp.mimetype or "application/json"))
+                return resp
+        almacen.liberar(clave)
+        return resp
+
+    return wrapper
+
+
+def stats() -> dict:
+    return almacen.stats()
@@ -0,0 +1,157 @@
+# services/log_async.py
+# ------------------------------------------------------------
+# Logging asíncrono (no bloqueante) para multicriterio IPEPD.
+#
+# - Los hilos de request solo encolan el registro (put_nowait) en una
+#   cola acotada; nunca esperan disco, fsync ni rotación de archivos.
+# - Un hilo escritor (QueueListener) entrega los registros a los handlers
+#   reales (TimedRotatingFileHandler + StreamHandler).
+# - Si la cola se llena, el registro se descarta y se contabiliza;
+#   el escritor reporta los descartes como WARNING cuando hay espacio.
+# - Formato opcional JSON (una línea por registro): LOG_FORMAT=json
+# ------------------------------------------------------------
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler que nunca bloquea: si la cola está llena, descarta y cuenta."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolver mensaje y traceback en el hilo emisor (los args/exc_info
+        # pueden no ser seguros de usar desde otro hilo), sin pre-formatear
+        # con el formato final: eso lo hace el handler real.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class _ReportingListener(QueueListener):
+    """QueueListener que reporta los registros descartados por cola llena."""
+
+    def __init__(self, q, qhandler: BoundedQueueHandler, *handlers):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self._qhandler = qhandler
+        self._reported = 0
+
+    def handle(self, record: logging.LogRecord):
+        dropped = self._qhandler.dropped
+        if dropped > self._reported:
+            lost = dropped - self._reported
+            self._reported = dropped
+            super().handle(logging.makeLogRecord({
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": "Cola de logging llena: %d registros descartados (total=%d)" % (lost, dropped),
+            }))
+        super().handle(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea (para ingesta estructurada)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = self.formatException(record.exc_info)
+        if exc_text:
+            payload["exc"] = exc_text
+        if record.stack_info:
+            payload["stack"] = record.stack_info
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+_queue_handler = None
+_listener = None
+
+
+def install(root: logging.Logger, handlers, queue_size: int = 10000) -> BoundedQueueHandler:
+    """
+    Conecta el root logger a una cola acotada y arranca el hilo escritor
+    con los handlers dados. Idempotente por proceso.
+    """
+    global _queue_handler, _listener
+    if _queue_handler is not None:
+        return _queue_handler
+
+    q = queue.Queue(maxsize=max(1, int(queue_size)))
+    _queue_handler = BoundedQueueHandler(q)
+    _listener = _ReportingListener(q, _queue_handler, *handlers)
+    _listener.start()
+    root.addHandler(_queue_handler)
+    atexit.register(stop)
+    return _queue_handler
+
+
+def stop():
+    """Detiene el hilo escritor vaciando primero la cola (flush en shutdown)."""
+    global _listener
+    if _listener is not None and _listener._thread is not None:
+        try:
+            _listener.stop()
+        except Exception:
+            pass
+
+
+def reiniciar_tras_fork():
+    """
+    En un proceso hijo (post_fork de gunicorn) el hilo escritor no existe y
+    la cola pudo quedar con su lock tomado por ese hilo: se crea una cola
+    nueva y un escritor nuevo con los mismos handlers.
+    """
+    global _listener
+    if _queue_handler is None or _listener is None:
+        return
+    q = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+    _queue_handler.queue = q
+    _queue_handler.dropped = 0
+    _queue_handler._lock = threading.Lock()
+    _listener = _ReportingListener(q, _queue_handler, *_listener.handlers)
+    _listener.start()
+
+
+def stats() -> dict:
+    """Métricas de la cola de logging del proceso actual."""
+    if _queue_handler is None:
+        return {"enabled": False}
+    q = _queue_handler.queue
+    return {
+        "enabled": True,
+        "queued": q.qsize(),
+        "capacity": q.maxsize,
+        "dropped": _queue_handler.dropped,
+    }
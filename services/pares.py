@@ -0,0 +1,134 @@
+# services/pares.py
+# ------------------------------------------------------------
+# Matrices de preferencia por pares por instrumento y grupo de ranking,
+# base de Condorcet / Copeland / Schulze / Bradley-Terry.
+#
+# - W[i, j] = Σ rol_peso_snapshot de las evaluaciones submitted que
+#   pusieron i arriba de j (rank_value mayor); N[i, j] = conteo.
+# - Fuente: acumuladores agregado_par_* (services/agregados.py), que se
+#   actualizan con deltas en submit/reopen/edición admin, así que leerlos
+#   cuesta O(k²) por grupo sin recorrer evaluacion_item.
+# - Caché en memoria por proceso, válida mientras no cambien
+#   agregado_version ni la huella del catálogo (services/catalogo.py); un
+#   cambio en cualquier worker la invalida.
+# ------------------------------------------------------------
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from db import query_all
+from services import agregados, catalogo
+from services.rankings import CAT, ITEM, grupos_catalogo
+
+
+class MatrizPares:
+    """Matriz de pares de un grupo (categorías o ítems de un rank_group)."""
+
+    __slots__ = ("clave", "ids", "etiquetas", "W", "N")
+
+    def __init__(self, clave: Tuple[str, Optional[str], int], ids: List[Any], etiquetas: List[str]):
+        k = len(ids)
+        self.clave = clave
+        self.ids = ids
+        self.etiquetas = etiquetas
+        self.W = np.zeros((k, k), dtype=np.float64)
+        self.N = np.zeros((k, k), dtype=np.int64)
+
+    @property
+    def k(self) -> int:
+        return len(self.ids)
+
+    def margen(self) -> np.ndarray:
+        """W - Wᵀ: > 0 donde i le gana a j en mayoría ponderada."""
+        return self.W - self.W.T
+
+    def to_json(self) -> Dict[str, Any]:
+        tipo, code, rank_group = self.clave
+        return {
+            "tipo": tipo,
+            "categoria_code": code,
+            "rank_group": rank_group,
+            "ids": self.ids,
+            "etiquetas": self.etiquetas,
+            "w": self.W.astype(np.int64).tolist(),
+            "n": self.N.tolist(),
+        }
+
+
+_lock = threading.Lock()
+# instrumento -> (huella del catálogo, (version, matrices))
+_cache: Dict[int, Tuple[Tuple[str, str], Tuple[int, Dict[tuple, MatrizPares]]]] = {}
+
+
+def _construir(instrumento_id: int) -> Dict[tuple, MatrizPares]:
+    matrices: Dict[tuple, MatrizPares] = {}
+    cat_pos: Dict[str, int] = {}
+    item_pos: Dict[int, Tuple[tuple, int]] = {}
+    for key, g in grupos_catalogo(instrumento_id).items():
+        matrices[key] = MatrizPares(key, g.ids, g.etiquetas)
+        for j, ident in enumerate(g.ids):
+            if key[0] == CAT:
+                cat_pos[ident] = j
+            else:
+                item_pos[ident] = (key, j)
+
+    m = matrices[(CAT, None, 0)]
+    for r in query_all(
+        "SELECT cat_a, cat_b, n, sum_w FROM agregado_par_categoria WHERE instrumento_id=%s",
+        (instrumento_id,)
+    ):
+        a, b = cat_pos.get(r["cat_a"]), cat_pos.get(r["cat_b"])
+        if a is not None and b is not None:
+            m.N[a, b] = int(r["n"])
+            m.W[a, b] = int(r["sum_w"])
+
+    for r in query_all(
+        "SELECT item_a, item_b, n, sum_w FROM agregado_par_item WHERE instrumento_id=%s",
+        (instrumento_id,)
+    ):
+        pa, pb = item_pos.get(int(r["item_a"])), item_pos.get(int(r["item_b"]))
+        if pa is None or pb is None or pa[0] != pb[0]:
+            continue
+        m = matrices[pa[0]]
+        m.N[pa[1], pb[1]] = int(r["n"])
+        m.W[pa[1], pb[1]] = int(r["sum_w"])
+
+    return matrices
+
+
+def obtener(instrumento_id: int) -> Tuple[int, Dict[tuple, MatrizPares]]:
+    """
+    (version, {clave_grupo: MatrizPares}). Las matrices se comparten
+    entre análisis: tratarlas como solo lectura.
+    """
+    v = agregados.version(instrumento_id)["version"]
+    h = catalogo.obtener(instrumento_id).huella
+    with _lock:
+        hit = _cache.get(instrumento_id)
+    if hit and hit[1][0] == v and hit[0] == h:
+        return hit[1]
+
+    out = (v, _construir(instrumento_id))
+    with _lock:
+        prev = _cache.get(instrumento_id)
+        if prev is None or prev[1][0] <= v:
+            _cache[instrumento_id] = (h, out)
+    return out
+
+
+def invalidar(instrumento_id: Optional[int] = None):
+    with _lock:
+        if instrumento_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(instrumento_id, None)
+
+
+def categorias(instrumento_id: int) -> MatrizPares:
+    return obtener(instrumento_id)[1][(CAT, None, 0)]
+
+
+def items(instrumento_id: int, categoria_code: str, rank_group: int = 0) -> Optional[MatrizPares]:
+    return obtener(instrumento_id)[1].get((ITEM, categoria_code, rank_group))
@@ -0,0 +1,127 @@
+# services/plackett_luce.py
+# ------------------------------------------------------------
+# Parámetros de "worth" Plackett-Luce por grupo de ranking (categorías y
+# cada grupo de ítems), ponderados por rol_peso_snapshot.
+#
+# Ajuste por MM (Hunter, 2004) vectorizado sobre la matriz E x k:
+#   O[e, p]  = elemento en la posición p (p=0 el más importante,
+#              es decir rank_value mayor)
+#   S[e, p]  = Σ_{t>=p} γ[O[e, t]]                (sumas de sufijo)
+#   γ_i  <-  Σ_e w_e·[i no es último] / Σ_e w_e Σ_{p<=pos(i), p<k-1} 1/S[e, p]
+# Cada iteración es O(E·k) con cumsum + bincount (sin bucles por par).
+#
+# Control: tolerancia sobre max |Δ log γ|, máximo de iteraciones y
+# presupuesto de tiempo compartido por todos los grupos del instrumento;
+# si se agota, se devuelve el último γ con converged=False.
+# ------------------------------------------------------------
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from services.rankings import Grupo, Rankings
+
+TOL = float(os.getenv("PL_TOL", "1e-6"))
+MAX_ITER = int(os.getenv("PL_MAX_ITER", "1000"))
+PRESUPUESTO_SEG = float(os.getenv("PL_TIME_BUDGET", "1.5"))
+
+_PISO = 1e-12
+
+
+def ajustar(R: np.ndarray, w: np.ndarray, tol: float = TOL, max_iter: int = MAX_ITER,
+            limite: Optional[float] = None) -> Dict[str, Any]:
+    """
+    R: E x k ranks completos (mayor = más importante); w: pesos (E).
+    limite: instante time.monotonic() en que hay que detenerse.
+    """
+    e, k = R.shape
+    gamma = np.full(k, 1.0 / k)
+    if e == 0 or k < 2 or w.sum() <= 0:
+        return {"gamma": gamma, "iteraciones": 0, "converged": True, "delta": 0.0, "loglik": 0.0}
+
+    O = np.argsort(-R, axis=1, kind="stable")
+    flat = O.ravel()
+    # Victorias ponderadas: cada elemento que no quedó último fue "elegido" una vez
+    ganadas = np.bincount(O[:, :-1].ravel(), weights=np.repeat(w, k - 1), minlength=k)
+    wcol = w[:, None]
+
+    it = 0
+    delta = np.inf
+    converged = False
+    while it < max_iter:
+        G = gamma[O]
+        S = np.cumsum(G[:, ::-1], axis=1)[:, ::-1]
+        C = np.cumsum(wcol / S[:, :-1], axis=1)
+        D = np.empty((e, k))
+        D[:, :-1] = C
+        D[:, -1] = C[:, -1]
+        den = np.bincount(flat, weights=D.ravel(), minlength=k)
+
+        nuevo = np.maximum(ganadas / den, _PISO)
+        nuevo /= nuevo.sum()
+        delta = float(np.max(np.abs(np.log(nuevo) - np.log(gamma))))
+        gamma = nuevo
+        it += 1
+        if delta < tol:
+            converged = True
+            break
+        if limite is not None and time.monotonic() >= limite:
+            break
+
+    G = gamma[O]
+    S = np.cumsum(G[:, ::-1], axis=1)[:, ::-1]
+    loglik = float((w * (np.log(G[:, :-1]) - np.log(S[:, :-1])).sum(axis=1)).sum())
+    return {"gamma": gamma, "iteraciones": it, "converged": converged, "delta": delta, "loglik": loglik}
+
+
+def _r(x, nd=6):
+    return round(float(x), nd)
+
+
+def _grupo(g: Grupo, pesos: np.ndarray, limite: float, tol: float, max_iter: int) -> Dict[str, Any]:
+    ok = g.completos
+    res = ajustar(g.R[ok], pesos[ok], tol=tol, max_iter=max_iter, limite=limite)
+    gamma = res["gamma"]
+    orden = np.argsort(-gamma, kind="stable")
+    lugar = np.empty(g.k, dtype=np.int64)
+    lugar[orden] = np.arange(1, g.k + 1)
+    return {
+        **g.to_json_key(),
+        "k": g.k,
+        "n": int(ok.sum()),
+        "iteraciones": res["iteraciones"],
+        "converged": res["converged"],
+        "delta": _r(res["delta"], 10) if np.isfinite(res["delta"]) else None,
+        "loglik": _r(res["loglik"], 4),
+        "elementos": [
+            {
+                "id": g.ids[j],
+                "etiqueta": g.etiquetas[j],
+                "worth": _r(gamma[j]),
+                "log_worth": _r(np.log(gamma[j])),
+                "lugar": int(lugar[j]),
+            }
+            for j in orden
+        ],
+    }
+
+
+def analizar(rk: Rankings, presupuesto: float = PRESUPUESTO_SEG, tol: float = TOL,
+             max_iter: int = MAX_ITER) -> Dict[str, Any]:
+    """Ajusta todos los grupos del instrumento dentro del presupuesto de tiempo."""
+    t0 = time.monotonic()
+    limite = t0 + presupuesto
+    # Con el presupuesto agotado, los grupos restantes hacen una sola iteración
+    grupos = [_grupo(g, rk.pesos, limite, tol, max_iter) for g in rk.grupos.values() if g.k >= 2]
+    return {
+        "version": rk.version,
+        "total_evaluaciones": rk.n,
+        "tol": tol,
+        "max_iter": max_iter,
+        "presupuesto_seg": presupuesto,
+        "presupuesto_agotado": time.monotonic() >= limite,
+        "segundos": round(time.monotonic() - t0, 4),
+        "grupos": grupos,
+    }
@@ -0,0 +1,162 @@
+# services/prioridades.py
+# ------------------------------------------------------------
+# Prioridades compuestas jerárquicas (estilo AHP) por instrumento:
+#   peso_global(ítem)     = peso(categoría) × peso_local(ítem)
+#   peso_global(sub-ítem) = peso(categoría) × peso_local(padre) × peso_local(sub-ítem)
+#
+# Los pesos locales salen de transformar cada ranking individual a pesos
+# (posición p = k + 1 - rank_value, p=1 el más importante) y promediar
+# con rol_peso_snapshot:
+#   roc        w_p = (1/k) Σ_{j=p..k} 1/j
+#   rank_sum   w_p = 2(k + 1 - p) / (k(k + 1))
+#   reciproco  w_p = (1/p) / Σ_{j=1..k} 1/j
+#
+# Todas las columnas de ítems del instrumento se procesan juntas
+# (matriz E x total_ítems + tabla de pesos indexada por (k, p)); la
+# composición global es una indexación por arreglos.
+# Resultado cacheado por (instrumento, método, versión de datos, huella
+# del catálogo).
+# ------------------------------------------------------------
+
+import threading
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from services.rankings import Rankings
+
+METODOS = ("roc", "rank_sum", "reciproco")
+
+
+def tabla_pesos(metodo: str, kmax: int) -> np.ndarray:
+    """T[k, p-1] = peso de la posición p en un ranking de k elementos."""
+    T = np.zeros((kmax + 1, max(kmax, 1)))
+    for k in range(1, kmax + 1):
+        p = np.arange(1, k + 1, dtype=np.float64)
+        if metodo == "roc":
+            inv = 1.0 / p
+            T[k, :k] = np.cumsum(inv[::-1])[::-1] / k
+        elif metodo == "rank_sum":
+            T[k, :k] = 2.0 * (k + 1 - p) / (k * (k + 1))
+        elif metodo == "reciproco":
+            T[k, :k] = (1.0 / p) / np.sum(1.0 / p)
+        else:
+            raise ValueError(f"metodo desconocido: {metodo}")
+    return T
+
+
+def _pesos_locales(R: np.ndarray, kcol: np.ndarray, completos: np.ndarray,
+                   w: np.ndarray, T: np.ndarray) -> np.ndarray:
+    """
+    R: E x C ranks (C columnas de varios grupos), kcol: tamaño del grupo de
+    cada columna, completos: E x C (fila completa en el grupo de la columna).
+    """
+    if R.shape[1] == 0:
+        return np.zeros(0)
+    P = np.clip(kcol[None, :] + 1 - R.astype(np.int64), 1, None)
+    # Faltantes (rank 0) darían p = k + 1, fuera de T: no pesan (wm = 0)
+    P = np.where(completos, P, 1)
+    Wt = T[kcol[None, :], P - 1]
+    wm = completos * w[:, None]
+    den = wm.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = (wm * Wt).sum(axis=0) / den
+    # Sin respuestas: reparto uniforme dentro del grupo
+    vacio = ~(den > 0)
+    out[vacio] = 1.0 / kcol[vacio]
+    return out
+
+
+def calcular(rk: Rankings, metodo: str = "roc") -> Dict[str, Any]:
+    cat_g = rk.grupo_categorias()
+    item_gs = [g for g in rk.grupos_items() if g.k > 0]
+    kmax = max([cat_g.k] + [g.k for g in item_gs]) if cat_g else max([g.k for g in item_gs] or [1])
+    T = tabla_pesos(metodo, kmax)
+
+    # ---- Categorías ----
+    if cat_g is not None and cat_g.k > 0:
+        kc = np.full(cat_g.k, cat_g.k, dtype=np.int64)
+        comp = np.repeat(cat_g.completos[:, None], cat_g.k, axis=1)
+        w_cat = _pesos_locales(cat_g.R, kc, comp, rk.pesos, T)
+        cat_idx = {code: j for j, code in enumerate(cat_g.ids)}
+    else:
+        w_cat = np.zeros(0)
+        cat_idx = {}
+
+    # ---- Ítems: todas las columnas juntas ----
+    e = rk.n
+    R = np.hstack([g.R for g in item_gs]) if item_gs else np.zeros((e, 0), dtype=np.int16)
+    kcol = np.concatenate([np.full(g.k, g.k, dtype=np.int64) for g in item_gs]) if item_gs else np.zeros(0, np.int64)
+    comp = np.hstack([np.repeat(g.completos[:, None], g.k, axis=1) for g in item_gs]) \
+        if item_gs else np.zeros((e, 0), dtype=bool)
+    local = _pesos_locales(R, kcol, comp, rk.pesos, T)
+
+    ids = [i for g in item_gs for i in g.ids]
+    etiquetas = [t for g in item_gs for t in g.etiquetas]
+    claves = [g.clave for g in item_gs for _ in g.ids]
+    col_de = {iid: j for j, iid in enumerate(ids)}
+
+    cat_col = np.array([cat_idx.get(c[1], -1) for c in claves], dtype=np.int64)
+    padre_col = np.array([col_de.get(c[2], -1) if c[2] else -1 for c in claves], dtype=np.int64)
+
+    w_cat_ext = np.append(w_cat, 0.0)       # índice -1 -> categoría desconocida
+    local_ext = np.append(local, 1.0)        # índice -1 -> sin padre
+    glob = w_cat_ext[cat_col] * local_ext[padre_col] * local
+
+    lugar = np.empty(len(ids), dtype=np.int64)
+    principales = padre_col < 0
+    # Lugar global entre ítems del mismo nivel (principales / sub-ítems)
+    for mask in (principales, ~principales):
+        idx = np.flatnonzero(mask)
+        lugar[idx[np.argsort(-glob[idx], kind="stable")]] = np.arange(1, idx.size + 1)
+
+    categorias = []
+    if cat_g is not None:
+        for j, code in enumerate(cat_g.ids):
+            categorias.append({
+                "categoria_code": code,
+                "nombre": cat_g.etiquetas[j],
+                "peso": round(float(w_cat[j]), 6),
+            })
+
+    items = []
+    for j, iid in enumerate(ids):
+        _, code, rank_group = claves[j]
+        items.append({
+            "item_id": iid,
+            "codigo_visible": etiquetas[j],
+            "categoria_code": code,
+            "rank_group": rank_group,
+            "parent_item_id": rank_group or None,
+            "peso_local": round(float(local[j]), 6),
+            "peso_global": round(float(glob[j]), 6),
+            "lugar_global": int(lugar[j]),
+        })
+
+    return {
+        "version": rk.version,
+        "metodo": metodo,
+        "total_evaluaciones": rk.n,
+        "categorias": categorias,
+        "items": items,
+    }
+
+
+_lock = threading.Lock()
+# (instrumento, método) -> (huella del catálogo, resultado)
+_cache: Dict[Tuple[int, str], Tuple[Any, Dict[str, Any]]] = {}
+
+
+def obtener(rk: Rankings, metodo: str = "roc") -> Dict[str, Any]:
+    """calcular() con caché por (instrumento, método) mientras no cambien versión ni catálogo."""
+    key = (rk.instrumento_id, metodo)
+    with _lock:
+        hit = _cache.get(key)
+    if hit is not None and hit[1]["version"] == rk.version and hit[0] == rk.huella:
+        return hit[1]
+    data = calcular(rk, metodo)
+    with _lock:
+        prev = _cache.get(key)
+        if prev is None or prev[1]["version"] <= data["version"]:
+            _cache[key] = (rk.huella, data)
+    return data
@@ -0,0 +1,257 @@
+# services/rankings.py
+# ------------------------------------------------------------
+# Carga de rankings submitted de un instrumento como matrices NumPy,
+# base común de los análisis (acuerdo, pares, Plackett-Luce, compuestos).
+#
+# - Un "grupo" es un conjunto de elementos rankeados entre sí:
+#     categorías del instrumento            -> clave ("CAT", None, 0)
+#     ítems principales de una categoría    -> clave ("ITEM", code, 0)
+#     sub-ítems de un padre (rank_group>0)  -> clave ("ITEM", code, parent_id)
+# - Grupo.R: matriz E x k (int16) de rank_value por evaluación (fila) y
+#   elemento (columna, en orden de catálogo); 0 = faltante.
+# - Convención de la app: rank_value mayor = más importante
+#   (admin_results ordena por rank_ponderado DESC).
+# - obtener(): caché en memoria por instrumento válida mientras no cambien
+#   agregado_version ni la huella del catálogo (ítems/categorías activados
+#   o reordenados no tocan agregado_version). Las matrices se comparten:
+#   solo lectura.
+# - Con ITEM_STORAGE=dual los ranks de ítems se decodifican de
+#   evaluacion_item_packed (services/codec_ranking.py); si falta algún
+#   paquete o no coincide con el catálogo, se lee evaluacion_item.
+# ------------------------------------------------------------
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from db import query_all
+from services import agregados, catalogo, codec_ranking
+
+CAT = "CAT"
+ITEM = "ITEM"
+
+
+class Grupo:
+    """Elementos rankeados juntos y su matriz de ranks (E x k)."""
+
+    __slots__ = ("clave", "ids", "etiquetas", "R")
+
+    def __init__(self, clave: Tuple[str, Optional[str], int], ids: List[Any], etiquetas: List[str], e: int):
+        self.clave = clave
+        self.ids = ids
+        self.etiquetas = etiquetas
+        self.R = np.zeros((e, len(ids)), dtype=np.int16)
+
+    @property
+    def k(self) -> int:
+        return len(self.ids)
+
+    @property
+    def completos(self) -> np.ndarray:
+        """Máscara de filas con el grupo completo (permutación 1..k)."""
+        return (self.R > 0).all(axis=1)
+
+    def to_json_key(self) -> Dict[str, Any]:
+        tipo, code, rank_group = self.clave
+        return {"tipo": tipo, "categoria_code": code, "rank_group": rank_group}
+
+
+class Rankings:
+    """Rankings submitted de un instrumento (evaluaciones x grupos)."""
+
+    __slots__ = ("instrumento_id", "version", "eval_ids", "usuario_ids", "pesos", "grupos", "huella")
+
+    def __init__(self, instrumento_id: int, version: int, eval_ids: np.ndarray,
+                 usuario_ids: np.ndarray, pesos: np.ndarray, grupos: Dict[tuple, Grupo],
+                 huella: Optional[Tuple[str, str]] = None):
+        self.instrumento_id = instrumento_id
+        self.version = version
+        self.eval_ids = eval_ids
+        self.usuario_ids = usuario_ids
+        self.pesos = pesos
+        self.grupos = grupos
+        self.huella = huella
+
+    @property
+    def n(self) -> int:
+        return int(self.eval_ids.shape[0])
+
+    def grupo_categorias(self) -> Optional[Grupo]:
+        return self.grupos.get((CAT, None, 0))
+
+    def grupos_items(self) -> List[Grupo]:
+        return [g for k, g in self.grupos.items() if k[0] == ITEM]
+
+
+def _fill(grupo: Grupo, fila: np.ndarray, col: np.ndarray, val: np.ndarray):
+    grupo.R[fila, col] = val
+
+
+def grupos_catalogo(instrumento_id: int, e: int = 0) -> Dict[tuple, Grupo]:
+    """Grupos del catálogo activo (orden de catálogo) con matrices vacías de e filas."""
+    cats = query_all(
+        "SELECT categoria_code, nombre FROM categoria "
+        "WHERE instrumento_id=%s AND is_active=1 ORDER BY orden",
+        (instrumento_id,)
+    )
+    items = query_all(
+        "SELECT i.item_id, i.categoria_code, i.parent_item_id, i.codigo_visible "
+        "FROM item i JOIN categoria c ON c.instrumento_id = i.instrumento_id "
+        "  AND c.categoria_code = i.categoria_code AND c.is_active=1 "
+        "WHERE i.instrumento_id=%s AND i.is_active=1 "
+        "ORDER BY c.orden, i.orden",
+        (instrumento_id,)
+    )
+
+    cat_key = (CAT, None, 0)
+    grupos: Dict[tuple, Grupo] = {
+        cat_key: Grupo(cat_key, [c["categoria_code"] for c in cats], [c["nombre"] for c in cats], e)
+    }
+    for it in items:
+        parent = int(it["parent_item_id"]) if it.get("parent_item_id") else 0
+        key = (ITEM, it["categoria_code"], parent)
+        g = grupos.get(key)
+        if g is None:
+            g = grupos[key] = Grupo(key, [], [], 0)
+        g.ids.append(int(it["item_id"]))
+        g.etiquetas.append(it["codigo_visible"])
+    for key, g in grupos.items():
+        if key[0] == ITEM:
+            g.R = np.zeros((e, g.k), dtype=np.int16)
+    return grupos
+
+
+def _items_packed(instrumento_id: int, eval_ids: np.ndarray, grupos: Dict[tuple, Grupo],
+                  item_pos: Dict[int, Tuple[tuple, int]]) -> bool:
+    """
+    Llena los grupos de ítems desde evaluacion_item_packed. False (sin
+    tocar los grupos) si la cobertura no es completa o algún paquete no
+    corresponde al catálogo vigente: el llamador usa la tabla normalizada.
+    """
+    est = catalogo.obtener(instrumento_id).estructura
+    rows = query_all(
+        "SELECT p.evaluacion_id, p.categoria_code, p.disposicion, p.ranks "
+        "FROM evaluacion e "
+        "JOIN evaluacion_item_packed p ON p.evaluacion_id = e.evaluacion_id "
+        "WHERE e.instrumento_id=%s AND e.status='submitted' "
+        "ORDER BY p.categoria_code, p.evaluacion_id",
+        (instrumento_id,)
+    )
+    por_cat: Dict[str, List[dict]] = {}
+    for r in rows:
+        por_cat.setdefault(r["categoria_code"], []).append(r)
+
+    e = eval_ids.shape[0]
+    decodificados = []
+    for code in est.limites:
+        filas = por_cat.get(code, [])
+        if len(filas) != e:
+            return False
+        disp = codec_ranking.disposicion(est, code)
+        if any(int(r["disposicion"]) != disp for r in filas):
+            return False
+        ini, fin = est.limites[code]
+        if any(est.item_ids[p] not in item_pos for p in range(ini, fin)):
+            return False
+        try:
+            R = codec_ranking.decodificar_lote(est, code, [bytes(r["ranks"]) for r in filas])
+        except codec_ranking.CodecError:
+            return False
+        ids = np.fromiter((int(r["evaluacion_id"]) for r in filas), dtype=np.int64, count=e)
+        decodificados.append((code, np.searchsorted(eval_ids, ids), R))
+
+    for code, fila, R in decodificados:
+        ini, fin = est.limites[code]
+        for j, p in enumerate(range(ini, fin)):
+            key, col = item_pos[est.item_ids[p]]
+            grupos[key].R[fila, col] = R[:, j]
+    return True
+
+
+def cargar(instrumento_id: int) -> Rankings:
+    """Lee catálogo + rankings submitted y arma las matrices (5 consultas)."""
+    version = agregados.version(instrumento_id)["version"]
+    # Antes de leer: si el catálogo cambia durante la carga, la próxima la rehace
+    huella = catalogo.obtener(instrumento_id).huella
+
+    evals = query_all(
+        "SELECT evaluacion_id, usuario_id, rol_peso_snapshot FROM evaluacion "
+        "WHERE instrumento_id=%s AND status='submitted' ORDER BY evaluacion_id",
+        (instrumento_id,)
+    )
+    eval_ids = np.array([int(r["evaluacion_id"]) for r in evals], dtype=np.int64)
+    usuario_ids = np.array([int(r["usuario_id"]) for r in evals], dtype=np.int64)
+    pesos = np.array([float(r["rol_peso_snapshot"]) for r in evals], dtype=np.float64)
+    e = eval_ids.shape[0]
+
+    grupos = grupos_catalogo(instrumento_id, e)
+    cat_key = (CAT, None, 0)
+    cat_col = {code: j for j, code in enumerate(grupos[cat_key].ids)}
+    item_pos: Dict[int, Tuple[tuple, int]] = {
+        iid: (key, j)
+        for key, g in grupos.items() if key[0] == ITEM
+        for j, iid in enumerate(g.ids)
+    }
+
+    if e == 0:
+        return Rankings(instrumento_id, version, eval_ids, usuario_ids, pesos, grupos, huella)
+
+    # ---- Ranks de categorías ----
+    rows = query_all(
+        "SELECT ec.evaluacion_id, ec.categoria_code, ec.rank_value "
+        "FROM evaluacion e "
+        "JOIN evaluacion_categoria ec ON ec.evaluacion_id = e.evaluacion_id "
+        "WHERE e.instrumento_id=%s AND e.status='submitted'",
+        (instrumento_id,)
+    )
+    if rows:
+        ids = np.fromiter((int(r["evaluacion_id"]) for r in rows), dtype=np.int64, count=len(rows))
+        cols = np.fromiter((cat_col.get(r["categoria_code"], -1) for r in rows), dtype=np.int64, count=len(rows))
+        vals = np.fromiter((int(r["rank_value"]) for r in rows), dtype=np.int64, count=len(rows))
+        ok = cols >= 0
+        _fill(grupos[cat_key], np.searchsorted(eval_ids, ids[ok]), cols[ok], vals[ok])
+
+    if codec_ranking.dual() and _items_packed(instrumento_id, eval_ids, grupos, item_pos):
+        return Rankings(instrumento_id, version, eval_ids, usuario_ids, pesos, grupos, huella)
+
+    # ---- Ranks de ítems (todas las categorías en una consulta) ----
+    rows = query_all(
+        "SELECT ei.evaluacion_id, ei.item_id, ei.rank_value "
+        "FROM evaluacion e "
+        "JOIN evaluacion_item ei ON ei.evaluacion_id = e.evaluacion_id "
+        "WHERE e.instrumento_id=%s AND e.status='submitted'",
+        (instrumento_id,)
+    )
+    por_grupo: Dict[tuple, List[Tuple[int, int, int]]] = {}
+    for r in rows:
+        pos = item_pos.get(int(r["item_id"]))
+        if pos is None:
+            continue
+        por_grupo.setdefault(pos[0], []).append((int(r["evaluacion_id"]), pos[1], int(r["rank_value"])))
+    for key, triples in por_grupo.items():
+        arr = np.array(triples, dtype=np.int64)
+        _fill(grupos[key], np.searchsorted(eval_ids, arr[:, 0]), arr[:, 1], arr[:, 2])
+
+    return Rankings(instrumento_id, version, eval_ids, usuario_ids, pesos, grupos, huella)
+
+
+_lock = threading.Lock()
+_cache: Dict[int, Rankings] = {}
+
+
+def obtener(instrumento_id: int) -> Rankings:
+    """Como cargar(), reutilizando la última carga si no cambió la versión ni el catálogo."""
+    v = agregados.version(instrumento_id)["version"]
+    h = catalogo.obtener(instrumento_id).huella
+    with _lock:
+        hit = _cache.get(instrumento_id)
+    if hit is not None and hit.version == v and hit.huella == h:
+        return hit
+
+    rk = cargar(instrumento_id)
+    with _lock:
+        prev = _cache.get(instrumento_id)
+        if prev is None or prev.version <= rk.version:
+            _cache[instrumento_id] = rk
+    return rk
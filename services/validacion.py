@@ -0,0 +1,149 @@
+# services/validacion.py
+# ------------------------------------------------------------
+# Validación completa de payloads de ranking contra el índice de
+# estructura del catálogo (services/catalogo.py), en memoria y sin
+# consultas a MySQL. Devuelve TODOS los errores a la vez.
+#
+# Reglas:
+# - Coerción de tipos: enteros, floats enteros (3.0) y strings numéricos
+#   ("3"); bool y demás se rechazan.
+# - Categorías: cada categoría activa exactamente una vez y ranks 1..K.
+# - Ítems: solo ítems activos de la categoría, sin repetir, todos
+#   presentes, y cada rank_group con ranks 1..n (permutación). Si el
+#   cliente manda rank_group debe coincidir con el del catálogo.
+#
+# Cada error: {"error": <código>, ...contexto}. Las filas devueltas ya
+# vienen normalizadas para el INSERT.
+# ------------------------------------------------------------
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.catalogo import Catalogo
+
+MAX_ERRORES = 50
+
+
+def entero(v: Any) -> Optional[int]:
+    """Coerción estricta a int; None si no es un entero representable."""
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, int):
+        return v
+    if isinstance(v, float):
+        return int(v) if v.is_integer() else None
+    if isinstance(v, str):
+        t = v.strip()
+        digitos = t[1:] if t[:1] in ("+", "-") else t
+        # Solo dígitos ASCII: isdigit() acepta "²" y otros que int() rechaza
+        if not (digitos.isascii() and digitos.isdigit()):
+            return None
+        # Ranks e ids caben de sobra en 18 dígitos; más largo, int() puede
+        # lanzar ValueError (límite de 4300 dígitos) o costar CPU
+        if len(digitos) > 18:
+            return None
+        return int(t)
+    return None
+
+
+def _permutacion(valores: List[int], n: int) -> List[Dict[str, Any]]:
+    """Errores de un grupo que debería tener exactamente los valores 1..n."""
+    errores = []
+    vistos = set()
+    repetidos = set()
+    for v in valores:
+        if v in vistos:
+            repetidos.add(v)
+        vistos.add(v)
+    if repetidos:
+        errores.append({"error": "rank_duplicado", "valores": sorted(repetidos)})
+    fuera = sorted(v for v in vistos if v < 1 or v > n)
+    if fuera:
+        errores.append({"error": "rank_fuera_de_rango", "valores": fuera, "max": n})
+    faltan = [v for v in range(1, n + 1) if v not in vistos]
+    if faltan:
+        errores.append({"error": "rank_faltante", "valores": faltan})
+    return errores
+
+
+def validar_categorias(cat: Catalogo, evaluacion_id: int,
+                       ranks: Any) -> Tuple[List[tuple], List[Dict[str, Any]]]:
+    """-> (filas (evaluacion_id, instrumento_id, code, rank), errores)"""
+    if not isinstance(ranks, list) or not ranks:
+        return [], [{"error": "payload_invalid"}]
+
+    errores: List[Dict[str, Any]] = []
+    filas = []
+    vistos = set()
+    for n, r in enumerate(ranks):
+        if not isinstance(r, dict):
+            errores.append({"error": "payload_invalid_rank", "indice": n})
+            continue
+        code = r.get("categoria_code")
+        code = code.strip() if isinstance(code, str) else ""
+        val = entero(r.get("rank_value"))
+        if not code or val is None:
+            errores.append({"error": "payload_invalid_rank", "indice": n})
+            continue
+        if code not in cat.codigos:
+            errores.append({"error": "categoria_invalida", "categoria_code": code})
+            continue
+        if code in vistos:
+            errores.append({"error": "categoria_repetida", "categoria_code": code})
+            continue
+        vistos.add(code)
+        filas.append((evaluacion_id, cat.instrumento_id, code, val))
+
+    faltan = [c["categoria_code"] for c in cat.categorias if c["categoria_code"] not in vistos]
+    if faltan:
+        errores.append({"error": "categorias_faltantes", "categorias": faltan})
+    errores.extend(_permutacion([f[3] for f in filas], cat.total_categorias))
+    return filas, errores[:MAX_ERRORES]
+
+
+def validar_items(cat: Catalogo, evaluacion_id: int, categoria_code: str,
+                  ranks: Any) -> Tuple[List[tuple], List[Dict[str, Any]]]:
+    """-> (filas (evaluacion_id, item_id, code, rank_group, rank), errores)"""
+    est = cat.estructura
+    if categoria_code not in cat.codigos:
+        return [], [{"error": "categoria_not_found", "categoria_code": categoria_code}]
+    if est.total_items(categoria_code) == 0:
+        return [], [{"error": "categoria_sin_items", "categoria_code": categoria_code}]
+    if not isinstance(ranks, list) or not ranks:
+        return [], [{"error": "payload_invalid"}]
+
+    errores: List[Dict[str, Any]] = []
+    filas = []
+    vistos = set()
+    por_grupo: Dict[int, List[int]] = {}
+    for n, r in enumerate(ranks):
+        if not isinstance(r, dict):
+            errores.append({"error": "payload_invalid_rank", "indice": n})
+            continue
+        item_id = entero(r.get("item_id"))
+        val = entero(r.get("rank_value"))
+        if item_id is None or val is None:
+            errores.append({"error": "payload_invalid_rank", "indice": n})
+            continue
+        if est.categoria_de(item_id) != categoria_code:
+            errores.append({"error": "item_invalido", "item_id": item_id})
+            continue
+        if item_id in vistos:
+            errores.append({"error": "item_repetido", "item_id": item_id})
+            continue
+        vistos.add(item_id)
+        rg = est.rank_group(item_id)
+        if r.get("rank_group") is not None and entero(r.get("rank_group")) != rg:
+            errores.append({"error": "rank_group_incorrecto", "item_id": item_id, "rank_group": rg})
+        por_grupo.setdefault(rg, []).append(val)
+        filas.append((evaluacion_id, item_id, categoria_code, rg, val))
+
+    ini, fin = est.limites[categoria_code]
+    faltan = [est.item_ids[i] for i in range(ini, fin) if est.item_ids[i] not in vistos]
+    if faltan:
+        errores.append({"error": "items_faltantes", "items": faltan})
+
+    for (_cc, rg, _ini, n) in est.grupos_categoria(categoria_code):
+        for e in _permutacion(por_grupo.get(rg, []), n):
+            e["rank_group"] = rg
+            errores.append(e)
+    return filas, errores[:MAX_ERRORES]
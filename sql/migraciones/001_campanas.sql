@@ -0,0 +1,117 @@
+-- =========================================================
+-- migraciones/001_campanas.sql - multicriterio_IPEPD (MySQL 5.7, InnoDB)
+-- Campañas (periodos de evaluación) y archivo de campañas cerradas.
+--
+-- Solo para bases creadas con un schema.sql anterior: una base nueva ya
+-- trae estas tablas. Las evaluaciones existentes quedan en una campaña
+-- 'activa' inicial por instrumento.
+-- =========================================================
+
+USE `multicriterio_IPEPD`;
+
+-- 1) Campañas
+CREATE TABLE IF NOT EXISTS campana (
+  campana_id INT UNSIGNED NOT NULL AUTO_INCREMENT,
+  instrumento_id INT UNSIGNED NOT NULL,
+  nombre VARCHAR(80) NOT NULL,
+  status ENUM('activa','cerrada') NOT NULL DEFAULT 'activa',
+  abierta_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  cerrada_at DATETIME NULL,
+  total_submitted INT UNSIGNED NOT NULL DEFAULT 0,
+  total_descartadas INT UNSIGNED NOT NULL DEFAULT 0,
+  activa_de INT UNSIGNED AS (IF(status = 'activa', instrumento_id, NULL)) STORED,
+
+  PRIMARY KEY (campana_id),
+  UNIQUE KEY uk_campana_activa (activa_de),
+  KEY idx_campana_instr (instrumento_id, campana_id),
+
+  CONSTRAINT fk_campana_instrumento
+    FOREIGN KEY (instrumento_id)
+    REFERENCES instrumento(instrumento_id)
+    ON UPDATE RESTRICT
+    ON DELETE RESTRICT
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO campana (instrumento_id, nombre, abierta_at)
+SELECT i.instrumento_id, 'Inicial', COALESCE(MIN(e.created_at), NOW())
+FROM instrumento i
+LEFT JOIN evaluacion e ON e.instrumento_id = i.instrumento_id
+GROUP BY i.instrumento_id;
+
+-- 2) evaluacion.campana_id (una evaluación por usuario, instrumento y campaña)
+ALTER TABLE evaluacion
+  ADD COLUMN campana_id INT UNSIGNED NULL AFTER instrumento_id;
+
+UPDATE evaluacion e
+JOIN campana c ON c.instrumento_id = e.instrumento_id AND c.status = 'activa'
+SET e.campana_id = c.campana_id;
+
+ALTER TABLE evaluacion
+  MODIFY campana_id INT UNSIGNED NOT NULL,
+  DROP INDEX uk_eval_unica,
+  ADD UNIQUE KEY uk_eval_unica (usuario_id, instrumento_id, campana_id),
+  ADD KEY idx_eval_campana (campana_id, status),
+  ADD CONSTRAINT fk_eval_campana
+    FOREIGN KEY (campana_id)
+    REFERENCES campana(campana_id)
+    ON UPDATE RESTRICT
+    ON DELETE RESTRICT;
+
+-- 3) Archivo de campañas cerradas
+CREATE TABLE IF NOT EXISTS campana_agregado_categoria (
+  campana_id INT UNSIGNED NOT NULL,
+  categoria_code VARCHAR(10) NOT NULL,
+  n INT NOT NULL DEFAULT 0,
+  sum_w BIGINT NOT NULL DEFAULT 0,
+  sum_r BIGINT NOT NULL DEFAULT 0,
+  sum_r2 BIGINT NOT NULL DEFAULT 0,
+  sum_wr BIGINT NOT NULL DEFAULT 0,
+  sum_wr2 BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (campana_id, categoria_code)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS campana_agregado_item (
+  campana_id INT UNSIGNED NOT NULL,
+  item_id INT UNSIGNED NOT NULL,
+  n INT NOT NULL DEFAULT 0,
+  sum_w BIGINT NOT NULL DEFAULT 0,
+  sum_r BIGINT NOT NULL DEFAULT 0,
+  sum_r2 BIGINT NOT NULL DEFAULT 0,
+  sum_wr BIGINT NOT NULL DEFAULT 0,
+  sum_wr2 BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (campana_id, item_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS campana_evaluacion (
+  campana_id INT UNSIGNED NOT NULL,
+  evaluacion_id BIGINT UNSIGNED NOT NULL,
+  usuario_id INT UNSIGNED NOT NULL,
+  rol_id_snapshot INT UNSIGNED NOT NULL,
+  rol_peso_snapshot INT NOT NULL,
+  created_at DATETIME NOT NULL,
+  submitted_at DATETIME NULL,
+
+  PRIMARY KEY (campana_id, evaluacion_id)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE IF NOT EXISTS campana_evaluacion_categoria (
+  campana_id INT UNSIGNED NOT NULL,
+  evaluacion_id BIGINT UNSIGNED NOT NULL,
+  categoria_code VARCHAR(10) NOT NULL,
+  rank_value INT NOT NULL,
+
+  PRIMARY KEY (campana_id, evaluacion_id, categoria_code)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE IF NOT EXISTS campana_evaluacion_item (
+  campana_id INT UNSIGNED NOT NULL,
+  evaluacion_id BIGINT UNSIGNED NOT NULL,
+  item_id INT UNSIGNED NOT NULL,
+  categoria_code VARCHAR(10) NOT NULL,
+  rank_group INT UNSIGNED NOT NULL DEFAULT 0,
+  rank_value INT NOT NULL,
+
+  PRIMARY KEY (campana_id, evaluacion_id, item_id)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
@@ -122,14 +122,43 @@ CREATE TABLE IF NOT EXISTS usuario (
     ON DELETE RESTRICT
 ) ENGINE=InnoDB;
 
+-- =========================
+-- 4b) Campañas (periodos de evaluación) por instrumento
+--  - a lo sumo una campaña 'activa' por instrumento (uk_campana_activa)
+--  - las tablas calientes (evaluacion*, agregado_*) solo contienen la
+--    campaña activa: al cerrarla se archiva en campana_* (sección 9)
+-- =========================
+CREATE TABLE IF NOT EXISTS campana (
+  campana_id INT UNSIGNED NOT NULL AUTO_INCREMENT,
+  instrumento_id INT UNSIGNED NOT NULL,
+  nombre VARCHAR(80) NOT NULL,
+  status ENUM('activa','cerrada') NOT NULL DEFAULT 'activa',
+  abierta_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  cerrada_at DATETIME NULL,
+  total_submitted INT UNSIGNED NOT NULL DEFAULT 0,
+  total_descartadas INT UNSIGNED NOT NULL DEFAULT 0,
+  activa_de INT UNSIGNED AS (IF(status = 'activa', instrumento_id, NULL)) STORED,
+
+  PRIMARY KEY (campana_id),
+  UNIQUE KEY uk_campana_activa (activa_de),
+  KEY idx_campana_instr (instrumento_id, campana_id),
+
+  CONSTRAINT fk_campana_instrumento
+    FOREIGN KEY (instrumento_id)
+    REFERENCES instrumento(instrumento_id)
+    ON UPDATE RESTRICT
+    ON DELETE RESTRICT
+) ENGINE=InnoDB;
+
 -- =========================
 -- 5) Cabecera de Evaluación
---  - una evaluación por usuario por instrumento
+--  - una evaluación por usuario por instrumento y campaña
 --  - snapshot del rol/peso para trazabilidad
 -- =========================
 CREATE TABLE IF NOT EXISTS evaluacion (
   evaluacion_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
   instrumento_id INT UNSIGNED NOT NULL,
+  campana_id INT UNSIGNED NOT NULL,
   usuario_id INT UNSIGNED NOT NULL,
 
   rol_id_snapshot INT UNSIGNED NOT NULL,
@@ -140,10 +169,17 @@ CREATE TABLE IF NOT EXISTS evaluacion (
   submitted_at DATETIME NULL,
 
   PRIMARY KEY (evaluacion_id),
-  UNIQUE KEY uk_eval_unica (usuario_id, instrumento_id),
+  UNIQUE KEY uk_eval_unica (usuario_id, instrumento_id, campana_id),
   KEY idx_eval_instr_status (instrumento_id, status, submitted_at),
+  KEY idx_eval_campana (campana_id, status),
   KEY idx_eval_usuario (usuario_id),
 
+  CONSTRAINT fk_eval_campana
+    FOREIGN KEY (campana_id)
+    REFERENCES campana(campana_id)
+    ON UPDATE RESTRICT
+    ON DELETE RESTRICT,
+
   CONSTRAINT fk_eval_instrumento
     FOREIGN KEY (instrumento_id)
     REFERENCES instrumento(instrumento_id)
@@ -212,6 +248,160 @@ CREATE TABLE IF NOT EXISTS evaluacion_item (
     ON DELETE RESTRICT
 ) ENGINE=InnoDB;
 
+-- =========================
+-- 7b) Ranking de Ítems empaquetado (opcional, ITEM_STORAGE=dual)
+--  - una fila por (evaluación, categoría): ranks uint8 en orden de catálogo
+--    (rank_group, orden); formato en services/codec_ranking.py
+--  - disposicion = CRC32 del orden de ítems con que se empaquetó
+--  - evaluacion_item se sigue escribiendo en la misma transacción
+-- =========================
+CREATE TABLE IF NOT EXISTS evaluacion_item_packed (
+  evaluacion_id BIGINT UNSIGNED NOT NULL,
+  categoria_code VARCHAR(10) NOT NULL,
+  disposicion INT UNSIGNED NOT NULL,
+  ranks VARBINARY(1024) NOT NULL,
+
+  PRIMARY KEY (evaluacion_id, categoria_code),
+
+  CONSTRAINT fk_evalpacked_eval
+    FOREIGN KEY (evaluacion_id)
+    REFERENCES evaluacion(evaluacion_id)
+    ON UPDATE RESTRICT
+    ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- =========================
+-- 8) Agregados incrementales (acumuladores por instrumento)
+--  - solo evaluaciones submitted; se actualizan con deltas en submit/reopen
+--    (y en ediciones admin de evaluaciones submitted)
+--  - sumas enteras (ranks y pesos son enteros) => reconciliación exacta
+--  - w = rol_peso_snapshot, r = rank_value
+-- =========================
+CREATE TABLE IF NOT EXISTS agregado_categoria (
+  instrumento_id INT UNSIGNED NOT NULL,
+  categoria_code VARCHAR(10) NOT NULL,
+  n INT NOT NULL DEFAULT 0,
+  sum_w BIGINT NOT NULL DEFAULT 0,
+  sum_r BIGINT NOT NULL DEFAULT 0,
+  sum_r2 BIGINT NOT NULL DEFAULT 0,
+  sum_wr BIGINT NOT NULL DEFAULT 0,
+  sum_wr2 BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (instrumento_id, categoria_code)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS agregado_item (
+  instrumento_id INT UNSIGNED NOT NULL,
+  item_id INT UNSIGNED NOT NULL,
+  n INT NOT NULL DEFAULT 0,
+  sum_w BIGINT NOT NULL DEFAULT 0,
+  sum_r BIGINT NOT NULL DEFAULT 0,
+  sum_r2 BIGINT NOT NULL DEFAULT 0,
+  sum_wr BIGINT NOT NULL DEFAULT 0,
+  sum_wr2 BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (instrumento_id, item_id)
+) ENGINE=InnoDB;
+
+-- Matrices de preferencia por pares: (a, b) = "a quedó arriba de b"
+-- (rank_value de a > rank_value de b) en la misma evaluación.
+--  - categorías: todas contra todas del instrumento
+--  - ítems: solo pares del mismo categoria_code + rank_group
+CREATE TABLE IF NOT EXISTS agregado_par_categoria (
+  instrumento_id INT UNSIGNED NOT NULL,
+  cat_a VARCHAR(10) NOT NULL,
+  cat_b VARCHAR(10) NOT NULL,
+  n INT NOT NULL DEFAULT 0,
+  sum_w BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (instrumento_id, cat_a, cat_b)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS agregado_par_item (
+  instrumento_id INT UNSIGNED NOT NULL,
+  item_a INT UNSIGNED NOT NULL,
+  item_b INT UNSIGNED NOT NULL,
+  n INT NOT NULL DEFAULT 0,
+  sum_w BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (instrumento_id, item_a, item_b)
+) ENGINE=InnoDB;
+
+-- Versión de los datos submitted por instrumento (se incrementa con cada delta)
+CREATE TABLE IF NOT EXISTS agregado_version (
+  instrumento_id INT UNSIGNED NOT NULL,
+  version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+  reopen_count INT UNSIGNED NOT NULL DEFAULT 0,
+  updated_at DATETIME NULL,
+
+  PRIMARY KEY (instrumento_id)
+) ENGINE=InnoDB;
+
+-- =========================
+-- 9) Archivo de campañas cerradas (congelado, solo evaluaciones submitted)
+--  - snapshot de acumuladores: comparación entre campañas sin recalcular
+--  - rankings por evaluación: para reanálisis; filas comprimidas
+--    (ROW_FORMAT=COMPRESSED) y sin FKs a las tablas calientes, para que
+--    el catálogo pueda seguir cambiando
+-- =========================
+CREATE TABLE IF NOT EXISTS campana_agregado_categoria (
+  campana_id INT UNSIGNED NOT NULL,
+  categoria_code VARCHAR(10) NOT NULL,
+  n INT NOT NULL DEFAULT 0,
+  sum_w BIGINT NOT NULL DEFAULT 0,
+  sum_r BIGINT NOT NULL DEFAULT 0,
+  sum_r2 BIGINT NOT NULL DEFAULT 0,
+  sum_wr BIGINT NOT NULL DEFAULT 0,
+  sum_wr2 BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (campana_id, categoria_code)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS campana_agregado_item (
+  campana_id INT UNSIGNED NOT NULL,
+  item_id INT UNSIGNED NOT NULL,
+  n INT NOT NULL DEFAULT 0,
+  sum_w BIGINT NOT NULL DEFAULT 0,
+  sum_r BIGINT NOT NULL DEFAULT 0,
+  sum_r2 BIGINT NOT NULL DEFAULT 0,
+  sum_wr BIGINT NOT NULL DEFAULT 0,
+  sum_wr2 BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (campana_id, item_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS campana_evaluacion (
+  campana_id INT UNSIGNED NOT NULL,
+  evaluacion_id BIGINT UNSIGNED NOT NULL,
+  usuario_id INT UNSIGNED NOT NULL,
+  rol_id_snapshot INT UNSIGNED NOT NULL,
+  rol_peso_snapshot INT NOT NULL,
+  created_at DATETIME NOT NULL,
+  submitted_at DATETIME NULL,
+
+  PRIMARY KEY (campana_id, evaluacion_id)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE IF NOT EXISTS campana_evaluacion_categoria (
+  campana_id INT UNSIGNED NOT NULL,
+  evaluacion_id BIGINT UNSIGNED NOT NULL,
+  categoria_code VARCHAR(10) NOT NULL,
+  rank_value INT NOT NULL,
+
+  PRIMARY KEY (campana_id, evaluacion_id, categoria_code)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE IF NOT EXISTS campana_evaluacion_item (
+  campana_id INT UNSIGNED NOT NULL,
+  evaluacion_id BIGINT UNSIGNED NOT NULL,
+  item_id INT UNSIGNED NOT NULL,
+  categoria_code VARCHAR(10) NOT NULL,
+  rank_group INT UNSIGNED NOT NULL DEFAULT 0,
+  rank_value INT NOT NULL,
+
+  PRIMARY KEY (campana_id, evaluacion_id, item_id)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
 -- ----------------------------
 -- Restore settings
 -- ----------------------------
@@ -4,6 +4,7 @@
  * Usa la API:
  *   GET /api/admin/instruments
  *   GET /api/admin/results/:instrumento_id
+ *   GET /api/admin/results/:instrumento_id/stream  (SSE: deltas en vivo)
  * ------------------------------------------------------------ */
 
 (function () {
@@ -24,9 +25,17 @@
   // Instancias de Chart activas (para destruir al recargar)
   let activeCharts = [];
 
+  // Referencias para actualizar en vivo (SSE) sin reconstruir
+  let catChart = null;        // { chart, codes: [categoria_code...] }
+  let itemCharts = {};        // categoria_code -> { chart, itemIds: [item_id...] }
+  let liveSource = null;      // EventSource activo
+  let liveRetry = null;       // reintento programado si el servidor no tenía cupo (503)
+
   function destroyCharts() {
     activeCharts.forEach(c => c.destroy());
     activeCharts = [];
+    catChart = null;
+    itemCharts = {};
   }
 
   /**
@@ -150,10 +159,12 @@
     detail.classList.remove("d-none");
 
     qs("#resultsTitle").textContent = "Cargando…";
+    stopLive();
 
     try {
       const data = await fetchJson(`/api/admin/results/${instrumentoId}`);
       renderResults(data);
+      startLive(instrumentoId, data.version);
     } catch (e) {
       qs("#resultsTitle").textContent = "Error";
       showAlert("Error al cargar resultados: " + e.message);
@@ -199,12 +210,12 @@
         const ra = c.rank_promedio ?? "—";
         const total = parseInt(c.total_respuestas) || 0;
         const highlight = idx === 0 ? 'style="background:rgba(191,135,31,0.08);"' : "";
-        return `<tr ${highlight}>
+        return `<tr ${highlight} data-cat="${escapeHtml(c.categoria_code)}">
           <td><span class="badge text-bg-primary">C.${c.orden || (idx + 1)}</span></td>
           <td><strong>${escapeHtml(c.nombre)}</strong></td>
-          <td class="text-center fw-bold">${rp}</td>
-          <td class="text-center">${ra}</td>
-          <td class="text-center">${total}</td>
+          <td class="text-center fw-bold js-rp">${rp}</td>
+          <td class="text-center js-ra">${ra}</td>
+          <td class="text-center js-total">${total}</td>
         </tr>`;
       }).join("");
     }
@@ -268,13 +279,13 @@
         const ra = it.rank_promedio ?? "—";
         const total = parseInt(it.total_respuestas) || 0;
 
-        html += `<tr>
+        html += `<tr data-item="${it.item_id}">
           <td><span class="badge text-bg-primary">${pos}</span></td>
           <td><strong>${escapeHtml(it.codigo_visible)}</strong></td>
           <td>${escapeHtml(truncate(it.contenido, 100))}</td>
-          <td class="text-center fw-bold">${rp}</td>
-          <td class="text-center">${ra}</td>
-          <td class="text-center">${total}</td>
+          <td class="text-center fw-bold js-rp">${rp}</td>
+          <td class="text-center js-ra">${ra}</td>
+          <td class="text-center js-total">${total}</td>
         </tr>`;
         pos++;
 
@@ -286,13 +297,13 @@
             const srp = si.rank_ponderado ?? "—";
             const sra = si.rank_promedio ?? "—";
             const st = parseInt(si.total_respuestas) || 0;
-            html += `<tr class="sub-item-row">
+            html += `<tr class="sub-item-row" data-item="${si.item_id}">
               <td><span class="badge" style="background:var(--c2);color:#333;">${sIdx + 1}</span></td>
               <td class="sub-item-cell"><strong>${escapeHtml(si.codigo_visible)}</strong></td>
               <td>${escapeHtml(truncate(si.contenido, 100))}</td>
-              <td class="text-center fw-bold">${srp}</td>
-              <td class="text-center">${sra}</td>
-              <td class="text-center">${st}</td>
+              <td class="text-center fw-bold js-rp">${srp}</td>
+              <td class="text-center js-ra">${sra}</td>
+              <td class="text-center js-total">${st}</td>
             </tr>`;
           });
         }
@@ -322,7 +333,8 @@
       const fixedMax = catsSorted.length;
       const canvas = qs("#radarCategorias");
       if (canvas) {
-        createRadarChart(canvas, labels, values, "Rank Ponderado", 0, fixedMax);
+        const chart = createRadarChart(canvas, labels, values, "Rank Ponderado", 0, fixedMax);
+        catChart = { chart, codes: catsSorted.map(c => c.categoria_code) };
       }
     } else {
       // No tiene sentido un radar con <3 ejes
@@ -395,11 +407,93 @@
         const values = items.map(it => parseFloat(it.rank_ponderado) || 0);
         const fixedMax = items.length;
 
-        createRadarChart(canvas, labels, values, catName, idx % CHART_PALETTE.length, fixedMax);
+        const chart = createRadarChart(canvas, labels, values, catName, idx % CHART_PALETTE.length, fixedMax);
+        itemCharts[items[0].categoria_code] = { chart, itemIds: items.map(it => it.item_id) };
       });
     });
   }
 
+  // ---------- Actualización en vivo (SSE) ----------
+  function startLive(instrumentoId, version) {
+    stopLive();
+    if (!window.EventSource) return;
+
+    const since = (version !== undefined && version !== null) ? `?since=${version}` : "";
+    let lastVersion = version;
+    const source = new EventSource(`/api/admin/results/${instrumentoId}/stream${since}`);
+    liveSource = source;
+    source.addEventListener("delta", ev => {
+      try {
+        const delta = JSON.parse(ev.data);
+        lastVersion = delta.version;
+        applyDelta(delta);
+      } catch (e) {
+        // Delta inválido: se ignora; la siguiente recarga manual lo corrige
+      }
+    });
+    source.addEventListener("error", () => {
+      // Respuesta no-SSE (p. ej. 503 sin cupo de streams): EventSource no
+      // reconecta solo; reintentar más tarde con jitter
+      if (source.readyState !== EventSource.CLOSED || liveSource !== source) return;
+      liveSource = null;
+      liveRetry = setTimeout(() => startLive(instrumentoId, lastVersion), 30000 + Math.random() * 15000);
+    });
+  }
+
+  function stopLive() {
+    if (liveRetry) {
+      clearTimeout(liveRetry);
+      liveRetry = null;
+    }
+    if (liveSource) {
+      liveSource.close();
+      liveSource = null;
+    }
+  }
+
+  function setRowValues(row, d) {
+    if (!row) return;
+    const rp = row.querySelector(".js-rp");
+    const ra = row.querySelector(".js-ra");
+    const total = row.querySelector(".js-total");
+    if (rp) rp.textContent = d.rank_ponderado ?? "—";
+    if (ra) ra.textContent = d.rank_promedio ?? "—";
+    if (total) total.textContent = parseInt(d.total_respuestas) || 0;
+  }
+
+  function applyDelta(delta) {
+    const hora = new Date().toLocaleTimeString("es-MX");
+    qs("#resultsLive").textContent =
+      `${delta.total_submitted} enviadas · ${delta.total_draft} borrador · actualizado ${hora}`;
+
+    const touched = new Set();
+
+    (delta.categorias || []).forEach(c => {
+      setRowValues(qs(`#tblCatRanking tr[data-cat="${CSS.escape(c.categoria_code)}"]`), c);
+      if (catChart) {
+        const i = catChart.codes.indexOf(c.categoria_code);
+        if (i >= 0) {
+          catChart.chart.data.datasets[0].data[i] = parseFloat(c.rank_ponderado) || 0;
+          touched.add(catChart.chart);
+        }
+      }
+    });
+
+    (delta.items || []).forEach(it => {
+      setRowValues(qs(`#itemRankingContainer tr[data-item="${it.item_id}"]`), it);
+      const ref = itemCharts[it.categoria_code];
+      if (ref) {
+        const i = ref.itemIds.indexOf(it.item_id);
+        if (i >= 0) {
+          ref.chart.data.datasets[0].data[i] = parseFloat(it.rank_ponderado) || 0;
+          touched.add(ref.chart);
+        }
+      }
+    });
+
+    touched.forEach(chart => chart.update());
+  }
+
   function truncate(str, max) {
     if (!str) return "";
     return str.length > max ? str.substring(0, max) + "…" : str;
@@ -407,7 +501,9 @@
 
   // ---------- Volver a la lista de instrumentos ----------
   function backToInstruments() {
+    stopLive();
     destroyCharts();
+    qs("#resultsLive").textContent = "";
     qs("#resultsDetail").classList.add("d-none");
     qs("#radarItemsSection").classList.add("d-none");
     qs("#instrumentCards").classList.remove("d-none");
@@ -1,7 +1,12 @@
 /* static/js/api.js
  * ------------------------------------------------------------
  * Helpers para consumir la API JSON del sistema multicriterio IPEPD
- * - fetchJson: maneja JSON, errores HTTP, y muestra mensajes útiles
+ * - fetchJson: maneja JSON, errores HTTP, y muestra mensajes útiles;
+ *   reintenta 503/429 con Retry-After (control de admisión del servidor)
+ *   con backoff exponencial + jitter (opts.retries, default 4)
+ * - opts.idempotent: manda Idempotency-Key; mientras no haya respuesta
+ *   exitosa, el mismo (url, cuerpo) reusa la clave (doble clic y
+ *   reintentos tras un corte reciben la respuesta original)
  * - qs: helper querySelector
  * - showAlert: alertas Bootstrap dinámicas
  * ------------------------------------------------------------ */
@@ -37,7 +42,40 @@
       .replaceAll("'", "&#039;");
   }
 
+  const RETRY_MAX_MS = 30000;
+
+  function sleep(ms) {
+    return new Promise((resolve) => setTimeout(resolve, ms));
+  }
+
+  // Espera antes del reintento n (0, 1, ...): al menos Retry-After,
+  // duplicando en cada intento, más un jitter de hasta la mitad (sumado,
+  // nunca antes de lo pedido) para no sincronizar clientes.
+  function retryDelay(res, n) {
+    const ra = parseInt(res.headers.get("Retry-After") || "", 10);
+    const base = Number.isFinite(ra) ? ra * 1000 : 1000;
+    const ms = Math.min(RETRY_MAX_MS, base * Math.pow(2, n));
+    return ms + Math.random() * (ms / 2);
+  }
+
+  // url -> { body, key } del último envío idempotente
+  const idemKeys = new Map();
+
+  function newKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+  }
+
+  function idempotencyKey(url, body) {
+    const last = idemKeys.get(url);
+    if (last && last.body === body) return last.key;
+    const key = newKey();
+    idemKeys.set(url, { body, key });
+    return key;
+  }
+
   async function fetchJson(url, opts = {}) {
+    const retries = opts.retries === undefined ? 4 : opts.retries;
     const options = {
       method: opts.method || "GET",
       headers: Object.assign(
@@ -47,8 +85,20 @@
       credentials: "same-origin",
       body: opts.body ? JSON.stringify(opts.body) : undefined,
     };
+    if (opts.idempotent) {
+      options.headers["Idempotency-Key"] = idempotencyKey(url, options.body || "");
+    }
 
-    const res = await fetch(url, options);
+    // Solo 503/429 con Retry-After: el servidor rechazó sin ejecutar nada,
+    // así que reintentar es seguro también para POST.
+    let res = await fetch(url, options);
+    for (let n = 0; n < retries; n++) {
+      if ((res.status !== 503 && res.status !== 429) || !res.headers.get("Retry-After")) break;
+      const ms = retryDelay(res, n);
+      if (opts.onRetry) opts.onRetry({ attempt: n + 1, delayMs: ms, status: res.status });
+      await sleep(ms);
+      res = await fetch(url, options);
+    }
 
     // Intentar parsear JSON siempre que se pueda
     let data = null;
@@ -60,10 +110,15 @@
       data = { raw: txt };
     }
 
+    if (res.ok && opts.idempotent) idemKeys.delete(url);
+
     if (!res.ok) {
-      const errMsg =
+      let errMsg =
         (data && (data.error || data.message)) ||
         `Error HTTP ${res.status} al consumir API`;
+      if (res.status === 503 || res.status === 429) {
+        errMsg = "El servidor está ocupado; intenta de nuevo en unos segundos.";
+      }
       const error = new Error(errMsg);
       error.status = res.status;
       error.data = data;
@@ -199,6 +199,7 @@
       await fetchJson(`/api/evaluacion/${evaluacionId}/categorias`, {
         method: "POST",
         body: { ranks: res.ranks },
+        idempotent: true,
       });
 
       // Redirigir a primera categoría de ítems
@@ -278,6 +278,7 @@
       await fetchJson(`/api/evaluacion/${evaluacionId}/items/${encodeURIComponent(categoriaCode)}`, {
         method: "POST",
         body: { ranks: res.ranks },
+        idempotent: true,
       });
 
       const nextOrden = categoriaOrden + 1;
@@ -196,7 +196,7 @@
       btnEnviar.disabled = true;
       btnEnviar.textContent = "Enviando...";
 
-      await fetchJson(`/api/evaluacion/${evaluacionId}/submit`, { method: "POST" });
+      await fetchJson(`/api/evaluacion/${evaluacionId}/submit`, { method: "POST", idempotent: true });
       showAlert("Evaluación enviada correctamente.", "success");
 
       // Regresar al menú
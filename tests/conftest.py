@@ -0,0 +1,41 @@
+# tests/conftest.py
+# ------------------------------------------------------------
+# Pruebas unitarias sin MySQL: solo lógica pura (validación, códecs,
+# análisis sobre matrices sintéticas). Correr desde la raíz del repo:
+#   python -m pytest -q
+# ------------------------------------------------------------
+
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from services.catalogo import Catalogo, Estructura  # noqa: E402
+
+
+@pytest.fixture
+def catalogo_prueba() -> Catalogo:
+    """
+    Instrumento 1 con dos categorías:
+      A (orden 1): ítems 1, 2 principales; 3, 4 sub-ítems de 1 (rank_group 1)
+      B (orden 2): ítems 5, 6, 7 principales
+    """
+    categorias = [
+        {"categoria_code": "A", "orden": 1, "nombre": "Categoría A"},
+        {"categoria_code": "B", "orden": 2, "nombre": "Categoría B"},
+    ]
+    items = [
+        {"item_id": 1, "categoria_code": "A", "rank_group": 0, "orden": 1},
+        {"item_id": 2, "categoria_code": "A", "rank_group": 0, "orden": 2},
+        {"item_id": 3, "categoria_code": "A", "rank_group": 1, "orden": 1},
+        {"item_id": 4, "categoria_code": "A", "rank_group": 1, "orden": 2},
+        {"item_id": 5, "categoria_code": "B", "rank_group": 0, "orden": 1},
+        {"item_id": 6, "categoria_code": "B", "rank_group": 0, "orden": 2},
+        {"item_id": 7, "categoria_code": "B", "rank_group": 0, "orden": 3},
+    ]
+    est = Estructura(items, [c["categoria_code"] for c in categorias])
+    return Catalogo(1, ("h", "h"), categorias, est)
@@ -0,0 +1,37 @@
+# tests/test_assets.py
+
+import pytest
+from flask import Flask
+
+from services import assets
+
+
+@pytest.fixture
+def cliente(tmp_path):
+    dist = tmp_path / "static" / "dist" / "js"
+    dist.mkdir(parents=True)
+    (dist / "app.1234.js").write_bytes(b"plano")
+    (dist / "app.1234.js.br").write_bytes(b"brotli")
+    (dist / "app.1234.js.gz").write_bytes(b"gzip")
+    app = Flask(__name__, static_folder=str(tmp_path / "static"))
+    assets.init_app(app)
+    return app.test_client()
+
+
+@pytest.mark.parametrize("accept,encoding,cuerpo", [
+    ("br, gzip", "br", b"brotli"),
+    ("gzip, deflate", "gzip", b"gzip"),
+    ("br;q=0, gzip", "gzip", b"gzip"),
+    ("gzip;q=0", None, b"plano"),
+    ("br;q=0, gzip;q=0", None, b"plano"),
+    ("*", "br", b"brotli"),
+    ("identity", None, b"plano"),
+    ("", None, b"plano"),
+])
+def test_negociacion_respeta_q(cliente, accept, encoding, cuerpo):
+    r = cliente.get("/static/dist/js/app.1234.js", headers={"Accept-Encoding": accept})
+    assert r.status_code == 200
+    assert r.headers.get("Content-Encoding") == encoding
+    assert r.get_data() == cuerpo
+    assert "Accept-Encoding" in r.headers["Vary"]
+    assert "immutable" in r.headers["Cache-Control"]
@@ -0,0 +1,114 @@
+# tests/test_codec_ranking.py
+
+import numpy as np
+import pytest
+
+from services import codec_ranking
+from services.catalogo import Estructura
+from services.codec_ranking import CodecError
+
+
+@pytest.fixture
+def est(catalogo_prueba):
+    return catalogo_prueba.estructura
+
+
+def _filas_a(eid=10, r1=2, r2=1, r3=1, r4=2):
+    # (evaluacion_id, item_id, categoria_code, rank_group, rank_value)
+    return [(eid, 1, "A", 0, r1), (eid, 2, "A", 0, r2), (eid, 3, "A", 1, r3), (eid, 4, "A", 1, r4)]
+
+
+def test_round_trip(est):
+    filas = _filas_a()
+    data = codec_ranking.codificar(est, "A", filas)
+    disp = codec_ranking.disposicion(est, "A")
+    assert codec_ranking.decodificar(est, "A", data, disp) == [2, 1, 1, 2]
+    assert sorted(codec_ranking.a_filas(est, 10, "A", data, disp)) == sorted(filas)
+
+
+def test_round_trip_sin_importar_el_orden_de_las_filas(est):
+    filas = [(10, 7, "B", 0, 3), (10, 5, "B", 0, 1), (10, 6, "B", 0, 2)]
+    data = codec_ranking.codificar(est, "B", filas)
+    assert data == bytes([codec_ranking.VERSION, 1, 2, 3])
+    assert sorted(codec_ranking.a_filas(est, 10, "B", data, codec_ranking.disposicion(est, "B"))) == sorted(filas)
+
+
+def test_byte_de_version(est):
+    data = codec_ranking.codificar(est, "A", _filas_a())
+    assert data[0] == codec_ranking.VERSION == 1
+    disp = codec_ranking.disposicion(est, "A")
+    with pytest.raises(CodecError, match="versión"):
+        codec_ranking.decodificar(est, "A", bytes([2]) + data[1:], disp)
+    with pytest.raises(CodecError, match="versión"):
+        codec_ranking.decodificar(est, "A", b"", disp)
+    with pytest.raises(CodecError, match="versión"):
+        codec_ranking.decodificar_lote(est, "A", [data, bytes([2]) + data[1:]])
+
+
+def test_disposicion_cambia_con_el_catalogo(est):
+    data = codec_ranking.codificar(est, "B", [(10, 5, "B", 0, 1), (10, 6, "B", 0, 2), (10, 7, "B", 0, 3)])
+    disp = codec_ranking.disposicion(est, "B")
+
+    # Ítems 6 y 7 reordenados: mismo largo, otra disposición
+    items = [
+        {"item_id": 1, "categoria_code": "A", "rank_group": 0, "orden": 1},
+        {"item_id": 2, "categoria_code": "A", "rank_group": 0, "orden": 2},
+        {"item_id": 3, "categoria_code": "A", "rank_group": 1, "orden": 1},
+        {"item_id": 4, "categoria_code": "A", "rank_group": 1, "orden": 2},
+        {"item_id": 5, "categoria_code": "B", "rank_group": 0, "orden": 1},
+        {"item_id": 7, "categoria_code": "B", "rank_group": 0, "orden": 2},
+        {"item_id": 6, "categoria_code": "B", "rank_group": 0, "orden": 3},
+    ]
+    otra = Estructura(items, ["A", "B"])
+    assert codec_ranking.disposicion(otra, "B") != disp
+    assert codec_ranking.disposicion(otra, "A") == codec_ranking.disposicion(est, "A")
+    with pytest.raises(CodecError, match="disposición"):
+        codec_ranking.decodificar(otra, "B", data, disp)
+
+
+@pytest.mark.parametrize("ranks", [
+    (1, 1, 1, 2),      # rank repetido en rank_group 0
+    (2, 1, 1, 3),      # fuera de 1..k en rank_group 1
+    (2, 1, 0, 0),      # sub-ítems sin rankear
+])
+def test_rechaza_lo_que_no_es_permutacion(est, ranks):
+    disp = codec_ranking.disposicion(est, "A")
+    data = bytes([codec_ranking.VERSION, *ranks])
+    with pytest.raises(CodecError, match="permutación"):
+        codec_ranking.decodificar(est, "A", data, disp)
+    with pytest.raises(CodecError, match="permutación"):
+        codec_ranking.decodificar_lote(est, "A", [data])
+    if 0 not in ranks:
+        with pytest.raises(CodecError, match="permutación"):
+            codec_ranking.codificar(est, "A", _filas_a(10, *ranks))
+
+
+def test_codificar_rechaza_filas_ajenas(est):
+    with pytest.raises(CodecError, match="no pertenece"):
+        codec_ranking.codificar(est, "A", _filas_a() + [(10, 5, "B", 0, 1)])
+    with pytest.raises(CodecError, match="fuera de"):
+        codec_ranking.codificar(est, "A", _filas_a(r1=256))
+    with pytest.raises(CodecError, match="permutación"):
+        codec_ranking.codificar(est, "A", _filas_a()[:3])
+    with pytest.raises(CodecError, match="sin ítems"):
+        codec_ranking.codificar(est, "Z", [])
+
+
+def test_lote_igual_al_camino_escalar(est):
+    rng = np.random.default_rng(7)
+    blobs = []
+    for eid in range(50):
+        a, b = rng.permutation([1, 2]), rng.permutation([1, 2])
+        blobs.append(codec_ranking.codificar(est, "A", _filas_a(eid, a[0], a[1], b[0], b[1])))
+    disp = codec_ranking.disposicion(est, "A")
+
+    R = codec_ranking.decodificar_lote(est, "A", blobs)
+    assert R.dtype == np.int16 and R.shape == (50, 4)
+    esperado = np.array([codec_ranking.decodificar(est, "A", b, disp) for b in blobs], dtype=np.int16)
+    assert (R == esperado).all()
+
+
+def test_lote_rechaza_largo_invalido(est):
+    data = codec_ranking.codificar(est, "A", _filas_a())
+    with pytest.raises(CodecError, match="largo"):
+        codec_ranking.decodificar_lote(est, "A", [data, data[:-1]])
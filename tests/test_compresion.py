@@ -0,0 +1,49 @@
+# tests/test_compresion.py
+
+import gzip
+
+import pytest
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from services.compresion import CompressionMiddleware
+
+CUERPO = b"body { color: #333; }\n" * 200
+
+
+def _app(status=200, **headers):
+    def app(environ, start_response):
+        resp = Response(CUERPO, status=status, content_type="text/css")
+        for k, v in headers.items():
+            resp.headers[k.replace("_", "-")] = v
+        return resp(environ, start_response)
+    return app
+
+
+def _get(app):
+    return Client(CompressionMiddleware(app, min_size=100, cache_entries=0)).get(
+        "/static/css/styles.css", headers={"Accept-Encoding": "gzip"}
+    )
+
+
+def test_comprime_respuesta_completa():
+    r = _get(_app())
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(r.get_data()) == CUERPO
+
+
+@pytest.mark.parametrize("status,headers", [
+    (206, {"Content_Range": f"bytes 0-1499/{len(CUERPO)}"}),
+    (200, {"Accept_Ranges": "bytes"}),
+    (200, {"Content_Range": f"bytes */{len(CUERPO)}"}),
+])
+def test_no_comprime_respuestas_por_rangos(status, headers):
+    r = _get(_app(status, **headers))
+    assert r.status_code == status
+    assert "Content-Encoding" not in r.headers
+    assert r.get_data() == CUERPO
+
+
+def test_accept_ranges_none_si_se_comprime():
+    r = _get(_app(Accept_Ranges="none"))
+    assert r.headers["Content-Encoding"] == "gzip"
@@ -0,0 +1,57 @@
+# tests/test_diario.py
+
+import pytest
+
+from services import diario
+
+
+@pytest.fixture(scope="module")
+def _archivo(tmp_path_factory):
+    # El hilo escritor es uno por proceso y guarda su conexión: un solo archivo por módulo
+    mp = pytest.MonkeyPatch()
+    mp.setattr(diario, "ACTIVO", True)
+    mp.setattr(diario, "PATH", str(tmp_path_factory.mktemp("diario") / "diario.sqlite3"))
+    mp.setattr(diario, "FLUSH_INTERVAL", 3600.0)   # sin vaciado a MySQL
+    yield
+    mp.undo()
+
+
+@pytest.fixture
+def journal(_archivo):
+    conn = diario._sqlite()
+    conn.execute("DELETE FROM pendiente")
+    conn.execute("DELETE FROM cierre")
+    return conn
+
+
+def _pendientes(conn, eid):
+    return conn.execute("SELECT COUNT(*) FROM pendiente WHERE evaluacion_id=?", (eid,)).fetchone()[0]
+
+
+def test_anotar_sin_cierre(journal):
+    assert diario.anotar(10, diario.CATEGORIAS, "", [(10, 1, "A", 1)])
+    assert _pendientes(journal, 10) == 1
+
+
+def test_cierre_rechaza_guardados_de_esa_evaluacion(journal):
+    diario.marcar_cierre(10)
+    assert not diario.anotar(10, diario.ITEMS, "A", [(10, 1, "A", 0, 1)])
+    assert _pendientes(journal, 10) == 0
+    # Otras evaluaciones siguen diferidas
+    assert diario.anotar(11, diario.ITEMS, "A", [(11, 1, "A", 0, 1)])
+    assert _pendientes(journal, 11) == 1
+
+
+def test_desmarcar_respeta_otro_submit_en_curso(journal):
+    diario.marcar_cierre(10)
+    diario.marcar_cierre(10)
+    diario.desmarcar_cierre(10)
+    assert not diario.anotar(10, diario.CATEGORIAS, "", [(10, 1, "A", 1)])
+    diario.desmarcar_cierre(10)
+    assert diario.anotar(10, diario.CATEGORIAS, "", [(10, 1, "A", 1)])
+
+
+def test_reabrir_quita_la_marca(journal):
+    diario.marcar_cierre(10)
+    diario.reabrir(10)
+    assert diario.anotar(10, diario.CATEGORIAS, "", [(10, 1, "A", 1)])
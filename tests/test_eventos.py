@@ -0,0 +1,37 @@
+# tests/test_eventos.py
+
+import threading
+
+import pytest
+
+from services import eventos
+
+
+@pytest.fixture
+def cupo(monkeypatch):
+    monkeypatch.setattr(eventos, "MAX_STREAMS", 2)
+    monkeypatch.setattr(eventos, "_streams", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(eventos, "_streams_stats", {"activos": 0, "rechazados": 0})
+
+
+def test_reservar_stream_respeta_el_maximo(cupo):
+    a = eventos.reservar_stream()
+    b = eventos.reservar_stream()
+    assert a is not None and b is not None
+    assert eventos.reservar_stream() is None
+    assert eventos.stats() == {"max": 2, "activos": 2, "rechazados": 1}
+
+    a()
+    c = eventos.reservar_stream()
+    assert c is not None
+    assert eventos.stats()["activos"] == 2
+
+
+def test_liberar_es_idempotente(cupo):
+    a = eventos.reservar_stream()
+    a()
+    a()   # call_on_close + finally no deben liberar dos veces
+    assert eventos.stats()["activos"] == 0
+    assert eventos.reservar_stream() is not None
+    assert eventos.reservar_stream() is not None
+    assert eventos.reservar_stream() is None
@@ -0,0 +1,152 @@
+# tests/test_idempotencia.py
+
+import threading
+
+import pytest
+from flask import Flask, jsonify, request
+
+from services import idempotencia
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(idempotencia, "almacen", idempotencia.Almacen(max_entries=10, ttl=60))
+    monkeypatch.setattr(idempotencia, "WAIT_SECONDS", 5.0)
+
+    app = Flask(__name__)
+    app.secret_key = "pruebas"
+    app.llamadas = 0
+    app.entrar = threading.Event()     # el líder llegó a la vista
+    app.soltar = threading.Event()     # ... y puede responder
+    app.soltar.set()
+
+    @app.post("/guardar")
+    @idempotencia.idempotente
+    def guardar():
+        app.llamadas += 1
+        app.entrar.set()
+        app.soltar.wait(5)
+        data = request.get_json()
+        status = int(data.get("status", 200))
+        return jsonify({"ok": status < 400, "llamada": app.llamadas}), status
+
+    return app
+
+
+def _cliente(app, usuario_id=1):
+    c = app.test_client()
+    with c.session_transaction() as s:
+        s["usuario_id"] = usuario_id
+    return c
+
+
+def _post(c, body, key="k1"):
+    return c.post("/guardar", json=body, headers={"Idempotency-Key": key})
+
+
+def test_replay_misma_clave_y_cuerpo(app):
+    c = _cliente(app)
+    r1 = _post(c, {"ranks": [1, 2]})
+    r2 = _post(c, {"ranks": [1, 2]})
+    assert r1.status_code == r2.status_code == 200
+    assert r2.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in r1.headers
+    assert r2.get_json() == r1.get_json()
+    assert app.llamadas == 1
+
+
+def test_misma_clave_otro_cuerpo_es_422(app):
+    c = _cliente(app)
+    _post(c, {"ranks": [1, 2]})
+    r = _post(c, {"ranks": [2, 1]})
+    assert r.status_code == 422
+    assert r.get_json()["error"] == "idempotency_key_reutilizada"
+    assert app.llamadas == 1
+
+
+def test_clave_por_usuario_y_sin_clave(app):
+    _post(_cliente(app, 1), {"ranks": [1]})
+    _post(_cliente(app, 2), {"ranks": [1]})
+    assert app.llamadas == 2
+    c = _cliente(app)
+    c.post("/guardar", json={"ranks": [1]})
+    c.post("/guardar", json={"ranks": [1]})
+    assert app.llamadas == 4
+
+
+def test_clave_demasiado_larga(app):
+    r = _post(_cliente(app), {}, key="x" * (idempotencia.MAX_KEY_LEN + 1))
+    assert r.status_code == 400
+    assert app.llamadas == 0
+
+
+def _en_paralelo(app, body):
+    """Lanza un líder bloqueado en la vista y devuelve (hilo, resultado del líder)."""
+    app.soltar.clear()
+    app.entrar.clear()
+    out = {}
+    lider = threading.Thread(target=lambda: out.setdefault("r", _post(_cliente(app), body)))
+    lider.start()
+    assert app.entrar.wait(5)
+    return lider, out
+
+
+def test_concurrente_espera_y_recibe_la_respuesta_del_lider(app):
+    lider, out = _en_paralelo(app, {"ranks": [1, 2]})
+    segundo = {}
+    t = threading.Thread(target=lambda: segundo.setdefault("r", _post(_cliente(app), {"ranks": [1, 2]})))
+    t.start()
+    t.join(0.2)
+    assert t.is_alive()                # esperando al líder
+    app.soltar.set()
+    lider.join(5)
+    t.join(5)
+    assert out["r"].status_code == 200
+    assert segundo["r"].headers["Idempotent-Replayed"] == "true"
+    assert app.llamadas == 1
+
+
+def test_concurrente_sin_respuesta_a_tiempo_es_409(app, monkeypatch):
+    monkeypatch.setattr(idempotencia, "WAIT_SECONDS", 0.1)
+    lider, _ = _en_paralelo(app, {"ranks": [1, 2]})
+    try:
+        r = _post(_cliente(app), {"ranks": [1, 2]})
+        assert r.status_code == 409
+        assert r.get_json()["error"] == "idempotency_key_en_proceso"
+    finally:
+        app.soltar.set()
+        lider.join(5)
+
+
+@pytest.mark.parametrize("status", [500, 503, 429])
+def test_no_guarda_errores_transitorios(app, status):
+    c = _cliente(app)
+    assert _post(c, {"status": status}).status_code == status
+    r = _post(c, {"status": status})
+    assert "Idempotent-Replayed" not in r.headers
+    assert app.llamadas == 2
+    assert idempotencia.stats()["guardadas"] == 0
+
+
+def test_guarda_errores_de_cliente(app):
+    c = _cliente(app)
+    _post(c, {"status": 400})
+    r = _post(c, {"status": 400})
+    assert r.status_code == 400
+    assert r.headers["Idempotent-Replayed"] == "true"
+    assert app.llamadas == 1
+
+
+def test_almacen_lru_y_ttl(monkeypatch):
+    alm = idempotencia.Almacen(max_entries=2, ttl=10)
+    g = idempotencia.Guardada(b"h", 0.0, 200, b"{}", "application/json")
+    for clave in ("a", "b", "c"):
+        assert alm.reservar(clave, b"h") == ("lider", None)
+        alm.guardar(clave, g._replace(creada=idempotencia.time.monotonic()))
+    assert alm.reservar("a", b"h") == ("lider", None)    # desalojada por LRU
+    alm.liberar("a")
+    assert alm.reservar("c", b"h")[0] == "replay"
+
+    ahora = idempotencia.time.monotonic()
+    monkeypatch.setattr(idempotencia.time, "monotonic", lambda: ahora + 11)
+    assert alm.reservar("c", b"h") == ("lider", None)    # vencida
@@ -0,0 +1,96 @@
+# tests/test_prioridades.py
+
+import numpy as np
+import pytest
+
+from services import prioridades
+from services.rankings import CAT, ITEM, Grupo, Rankings
+
+
+def _rankings(cat_rows, item_rows, pesos):
+    """Instrumento sintético: categorías A, B, C; ítems 1, 2 en A."""
+    e = len(cat_rows)
+    cat = Grupo((CAT, None, 0), ["A", "B", "C"], ["Cat A", "Cat B", "Cat C"], e)
+    cat.R[:] = np.array(cat_rows, dtype=np.int16)
+    items = Grupo((ITEM, "A", 0), [1, 2], ["A.1", "A.2"], e)
+    items.R[:] = np.array(item_rows, dtype=np.int16)
+    grupos = {cat.clave: cat, items.clave: items}
+    return Rankings(1, 7, np.arange(1, e + 1, dtype=np.int64), np.arange(1, e + 1, dtype=np.int64),
+                    np.array(pesos, dtype=np.float64), grupos)
+
+
+# Pesos por posición p = 1, 2, 3 en un ranking de k = 3 (calculados a mano)
+ESPERADO_K3 = {
+    "roc": [(1 + 1 / 2 + 1 / 3) / 3, (1 / 2 + 1 / 3) / 3, (1 / 3) / 3],
+    "rank_sum": [3 / 6, 2 / 6, 1 / 6],
+    "reciproco": [6 / 11, 3 / 11, 2 / 11],
+}
+
+
+@pytest.mark.parametrize("metodo", prioridades.METODOS)
+def test_tabla_pesos_a_mano(metodo):
+    T = prioridades.tabla_pesos(metodo, 3)
+    assert T[3, :3] == pytest.approx(ESPERADO_K3[metodo])
+    assert T[3, :3].sum() == pytest.approx(1.0)
+    assert T[1, 0] == pytest.approx(1.0)
+
+
+def test_tabla_pesos_metodo_desconocido():
+    with pytest.raises(ValueError):
+        prioridades.tabla_pesos("borda", 3)
+
+
+@pytest.mark.parametrize("metodo", prioridades.METODOS)
+def test_calcular_ejemplo_a_mano(metodo):
+    # rank mayor = más importante: A (3) primero, B segundo, C tercero
+    rk = _rankings([[3, 2, 1]], [[1, 2]], [1])
+    out = prioridades.calcular(rk, metodo)
+    pesos = {c["categoria_code"]: c["peso"] for c in out["categorias"]}
+    assert [pesos["A"], pesos["B"], pesos["C"]] == pytest.approx(ESPERADO_K3[metodo], abs=1e-6)
+
+    T2 = prioridades.tabla_pesos(metodo, 2)[2, :2]
+    items = {i["item_id"]: i for i in out["items"]}
+    assert items[2]["peso_local"] == pytest.approx(T2[0], abs=1e-6)
+    assert items[1]["peso_local"] == pytest.approx(T2[1], abs=1e-6)
+    assert items[2]["peso_global"] == pytest.approx(ESPERADO_K3[metodo][0] * T2[0], abs=1e-6)
+    assert items[2]["lugar_global"] == 1
+
+
+def test_calcular_ponderado_por_rol():
+    # Dos evaluaciones opuestas; la de peso 3 domina
+    rk = _rankings([[3, 2, 1], [1, 2, 3]], [[1, 2], [2, 1]], [3, 1])
+    out = prioridades.calcular(rk, "rank_sum")
+    pesos = {c["categoria_code"]: c["peso"] for c in out["categorias"]}
+    assert pesos["A"] == pytest.approx((3 * 3 / 6 + 1 * 1 / 6) / 4, abs=1e-6)
+    assert pesos["C"] == pytest.approx((3 * 1 / 6 + 1 * 3 / 6) / 4, abs=1e-6)
+
+
+@pytest.mark.parametrize("metodo", prioridades.METODOS)
+def test_calcular_fila_incompleta(metodo):
+    # La segunda evaluación no tiene ranks (0 = faltante) en el grupo más
+    # grande (k == kmax): no debe salirse de la tabla ni pesar
+    completa = prioridades.calcular(_rankings([[3, 2, 1]], [[1, 2]], [1]), metodo)
+    con_faltante = prioridades.calcular(_rankings([[3, 2, 1], [0, 0, 0]], [[1, 2], [0, 0]], [1, 5]), metodo)
+    assert con_faltante["categorias"] == completa["categorias"]
+    assert con_faltante["items"] == completa["items"]
+
+
+def test_calcular_sin_respuestas_completas_reparte_uniforme():
+    out = prioridades.calcular(_rankings([[0, 2, 0]], [[0, 0]], [1]), "roc")
+    assert [c["peso"] for c in out["categorias"]] == pytest.approx([1 / 3] * 3, abs=1e-6)
+
+
+def test_obtener_invalida_si_cambia_el_catalogo(monkeypatch):
+    monkeypatch.setattr(prioridades, "_cache", {})
+    rk = _rankings([[3, 2, 1]], [[2, 1]], [1])
+    rk.huella = ("3", "111")
+    primero = prioridades.obtener(rk)
+    assert prioridades.obtener(rk) is primero
+
+    # Misma agregado_version, catálogo distinto (p. ej. un ítem desactivado)
+    otro = _rankings([[1, 2, 3]], [[1, 2]], [1])
+    otro.huella = ("3", "222")
+    segundo = prioridades.obtener(otro)
+    assert segundo is not primero
+    pesos = {c["categoria_code"]: c["peso"] for c in segundo["categorias"]}
+    assert pesos["C"] > pesos["A"]
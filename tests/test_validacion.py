@@ -0,0 +1,172 @@
+# tests/test_validacion.py
+
+import pytest
+
+from services import validacion
+from services.validacion import entero, validar_categorias, validar_items
+
+
+def _codigos(errores):
+    return [e["error"] for e in errores]
+
+
+# =========================
+# Coerción de tipos
+# =========================
+
+@pytest.mark.parametrize("v, esperado", [
+    (3, 3),
+    (0, 0),
+    (-2, -2),
+    (3.0, 3),
+    ("3", 3),
+    (" 12 ", 12),
+    ("+4", 4),
+    ("-4", -4),
+    ("9" * 18, 10 ** 18 - 1),
+])
+def test_entero_acepta(v, esperado):
+    assert entero(v) == esperado
+
+
+@pytest.mark.parametrize("v", [
+    True, False, 3.5, float("nan"), float("inf"), "", " ", "+", "-", "3.0", "3a", "0x10",
+    "²", "٣", "³4", "+²", None, [3], {"v": 3},
+    "1" * 19, "9" * 5000, "-" + "9" * 5000,
+])
+def test_entero_rechaza(v):
+    assert entero(v) is None
+
+
+# =========================
+# Categorías
+# =========================
+
+def test_categorias_ok(catalogo_prueba):
+    filas, errores = validar_categorias(catalogo_prueba, 9, [
+        {"categoria_code": "A", "rank_value": "2"},
+        {"categoria_code": " B ", "rank_value": 1.0},
+    ])
+    assert errores == []
+    assert filas == [(9, 1, "A", 2), (9, 1, "B", 1)]
+
+
+@pytest.mark.parametrize("ranks", [None, [], {"A": 1}, "A"])
+def test_categorias_payload_invalid(catalogo_prueba, ranks):
+    assert validar_categorias(catalogo_prueba, 9, ranks) == ([], [{"error": "payload_invalid"}])
+
+
+@pytest.mark.parametrize("rank", ["x", {"categoria_code": "A"}, {"rank_value": 1},
+                                  {"categoria_code": "A", "rank_value": "²"},
+                                  {"categoria_code": "A", "rank_value": True},
+                                  {"categoria_code": "A", "rank_value": "9" * 5000}])
+def test_categorias_payload_invalid_rank(catalogo_prueba, rank):
+    _filas, errores = validar_categorias(catalogo_prueba, 9, [rank, {"categoria_code": "B", "rank_value": 1}])
+    assert {"error": "payload_invalid_rank", "indice": 0} in errores
+
+
+def test_categorias_invalida_repetida_y_faltantes(catalogo_prueba):
+    _filas, errores = validar_categorias(catalogo_prueba, 9, [
+        {"categoria_code": "A", "rank_value": 1},
+        {"categoria_code": "A", "rank_value": 2},
+        {"categoria_code": "Z", "rank_value": 2},
+    ])
+    assert {"error": "categoria_invalida", "categoria_code": "Z"} in errores
+    assert {"error": "categoria_repetida", "categoria_code": "A"} in errores
+    assert {"error": "categorias_faltantes", "categorias": ["B"]} in errores
+
+
+def test_categorias_permutacion(catalogo_prueba):
+    _filas, errores = validar_categorias(catalogo_prueba, 9, [
+        {"categoria_code": "A", "rank_value": 3},
+        {"categoria_code": "B", "rank_value": 3},
+    ])
+    assert {"error": "rank_duplicado", "valores": [3]} in errores
+    assert {"error": "rank_fuera_de_rango", "valores": [3], "max": 2} in errores
+    assert {"error": "rank_faltante", "valores": [1, 2]} in errores
+
+
+def test_max_errores(catalogo_prueba, monkeypatch):
+    monkeypatch.setattr(validacion, "MAX_ERRORES", 2)
+    _filas, errores = validar_categorias(catalogo_prueba, 9, ["x"] * 5)
+    assert len(errores) == 2
+
+
+# =========================
+# Ítems
+# =========================
+
+def _items_ok():
+    return [
+        {"item_id": 1, "rank_value": 2},
+        {"item_id": "2", "rank_value": 1},
+        {"item_id": 3, "rank_value": 1, "rank_group": 1},
+        {"item_id": 4, "rank_value": 2},
+    ]
+
+
+def test_items_ok(catalogo_prueba):
+    filas, errores = validar_items(catalogo_prueba, 9, "A", _items_ok())
+    assert errores == []
+    assert sorted(filas) == [(9, 1, "A", 0, 2), (9, 2, "A", 0, 1), (9, 3, "A", 1, 1), (9, 4, "A", 1, 2)]
+
+
+def test_items_categoria_not_found(catalogo_prueba):
+    assert validar_items(catalogo_prueba, 9, "Z", _items_ok()) == (
+        [], [{"error": "categoria_not_found", "categoria_code": "Z"}]
+    )
+
+
+def test_items_categoria_sin_items(catalogo_prueba):
+    catalogo_prueba.codigos = frozenset(catalogo_prueba.codigos | {"C"})
+    assert validar_items(catalogo_prueba, 9, "C", _items_ok()) == (
+        [], [{"error": "categoria_sin_items", "categoria_code": "C"}]
+    )
+
+
+@pytest.mark.parametrize("ranks", [None, [], {"1": 1}])
+def test_items_payload_invalid(catalogo_prueba, ranks):
+    assert validar_items(catalogo_prueba, 9, "A", ranks) == ([], [{"error": "payload_invalid"}])
+
+
+def test_items_payload_invalid_rank(catalogo_prueba):
+    ranks = _items_ok()
+    ranks[0] = {"item_id": 1, "rank_value": "²"}
+    ranks[1] = {"item_id": "9" * 5000, "rank_value": 1}
+    _filas, errores = validar_items(catalogo_prueba, 9, "A", ranks + [7])
+    assert {"error": "payload_invalid_rank", "indice": 0} in errores
+    assert {"error": "payload_invalid_rank", "indice": 1} in errores
+    assert {"error": "payload_invalid_rank", "indice": 4} in errores
+
+
+def test_items_invalido_repetido_y_faltantes(catalogo_prueba):
+    _filas, errores = validar_items(catalogo_prueba, 9, "A", [
+        {"item_id": 1, "rank_value": 2},
+        {"item_id": 1, "rank_value": 1},
+        {"item_id": 5, "rank_value": 1},
+        {"item_id": 3, "rank_value": 1},
+        {"item_id": 4, "rank_value": 2},
+    ])
+    assert {"error": "item_invalido", "item_id": 5} in errores
+    assert {"error": "item_repetido", "item_id": 1} in errores
+    assert {"error": "items_faltantes", "items": [2]} in errores
+
+
+def test_items_rank_group_incorrecto(catalogo_prueba):
+    ranks = _items_ok()
+    ranks[2]["rank_group"] = 0
+    _filas, errores = validar_items(catalogo_prueba, 9, "A", ranks)
+    assert errores == [{"error": "rank_group_incorrecto", "item_id": 3, "rank_group": 1}]
+
+
+def test_items_permutacion_por_grupo(catalogo_prueba):
+    _filas, errores = validar_items(catalogo_prueba, 9, "A", [
+        {"item_id": 1, "rank_value": 1},
+        {"item_id": 2, "rank_value": 1},
+        {"item_id": 3, "rank_value": 1},
+        {"item_id": 4, "rank_value": 5},
+    ])
+    assert {"error": "rank_duplicado", "valores": [1], "rank_group": 0} in errores
+    assert {"error": "rank_faltante", "valores": [2], "rank_group": 0} in errores
+    assert {"error": "rank_fuera_de_rango", "valores": [5], "max": 2, "rank_group": 1} in errores
+    assert {"error": "rank_faltante", "valores": [2], "rank_group": 1} in errores
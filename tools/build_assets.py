@@ -0,0 +1,218 @@
+# tools/build_assets.py
+# ------------------------------------------------------------
+# Build de assets estáticos: minifica, agrega hash de contenido y
+# precomprime static/js/*.js y static/css/styles.css.
+#
+# Salida (static/dist/, fuera de git):
+#   dist/js/items.<hash>.js (+ .gz, + .br si está instalado brotli)
+#   dist/css/styles.<hash>.css (+ .gz, .br)
+#   dist/manifest.json   {"js/items.js": "dist/js/items.<hash>.js", ...}
+#
+# Las plantillas usan asset_url('js/items.js') (services/assets.py): con
+# manifest sirve la versión con hash y Cache-Control inmutable de un año;
+# sin manifest (desarrollo) cae a /static/js/items.js.
+#
+# Minificación: rjsmin/rcssmin si están instalados; si no, un minificador
+# conservador propio (quita comentarios, indentación y líneas vacías;
+# respeta strings y template literals; conserva saltos de línea para no
+# depender de ASI). Supone que los JS no usan literales regex con comillas
+# o // dentro (hoy no hay ninguno).
+#
+# Uso:
+#   python -m tools.build_assets            (build)
+#   python -m tools.build_assets --check    (falla si el manifest está desactualizado)
+# ------------------------------------------------------------
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli  # opcional
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import rjsmin  # opcional
+except ImportError:  # pragma: no cover
+    rjsmin = None
+
+try:
+    import rcssmin  # opcional
+except ImportError:  # pragma: no cover
+    rcssmin = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST = os.path.join(DIST_DIR, "manifest.json")
+
+HASH_LEN = 10
+
+
+def fuentes():
+    """Rutas relativas a static/ de los assets a construir."""
+    out = []
+    js_dir = os.path.join(STATIC_DIR, "js")
+    for name in sorted(os.listdir(js_dir)):
+        if name.endswith(".js"):
+            out.append(f"js/{name}")
+    out.append("css/styles.css")
+    return out
+
+
+# =========================
+# Minificación
+# =========================
+
+def minify_js(src: str) -> str:
+    if rjsmin is not None:
+        return rjsmin.jsmin(src)
+
+    out = []
+    i, n = 0, len(src)
+    state = None          # None | "'" | '"' | "`" (dentro de string/template)
+    line = []
+
+    def flush_line():
+        text = "".join(line).rstrip()
+        if text.strip():
+            out.append(text)
+        line.clear()
+
+    while i < n:
+        ch = src[i]
+        if state is None:
+            if ch == "/" and i + 1 < n and src[i + 1] == "/":
+                j = src.find("\n", i)
+                i = n if j < 0 else j
+                continue
+            if ch == "/" and i + 1 < n and src[i + 1] == "*":
+                j = src.find("*/", i + 2)
+                i = n if j < 0 else j + 2
+                continue
+            if ch == "\n":
+                flush_line()
+                i += 1
+                continue
+            if ch in " \t" and not "".join(line).strip():
+                i += 1          # indentación
+                continue
+            if ch in "'\"`":
+                state = ch
+            line.append(ch)
+            i += 1
+            continue
+
+        # Dentro de string / template literal: copiar tal cual
+        line.append(ch)
+        if ch == "\\" and i + 1 < n:
+            line.append(src[i + 1])
+            i += 2
+            continue
+        if ch == state:
+            state = None
+        elif ch == "\n" and state == "`":
+            # salto de línea dentro del template: se conserva completo
+            out.append("".join(line)[:-1].rstrip("\n"))
+            line.clear()
+        i += 1
+    flush_line()
+    return "\n".join(out) + "\n"
+
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(src: str) -> str:
+    if rcssmin is not None:
+        return rcssmin.cssmin(src)
+    css = _CSS_COMMENT.sub("", src)
+    css = _CSS_SPACE.sub(" ", css)
+    css = _CSS_PUNCT.sub(r"\1", css)
+    css = css.replace(";}", "}")
+    return css.strip() + "\n"
+
+
+# =========================
+# Build
+# =========================
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LEN]
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def construir(limpiar: bool = True) -> dict:
+    if limpiar and os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+
+    manifest = {}
+    for rel in fuentes():
+        with open(os.path.join(STATIC_DIR, rel), "r", encoding="utf-8") as f:
+            src = f.read()
+        mini = minify_js(src) if rel.endswith(".js") else minify_css(src)
+        data = mini.encode("utf-8")
+
+        stem, ext = os.path.splitext(rel)
+        out_rel = f"dist/{stem}.{_hash(data)}{ext}"
+        out_path = os.path.join(STATIC_DIR, out_rel)
+        _write(out_path, data)
+        # mtime=0: .gz reproducible entre builds
+        _write(out_path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(out_path + ".br", brotli.compress(data, quality=11))
+        manifest[rel] = out_rel
+
+        print(f"{rel:28s} {len(src.encode('utf-8')):7d} -> {len(data):7d} bytes  {out_rel}")
+
+    _write(MANIFEST, (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode("utf-8"))
+    if brotli is None:
+        print("(brotli no instalado: solo variantes .gz)", file=sys.stderr)
+    return manifest
+
+
+def verificar() -> bool:
+    """True si el manifest existente coincide con los fuentes actuales."""
+    try:
+        with open(MANIFEST, "r", encoding="utf-8") as f:
+            actual = json.load(f)
+    except (OSError, ValueError):
+        return False
+    for rel in fuentes():
+        with open(os.path.join(STATIC_DIR, rel), "r", encoding="utf-8") as f:
+            src = f.read()
+        mini = minify_js(src) if rel.endswith(".js") else minify_css(src)
+        stem, ext = os.path.splitext(rel)
+        esperado = f"dist/{stem}.{_hash(mini.encode('utf-8'))}{ext}"
+        if actual.get(rel) != esperado or not os.path.exists(os.path.join(STATIC_DIR, esperado)):
+            return False
+    return True
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build de assets estáticos con hash y precompresión.")
+    ap.add_argument("--check", action="store_true", help="solo verificar que dist/ está al día")
+    args = ap.parse_args(argv)
+
+    if args.check:
+        ok = verificar()
+        print("assets al día" if ok else "assets desactualizados: correr python -m tools.build_assets")
+        raise SystemExit(0 if ok else 1)
+    construir()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# tools/empaquetar_items.py
+# ------------------------------------------------------------
+# Backfill de evaluacion_item_packed (ITEM_STORAGE=dual) a partir de
+# evaluacion_item, o verificación de que ambos coinciden.
+#
+# - Por instrumento, lee todos los ranks de ítems en una consulta y
+#   empaqueta cada (evaluación, categoría) completa; las incompletas
+#   (borradores a medias) se omiten: se empaquetarán al guardarse.
+# - Escribe en lotes de --lote evaluaciones por transacción.
+# - Con --verificar no escribe: decodifica los paquetes existentes y
+#   compara con la tabla normalizada (exit 1 si hay diferencias).
+#
+# Uso:
+#   python -m tools.empaquetar_items
+#   python -m tools.empaquetar_items --instrumento 2 --lote 200
+#   python -m tools.empaquetar_items --verificar
+# ------------------------------------------------------------
+
+import argparse
+import os
+import sys
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+import db  # noqa: E402
+from db import query_all  # noqa: E402
+from services import catalogo, codec_ranking  # noqa: E402
+
+
+def _filas(instrumento_id: int) -> Dict[Tuple[int, str], List[tuple]]:
+    rows = query_all(
+        "SELECT ei.evaluacion_id, ei.item_id, ei.categoria_code, ei.rank_group, ei.rank_value "
+        "FROM evaluacion e "
+        "JOIN evaluacion_item ei ON ei.evaluacion_id = e.evaluacion_id "
+        "WHERE e.instrumento_id=%s "
+        "ORDER BY ei.evaluacion_id, ei.categoria_code",
+        (instrumento_id,)
+    )
+    out: Dict[Tuple[int, str], List[tuple]] = {}
+    for r in rows:
+        out.setdefault((int(r["evaluacion_id"]), r["categoria_code"]), []).append((
+            int(r["evaluacion_id"]), int(r["item_id"]), r["categoria_code"],
+            int(r["rank_group"]), int(r["rank_value"]),
+        ))
+    return out
+
+
+def empaquetar(instrumento_id: int, lote: int) -> Tuple[int, int]:
+    est = catalogo.obtener(instrumento_id).estructura
+    pendientes = []
+    omitidas = 0
+    for (eid, code), filas in _filas(instrumento_id).items():
+        try:
+            codec_ranking.codificar(est, code, filas)
+        except codec_ranking.CodecError:
+            omitidas += 1
+            continue
+        pendientes.append((eid, code, filas))
+
+    for i in range(0, len(pendientes), max(1, lote)):
+        parte = pendientes[i:i + lote]
+
+        def _tx():
+            for eid, code, filas in parte:
+                codec_ranking.escribir(est, eid, code, filas)
+
+        db.transaccion(_tx, "empaquetar_items")
+    return len(pendientes), omitidas
+
+
+def verificar(instrumento_id: int) -> int:
+    est = catalogo.obtener(instrumento_id).estructura
+    normal = _filas(instrumento_id)
+    rows = query_all(
+        "SELECT p.evaluacion_id, p.categoria_code, p.disposicion, p.ranks "
+        "FROM evaluacion e "
+        "JOIN evaluacion_item_packed p ON p.evaluacion_id = e.evaluacion_id "
+        "WHERE e.instrumento_id=%s",
+        (instrumento_id,)
+    )
+    diferencias = 0
+    for r in rows:
+        eid, code = int(r["evaluacion_id"]), r["categoria_code"]
+        try:
+            paquete = codec_ranking.a_filas(est, eid, code, bytes(r["ranks"]), int(r["disposicion"]))
+        except codec_ranking.CodecError as e:
+            print(f"  evaluación {eid} {code}: {e}")
+            diferencias += 1
+            continue
+        if sorted(paquete) != sorted(normal.get((eid, code), [])):
+            print(f"  evaluación {eid} {code}: el paquete no coincide con evaluacion_item")
+            diferencias += 1
+    return diferencias
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Backfill/verificación de evaluacion_item_packed.")
+    ap.add_argument("--instrumento", type=int, action="append", help="instrumento_id (repetible)")
+    ap.add_argument("--lote", type=int, default=500, help="paquetes por transacción")
+    ap.add_argument("--verificar", action="store_true", help="solo comparar, no escribir")
+    args = ap.parse_args(argv)
+
+    ids = args.instrumento or [int(i["instrumento_id"]) for i in catalogo.instrumentos()]
+    fallas = 0
+    try:
+        for iid in ids:
+            if args.verificar:
+                n = verificar(iid)
+                fallas += n
+                print(f"instrumento {iid}: {n} diferencias")
+            else:
+                escritos, omitidas = empaquetar(iid, args.lote)
+                print(f"instrumento {iid}: {escritos} paquetes escritos, {omitidas} categorías incompletas omitidas")
+    finally:
+        db.release_connection()
+    if fallas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,10 @@ WSGI Configuration con soporte para prefijo de ruta (APP_PREFIX)
 Permite montar la aplicación bajo una subruta.
 Ejemplo:
   APP_PREFIX=multicriterio_ipepd gunicorn wsgi:application
+
+Compresión (services/compresion.py): gzip/br negociado para HTML y JSON
+alrededor de toda la pila. COMPRESS=0 la desactiva (p.ej. si el proxy
+ya comprime).
 """
 
 import os
@@ -13,9 +17,11 @@ from werkzeug.wrappers import Response
 # Cargar variables de entorno (.env)
 load_dotenv()
 
-# Importar la aplicación Flask
-# (app.py expone "app = create_app()")
-from app import app
+# Crear la aplicación Flask (app factory: sin conexiones a MySQL al arrancar)
+from app import create_app
+from services.compresion import CompressionMiddleware
+
+app = create_app()
 
 # Obtener prefijo de la ruta desde variable de entorno
 # Normalizar: remover barras al inicio y al final
@@ -43,5 +49,8 @@ else:
     print("✓ Aplicación montada en la raíz: /")
     print("✓ URL de acceso: http://localhost:5000/")
 
+if os.getenv("COMPRESS", "1") == "1":
+    application = CompressionMiddleware(application)
+
 # Para usar con servidores WSGI como Gunicorn:
 # gunicorn wsgi:application